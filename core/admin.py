@@ -1,7 +1,17 @@
 # admin.py
-from django.contrib import admin
+import re
+
+from django.contrib import admin, messages
+from django.db.models.functions import Length
 from django.utils.html import format_html
-from .models import Service, Testimonial, ContactSubmission
+from . import bulk
+from .models import Service, Testimonial, ContactSubmission, BulkOperation, SubmissionArchive
+from .search import search_contact_submissions
+from .signals import submissions_status_changed
+
+# Digits and the separators phone numbers are written with
+PHONE_LIKE = re.compile(r'[\d\s().+-]*\d[\d\s().+-]*')
+
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -27,10 +37,12 @@ class TestimonialAdmin(admin.ModelAdmin):
     search_fields = ['client_name', 'client_company', 'testimonial_text']
     list_editable = ['is_featured', 'is_active']
     ordering = ['-is_featured', '-created_at']
+    readonly_fields = ['client_image_variants']
     
     fieldsets = (
         ('Client Information', {
-            'fields': ('client_name', 'client_company', 'client_position', 'client_image')
+            'fields': ('client_name', 'client_company', 'client_position', 'client_image',
+                       'client_image_variants')
         }),
         ('Testimonial', {
             'fields': ('testimonial_text', 'rating')
@@ -73,15 +85,88 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'status' in form.changed_data:
+            # The admin writes its own history entry, so no user for the audit hook
+            submissions_status_changed.send(
+                sender=ContactSubmission, ids=[obj.pk], status=obj.status,
+                previous=[(obj.created_at, form.initial['status'])],
+            )
+
+    def changelist_view(self, request, extra_context=None):
+        operations = list(bulk.pending_operations())
+        for operation in operations:
+            self.message_user(
+                request,
+                f'Marking {operation.total} submissions as {operation.get_status_display().lower()}: '
+                f'{operation.processed} done.',
+                messages.INFO,
+            )
+        if operations:
+            bulk.worker.submit()  # Resumes operations left by a stopped process
+        return super().changelist_view(request, extra_context)
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        if PHONE_LIKE.fullmatch(search_term.strip()):
+            # The full-text index has no phone column: match search_fields
+            return super().get_search_results(request, queryset, search_term)
+        return search_contact_submissions(queryset, search_term), False
     
     actions = ['mark_as_replied', 'mark_as_closed']
     
     def mark_as_replied(self, request, queryset):
-        updated = queryset.update(status='replied')
-        self.message_user(request, f'{updated} submissions marked as replied.')
+        self.start_status_change(request, queryset, 'replied')
     mark_as_replied.short_description = 'Mark selected submissions as replied'
     
     def mark_as_closed(self, request, queryset):
-        updated = queryset.update(status='closed')
-        self.message_user(request, f'{updated} submissions marked as closed.')
-    mark_as_closed.short_description = 'Mark selected submissions as closed'
\ No newline at end of file
+        self.start_status_change(request, queryset, 'closed')
+    mark_as_closed.short_description = 'Mark selected submissions as closed'
+
+    def start_status_change(self, request, queryset, status):
+        # In the background, in chunks: one UPDATE of a select-all would
+        # hold the write lock past the request timeout
+        operation = bulk.start_status_change(queryset, status, user=request.user)
+        self.message_user(
+            request, f'{operation.total} submissions will be marked as {status} in the background.'
+        )
+
+
+@admin.register(BulkOperation)
+class BulkOperationAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'state', 'processed', 'total', 'changed', 'user', 'created_at', 'finished_at']
+    list_filter = ['state', 'status']
+    readonly_fields = ['status', 'state', 'user', 'total', 'processed', 'changed', 'error',
+                       'created_at', 'finished_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SubmissionArchive)
+class SubmissionArchiveAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'created_from', 'created_to', 'codec', 'compressed_size', 'archived_at']
+    list_filter = ['codec']
+    exclude = ['data']
+    readonly_fields = ['first_id', 'last_id', 'created_from', 'created_to', 'count', 'day_counts', 'codec',
+                       'compressed_size', 'archived_at']
+
+    def get_queryset(self, request):
+        # The batches themselves stay in the database
+        return super().get_queryset(request).defer('data').annotate(data_size=Length('data'))
+
+    def compressed_size(self, obj):
+        return f'{obj.data_size / 1024:.1f} KiB'
+    compressed_size.short_description = 'Compressed size'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
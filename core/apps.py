@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401
+        from . import views  # noqa: F401  Registers the list snapshots
+        from .metrics import instrument_connection
+
+        connection_created.connect(instrument_connection)
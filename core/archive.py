@@ -0,0 +1,137 @@
+# archive.py
+import datetime
+import json
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .exports import EXPORT_COLUMNS, EXPORT_FIELDS
+from .models import ContactSubmission, SubmissionArchive
+from .stats import keep_counted, submission_day
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=settings.CONTACT_ARCHIVE_ZSTD_LEVEL).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _zlib_compress(data):
+    return zlib.compress(data, level=9)
+
+
+# codec: (compress, decompress), preferred first
+CODECS = {'zlib': (_zlib_compress, zlib.decompress)}
+if zstandard is not None:
+    CODECS = {'zstd': (_zstd_compress, _zstd_decompress), **CODECS}
+
+DEFAULT_CODEC = next(iter(CODECS))
+
+
+def archivable_submissions(older_than):
+    """Closed submissions created before ``older_than``, oldest id first"""
+    return ContactSubmission.objects.filter(status='closed', created_at__lt=older_than).order_by('pk')
+
+
+def _record(row):
+    return {
+        field: value.isoformat() if isinstance(value, datetime.datetime) else value
+        for field, value in zip(EXPORT_FIELDS, row)
+    }
+
+
+def archive_batch(older_than, batch_size, codec=DEFAULT_CODEC):
+    """
+    Move up to ``batch_size`` archivable submissions into one
+    SubmissionArchive row, in one transaction, and return how many moved.
+    A batch either commits whole or not at all, so an interrupted run
+    just starts again from the submissions still in the table.
+    """
+    with transaction.atomic(using=router.db_for_write(ContactSubmission)):
+        rows = list(
+            archivable_submissions(older_than).select_for_update(of=('self',))
+            .values_list(*EXPORT_COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        records = [_record(row) for row in rows]
+        created = [row[EXPORT_FIELDS.index('created_at')] for row in rows]
+        payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        SubmissionArchive.objects.create(
+            first_id=records[0]['id'], last_id=records[-1]['id'],
+            created_from=min(created), created_to=max(created), count=len(records),
+            day_counts=Counter(submission_day(created_at).isoformat() for created_at in created),
+            codec=codec, data=CODECS[codec][0](payload.encode()),
+        )
+        with keep_counted():
+            ContactSubmission.objects.filter(pk__in=[record['id'] for record in records]).delete()
+    return len(records)
+
+
+def archive_submissions(older_than=None, batch_size=None, max_batches=None, codec=DEFAULT_CODEC):
+    """
+    Archive closed submissions created before ``older_than`` (default:
+    CONTACT_ARCHIVE_AFTER_DAYS ago) batch by batch, and return how many
+    were moved
+    """
+    if older_than is None:
+        older_than = timezone.now() - datetime.timedelta(days=settings.CONTACT_ARCHIVE_AFTER_DAYS)
+    batch_size = batch_size or settings.CONTACT_ARCHIVE_BATCH_SIZE
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(older_than, batch_size, codec)
+        if not count:
+            break
+        moved += count
+        batches += 1
+    return moved
+
+
+def read_archive(archive):
+    """The export rows of one SubmissionArchive, as dicts"""
+    if archive.codec not in CODECS:
+        raise LookupError(f'Archive {archive.pk} is {archive.codec}-compressed; install zstandard to read it')
+    payload = CODECS[archive.codec][1](bytes(archive.data)).decode()
+    return [json.loads(line) for line in payload.splitlines()]
+
+
+def archived_submissions(since=None, until=None, email=None, ids=None):
+    """
+    Yield the archived submissions created from ``since`` to before
+    ``until`` (datetimes), optionally only those from ``email`` or with
+    one of ``ids``. Only the batches whose ranges overlap are read.
+    """
+    archives = SubmissionArchive.objects.order_by('first_id')
+    if since is not None:
+        archives = archives.filter(created_to__gte=since)
+    if until is not None:
+        archives = archives.filter(created_from__lt=until)
+    if ids is not None:
+        ids = set(ids)
+        if not ids:
+            return
+        archives = archives.filter(first_id__lte=max(ids), last_id__gte=min(ids))
+    email = email.lower() if email else None
+
+    for archive in archives.iterator(chunk_size=20):
+        for record in read_archive(archive):
+            created_at = datetime.datetime.fromisoformat(record['created_at'])
+            if since is not None and created_at < since:
+                continue
+            if until is not None and created_at >= until:
+                continue
+            if email is not None and record['email'].lower() != email:
+                continue
+            if ids is not None and record['id'] not in ids:
+                continue
+            yield record
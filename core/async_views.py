@@ -0,0 +1,192 @@
+# async_views.py
+from functools import cache, partial
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+
+from .budgets import query_budget
+from .cache import aversioned_key, get_async_cache
+from .conditional import acompute_validators, conditional_response, finish_conditional_response
+from .models import Service
+from .routers import use_primary
+from .serializers import ServiceSerializer
+from .snapshots import snapshots
+from .views import API_OVERVIEW
+
+
+class AsyncThrottleMixin:
+    """SimpleRateThrottle.allow_request() on the async cache"""
+
+    async def aallow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cache = get_async_cache()
+        self.history = await cache.get(self.key, [])
+        self.now = self.timer()
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) >= self.num_requests:
+            return False
+        self.history.insert(0, self.now)
+        await cache.set(self.key, self.history, self.duration)
+        return True
+
+
+@cache
+def async_throttle_class(throttle_class):
+    if hasattr(throttle_class, 'aallow_request'):
+        return throttle_class  # e.g. core/throttling.py
+    return type(f'Async{throttle_class.__name__}', (AsyncThrottleMixin, throttle_class), {})
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of DRF's APIView for the public read-only endpoints.
+    DRF views are sync only, so under ASGI each request to them is handed to
+    a worker thread; these stay on the event loop except for the ORM
+    queries themselves, which Django still runs in its database thread.
+
+    Covers what those endpoints use: session and token authentication, the
+    default throttles, and JSON rendering with the default renderer.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+            await self.check_throttles(request)
+            response = await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = self.render({'detail': exc.detail}, status=exc.status_code)
+            if getattr(exc, 'wait', None) is not None:
+                response['Retry-After'] = str(int(exc.wait))
+        response['Allow'] = ', '.join(self._allowed_methods())
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    async def authenticate(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if header and header[0].lower() == 'token':
+            if len(header) != 2:
+                raise exceptions.AuthenticationFailed('Invalid token header.')
+            token = await Token.objects.select_related('user').filter(key=header[1]).afirst()
+            if token is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            return token.user
+        return await request.auser()
+
+    async def check_throttles(self, request):
+        waits = []
+        for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+            throttle = async_throttle_class(throttle_class)()
+            if not await throttle.aallow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    def render(self, data, status=200):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+@query_budget(queries=0)
+class ApiOverviewView(AsyncAPIView):
+    async def get(self, request):
+        return self.render(API_OVERVIEW)
+
+
+class SnapshotListView(AsyncAPIView):
+    """Serve a list from its pre-rendered snapshot, like SnapshotListMixin"""
+    snapshot_name = None
+
+    async def get(self, request):
+        snapshot = await snapshots.aget(self.snapshot_name)
+        response = conditional_response(request, snapshot.etag, snapshot.last_modified)
+        if response is None:
+            response = HttpResponse(snapshot.body, content_type='application/json')
+            response.compressed_content = partial(snapshots.compressed, snapshot)
+        return finish_conditional_response(response, snapshot.etag, snapshot.last_modified)
+
+
+@query_budget(queries=2, sql_ms=50)  # Snapshot rebuild: validators + list
+class ServiceListView(SnapshotListView):
+    snapshot_name = 'services'
+
+
+@query_budget(queries=2, sql_ms=100)
+class TestimonialListView(SnapshotListView):
+    snapshot_name = 'testimonials'
+
+
+@query_budget(queries=2, sql_ms=50)
+class FeaturedTestimonialListView(SnapshotListView):
+    snapshot_name = 'featured_testimonials'
+
+
+@query_budget(queries=2, sql_ms=50)
+class ServiceDetailView(AsyncAPIView):
+    """
+    Async views.ServiceDetailView. Uses the same cache keys, so both share
+    cached validators and responses.
+    """
+    cache_prefix = 'ServiceDetailView'
+
+    def get_queryset(self):
+        return Service.objects.filter(is_active=True)
+
+    async def get_validators(self, pk):
+        cache = get_async_cache()
+        key = await aversioned_key('validators', (Service,), pk)
+        validators = await cache.get(key)
+        if validators is None:
+            queryset = self.get_queryset().filter(pk=pk)
+            with use_primary():
+                validators = await acompute_validators(queryset, salt='service_detail')
+            if validators[1] is None:
+                return None, None  # Let the view raise its 404; not cached, any pk can miss
+            await cache.set(key, validators, settings.CORE_CACHE_TIMEOUT)
+        return validators
+
+    async def get(self, request, pk):
+        etag, last_modified = await self.get_validators(pk)
+        if etag is not None:
+            response = conditional_response(request, etag, last_modified)
+            if response is not None:
+                return finish_conditional_response(response, etag, last_modified)
+
+        cache = get_async_cache()
+        key = await aversioned_key(self.cache_prefix, (Service,), f'pk={pk}')
+        data = await cache.get(key)
+        if data is None:
+            try:
+                with use_primary():
+                    service = await self.get_queryset().aget(pk=pk)
+            except Service.DoesNotExist:
+                raise exceptions.NotFound('No Service matches the given query.')
+            data = ServiceSerializer(service).data
+            await cache.set(key, data, settings.CORE_CACHE_TIMEOUT)
+
+        response = self.render(data)
+        if etag is not None:
+            finish_conditional_response(response, etag, last_modified)
+        return response
+
+
+VIEWS = {
+    'api_overview': ApiOverviewView,
+    'service_list': ServiceListView,
+    'service_detail': ServiceDetailView,
+    'testimonial_list': TestimonialListView,
+    'featured_testimonials': FeaturedTestimonialListView,
+}
@@ -0,0 +1,51 @@
+# budgets.py
+from collections import namedtuple
+
+QueryBudget = namedtuple('QueryBudget', ['queries', 'sql_ms'])
+
+
+def query_budget(queries, sql_ms=None):
+    """
+    Declare the most SQL queries (and, optionally, total SQL milliseconds)
+    one request to a view may use. Works on view classes and on function
+    views; put it above ``@api_view``/``@csrf_exempt``.
+
+    Budgets are enforced by the test suite through the ``query_budgets``
+    command, and the metrics middleware logs requests that exceed them
+    when QUERY_BUDGET_WARNINGS is on.
+    """
+    budget = QueryBudget(queries, sql_ms)
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def get_query_budget(callback):
+    """The budget of a URL callback, from the function or its view class"""
+    budget = getattr(callback, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(callback, 'view_class', None), 'query_budget', None)
+    return budget
+
+
+def check_query_budget(budget, queries, sql_time):
+    """Return a description of every limit of ``budget`` that was exceeded"""
+    problems = []
+    if queries > budget.queries:
+        problems.append(f'{queries} queries (budget {budget.queries})')
+    if budget.sql_ms is not None and sql_time * 1000 > budget.sql_ms:
+        problems.append(f'{sql_time * 1000:.1f}ms of SQL (budget {budget.sql_ms}ms)')
+    return problems
+
+
+def budget_usage(budget, queries, sql_time):
+    """Fraction of the budget used, taking the tighter of the two limits"""
+    if budget.queries:
+        usage = queries / budget.queries
+    else:
+        usage = float('inf') if queries else 0.0
+    if budget.sql_ms:
+        usage = max(usage, sql_time * 1000 / budget.sql_ms)
+    return usage
@@ -0,0 +1,133 @@
+# bulk.py
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BulkOperation, BulkOperationChunk, ContactSubmission
+from .signals import submissions_status_changed
+from .workers import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+
+def set_status(ids, status, user=None):
+    """
+    Change the status of the submissions with ``ids`` and fire the same
+    hooks as any other status change. Returns the ids that changed. Call
+    it inside a transaction, so the change and its audit entries commit
+    together.
+    """
+    rows = list(
+        ContactSubmission.objects.filter(pk__in=ids).exclude(status=status)
+        .values_list('pk', 'created_at', 'status')
+    )
+    changed = [pk for pk, _, _ in rows]
+    if changed:
+        ContactSubmission.objects.filter(pk__in=changed).update(status=status, updated_at=timezone.now())
+        submissions_status_changed.send(
+            sender=ContactSubmission, ids=changed, status=status, user=user,
+            previous=[(created_at, old_status) for _, created_at, old_status in rows],
+        )
+    return changed
+
+
+def start_status_change(queryset, status, user=None):
+    """
+    Queue a change of every submission in ``queryset`` to ``status`` and
+    return its BulkOperation. The ids are taken now, in chunks of
+    BULK_OPERATION_CHUNK_SIZE; the worker applies one chunk per transaction,
+    so no write lock is held for longer than one chunk.
+    """
+    size = settings.BULK_OPERATION_CHUNK_SIZE
+    # Read before the transaction: with IMMEDIATE transactions SQLite would
+    # hold the write lock for the whole scan
+    ids = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=size)
+    chunks = []
+    while batch := list(islice(ids, size)):
+        chunks.append(batch)
+
+    with transaction.atomic():
+        operation = BulkOperation.objects.create(
+            status=status, user=user, total=sum(len(chunk) for chunk in chunks),
+            state='pending' if chunks else 'done', finished_at=None if chunks else timezone.now(),
+        )
+        BulkOperationChunk.objects.bulk_create(
+            [BulkOperationChunk(operation=operation, ids=chunk) for chunk in chunks], batch_size=100
+        )
+    if chunks:
+        transaction.on_commit(worker.submit)
+    return operation
+
+
+def apply_chunk(chunk_pk):
+    """
+    Apply one chunk. Skipped if it's already done, so a chunk picked up
+    again after a crash, or by the worker of another process, is never
+    applied twice.
+    """
+    with transaction.atomic():
+        # Claimed by the UPDATE, whose row lock makes a concurrent claim wait
+        # and then match nothing; reading done=False first would let both in
+        if not BulkOperationChunk.objects.filter(pk=chunk_pk, done=False).update(done=True):
+            return
+        chunk = BulkOperationChunk.objects.select_related('operation__user').get(pk=chunk_pk)
+        operation = chunk.operation
+        changed = set_status(chunk.ids, operation.status, user=operation.user)
+        BulkOperation.objects.filter(pk=operation.pk).update(
+            state='running', processed=F('processed') + len(chunk.ids), changed=F('changed') + len(changed)
+        )
+
+
+def next_chunk():
+    """The first chunk still to apply, oldest operation first"""
+    return (
+        BulkOperationChunk.objects.filter(done=False, operation__state__in=('pending', 'running'))
+        .order_by('operation_id', 'pk').values_list('pk', 'operation_id').first()
+    )
+
+
+def finish_operations():
+    """Mark the operations that have no chunks left as done"""
+    BulkOperation.objects.filter(state__in=('pending', 'running')).exclude(chunks__done=False).update(
+        state='done', finished_at=timezone.now()
+    )
+
+
+def pending_operations():
+    return BulkOperation.objects.filter(state__in=('pending', 'running'))
+
+
+class BulkOperationWorker(BackgroundWorker):
+    """
+    Apply bulk operations one chunk at a time. The chunks are the queue,
+    so work left by a crashed process is picked up by the next start().
+    """
+    name = 'bulk-operations'
+    interval = 5.0
+
+    def submit(self):
+        if settings.BULK_OPERATIONS_AUTOSTART:
+            self.start()
+            self.wake()
+
+    def run_once(self):
+        row = next_chunk()
+        if row is None:
+            finish_operations()
+            return False
+        chunk_pk, operation_pk = row
+        try:
+            apply_chunk(chunk_pk)
+        except Exception as e:
+            logger.exception('Bulk operation %d failed', operation_pk)
+            BulkOperation.objects.filter(pk=operation_pk).update(
+                state='failed', error=str(e), finished_at=timezone.now()
+            )
+        return True
+
+
+worker = BulkOperationWorker()
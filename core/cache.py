@@ -0,0 +1,242 @@
+# cache.py
+import asyncio
+import time
+import weakref
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from .routers import use_primary
+
+VERSION_KEY_PREFIX = 'core:version'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CORE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    return f'{VERSION_KEY_PREFIX}:{model._meta.label_lower}'
+
+
+def _version_timeout():
+    """
+    Versions live until bumped in a shared cache. In a per-process one
+    (LocMem) a bump only reaches the worker that made it, so versions
+    expire after CORE_CACHE_LOCAL_VERSION_TIMEOUT seconds instead, and
+    the other workers start a fresh one.
+    """
+    if isinstance(get_cache(), (LocMemCache, DummyCache)):
+        return settings.CORE_CACHE_LOCAL_VERSION_TIMEOUT
+    return None
+
+
+def get_model_version(model):
+    """
+    Return the current cache version for a model.
+
+    Versions start from a millisecond timestamp rather than 1 so that an
+    evicted version key never brings back entries from an older version.
+    """
+    cache = get_cache()
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), _version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def bump_model_version(model):
+    """Invalidate every cache entry built from this model"""
+    cache = get_cache()
+    key = _version_key(model)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing or evicted: start a fresh version
+        version = int(time.time() * 1000)
+        cache.set(key, version, _version_timeout())
+        return version
+
+
+def versioned_key(prefix, models, *parts):
+    """Build a cache key that changes whenever one of the models changes"""
+    versions = '.'.join(str(get_model_version(model)) for model in models)
+    suffix = ':'.join(str(part) for part in parts)
+    return f'core:{prefix}:{versions}:{suffix}'
+
+
+class InProcessAsyncCache:
+    """LocMem and dummy caches never block, so async callers use them directly"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+    async def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return self.cache.add(key, value, timeout)
+
+    async def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.cache.set(key, value, timeout)
+
+    async def incr(self, key, delta=1):
+        return self.cache.incr(key, delta)
+
+
+class AsyncRedisCache:
+    """
+    Native asyncio access to the same keys as Django's RedisCache (same key
+    function and serializer), which itself only offers ``aget()`` and
+    friends through a thread pool. Clients are per event loop.
+    """
+
+    def __init__(self, cache):
+        import redis.asyncio
+
+        self.cache = cache
+        self.redis = redis.asyncio
+        self.serializer = cache._cache._serializer
+        self._clients = weakref.WeakKeyDictionary()
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = self.redis.Redis.from_url(self.cache._servers[0])
+        return client
+
+    async def get(self, key, default=None):
+        value = await self.client().get(self.cache.make_and_validate_key(key))
+        return default if value is None else self.serializer.loads(value)
+
+    async def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        key = self.cache.make_and_validate_key(key)
+        timeout = self.cache.get_backend_timeout(timeout)
+        value = self.serializer.dumps(value)
+        if timeout == 0:
+            return False
+        return bool(await self.client().set(key, value, ex=timeout, nx=True))
+
+    async def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        key = self.cache.make_and_validate_key(key)
+        timeout = self.cache.get_backend_timeout(timeout)
+        if timeout == 0:
+            await self.client().delete(key)
+        else:
+            await self.client().set(key, self.serializer.dumps(value), ex=timeout)
+
+    async def incr(self, key, delta=1):
+        key = self.cache.make_and_validate_key(key)
+        client = self.client()
+        if not await client.exists(key):
+            raise ValueError(f"Key '{key}' not found.")
+        return await client.incr(key, delta)
+
+
+class ThreadedAsyncCache(InProcessAsyncCache):
+    """Any other backend, through Django's thread-pool ``a*`` methods"""
+
+    async def get(self, key, default=None):
+        return await self.cache.aget(key, default)
+
+    async def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return await self.cache.aadd(key, value, timeout)
+
+    async def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        await self.cache.aset(key, value, timeout)
+
+    async def incr(self, key, delta=1):
+        return await self.cache.aincr(key, delta)
+
+
+_async_caches = {}
+
+
+def get_async_cache():
+    """
+    The core cache for async views, without a thread hop where possible.
+    Built once per alias: Django hands every request its own cache instance,
+    which would mean a new Redis connection pool per request.
+    """
+    alias = getattr(settings, 'CORE_CACHE_ALIAS', 'default')
+    async_cache = _async_caches.get(alias)
+    if async_cache is None:
+        cache = get_cache()
+        if isinstance(cache, RedisCache):
+            async_cache = AsyncRedisCache(cache)
+        elif isinstance(cache, (LocMemCache, DummyCache)):
+            async_cache = InProcessAsyncCache(cache)
+        else:
+            async_cache = ThreadedAsyncCache(cache)
+        _async_caches[alias] = async_cache
+    return async_cache
+
+
+@receiver(setting_changed)
+def reset_async_caches(setting, **kwargs):
+    if setting in ('CACHES', 'CORE_CACHE_ALIAS'):
+        _async_caches.clear()
+
+
+async def aget_model_version(model):
+    """Async get_model_version()"""
+    cache = get_async_cache()
+    key = _version_key(model)
+    version = await cache.get(key)
+    if version is None:
+        await cache.add(key, int(time.time() * 1000), _version_timeout())
+        version = await cache.get(key)
+    return version
+
+
+async def aversioned_key(prefix, models, *parts):
+    """Async versioned_key()"""
+    versions = '.'.join([str(await aget_model_version(model)) for model in models])
+    suffix = ':'.join(str(part) for part in parts)
+    return f'core:{prefix}:{versions}:{suffix}'
+
+
+class VersionedCacheMixin:
+    """
+    Cache serialized responses of a read-only view under a key carrying the
+    version of every model in ``cache_models``. Saving or deleting one of
+    those models bumps its version; entries of older versions expire after
+    CORE_CACHE_TIMEOUT seconds.
+
+    The key holds the URL kwargs and only the query parameters named in
+    ``cache_query_params``, so made-up query strings share one entry.
+    """
+    cache_models = ()
+    cache_prefix = None
+    cache_query_params = ()
+
+    def get_cache_key(self, request):
+        prefix = self.cache_prefix or self.__class__.__name__
+        return versioned_key(
+            prefix, self.cache_models,
+            *(f'{k}={v}' for k, v in sorted(self.kwargs.items())),
+            *(f'{name}={request.GET.get(name, "")}' for name in self.cache_query_params),
+        )
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            return Response(cached)
+
+        with use_primary():  # Cached until the next version, so not from a lagging replica
+            response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CORE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,54 @@
+# compression.py
+import gzip
+import re
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _gzip(content):
+    # mtime=0 so the same content always compresses to the same bytes
+    return gzip.compress(content, compresslevel=settings.RESPONSE_COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY)
+
+
+# Preferred first
+ENCODERS = {'gzip': _gzip}
+if brotli is not None:
+    ENCODERS = {'br': _brotli, **ENCODERS}
+
+_coding_re = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    The encoding to use for an Accept-Encoding header: the one the client
+    weighs highest, our own preference breaking ties; None for identity
+    """
+    weights = {}
+    for coding in accept_encoding.split(','):
+        match = _coding_re.match(coding)
+        if match is None:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] is not None else 1.0
+        except ValueError:
+            continue
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODERS:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(content, encoding):
+    return ENCODERS[encoding](content)
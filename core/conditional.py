@@ -0,0 +1,73 @@
+# conditional.py
+import hashlib
+from abc import ABC, abstractmethod
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def compute_validators(queryset, salt=''):
+    """
+    Return ``(etag, last_modified)`` for a queryset from ``max(updated_at)``
+    and the row count, so deleting or deactivating a row changes the
+    ETag even when no remaining row was touched.
+    """
+    result = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'), count=Count('pk')
+    )
+    return _validators(result, salt)
+
+
+async def acompute_validators(queryset, salt=''):
+    """Async compute_validators()"""
+    result = await queryset.order_by().aaggregate(
+        last_modified=Max('updated_at'), count=Count('pk')
+    )
+    return _validators(result, salt)
+
+
+def _validators(result, salt):
+    last_modified = result['last_modified']
+    stamp = last_modified.isoformat() if last_modified else ''
+    digest = hashlib.sha1(f"{salt}:{stamp}:{result['count']}".encode()).hexdigest()
+    return f'"{digest}"', last_modified
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    Return a 304 (or 412) response if the request's validators match, else
+    None. ``finish_conditional_response()`` adds the headers to the response
+    that is sent instead.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def finish_conditional_response(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(int(last_modified.timestamp())))
+    return response
+
+
+class ConditionalGetMixin(ABC):
+    """
+    Answer GET requests with a matching If-None-Match/If-Modified-Since with
+    a 304 before the view serializes anything, and add ETag and
+    Last-Modified headers to full responses.
+    """
+
+    @abstractmethod
+    def get_validators(self):
+        """Return ``(etag, last_modified)``, or ``(None, None)`` to skip"""
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return finish_conditional_response(response, etag, last_modified)
@@ -0,0 +1,151 @@
+# images.py
+import hashlib
+import logging
+import queue
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_model_version
+from .models import Testimonial
+from .workers import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_DIR = 'testimonials/derived'
+
+FORMATS = {
+    # format: (extension, Pillow save options)
+    'webp': ('webp', {'method': 4}),
+    'jpeg': ('jpg', {'optimize': True, 'progressive': True}),
+}
+
+
+def get_storage():
+    return Testimonial._meta.get_field('client_image').storage
+
+
+def derivative_widths(width):
+    """The configured widths up to the original's, or the original's alone if smaller"""
+    widths = sorted(w for w in settings.IMAGE_DERIVATIVE_WIDTHS if w <= width)
+    return widths or [width]
+
+
+def prepare(image, image_format):
+    """Apply the EXIF orientation, then convert to a mode ``image_format`` can store"""
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    if image_format == 'jpeg' and has_alpha:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def encode(image, width, image_format):
+    """Resize ``image`` to ``width`` and return the encoded bytes, without metadata"""
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image.copy()
+    resized.info = {}  # No EXIF, ICC profile or comments carried over
+    buffer = BytesIO()
+    resized.save(buffer, image_format.upper(), quality=settings.IMAGE_DERIVATIVE_QUALITY,
+                 **FORMATS[image_format][1])
+    return buffer.getvalue()
+
+
+def save_derivative(content, width, image_format):
+    """
+    Store ``content`` under a name derived from its hash, so the file never
+    changes and can be served with an immutable cache lifetime
+    """
+    storage = get_storage()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    name = f'{DERIVATIVE_DIR}/{digest}-{width}w.{FORMATS[image_format][0]}'
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(content))
+    return name
+
+
+def build_derivatives(field_file):
+    """
+    Return the ``client_image_variants`` value for an image: the source
+    name and, per format, the stored derivative for each width
+    """
+    variants = {'source': field_file.name, 'formats': {}}
+    with field_file.open('rb'), Image.open(field_file) as original:
+        for image_format in settings.IMAGE_DERIVATIVE_FORMATS:
+            image = prepare(original, image_format)
+            variants['formats'][image_format] = {
+                str(width): save_derivative(encode(image, width, image_format), width, image_format)
+                for width in derivative_widths(image.width)
+            }
+    return variants
+
+
+def needs_derivatives(testimonial):
+    return bool(testimonial.client_image) and (
+        testimonial.client_image_variants.get('source') != testimonial.client_image.name
+    )
+
+
+def process_testimonial(pk, force=False):
+    """
+    Build and store the derivatives of one testimonial's image. Returns
+    False if there was nothing to do.
+    """
+    testimonial = Testimonial.objects.filter(pk=pk).first()
+    if testimonial is None or not testimonial.client_image:
+        return False
+    if not force and not needs_derivatives(testimonial):
+        return False
+
+    name = testimonial.client_image.name
+    try:
+        variants = build_derivatives(testimonial.client_image)
+    except (OSError, Image.DecompressionBombError, ValueError):
+        # Recorded with no formats, so the image isn't retried on every save
+        logger.warning('Could not build derivatives of %s', name, exc_info=True)
+        variants = {'source': name, 'formats': {}}
+
+    # update(), not save(): the image may have been replaced meanwhile, and
+    # post_save would queue this testimonial again
+    updated = Testimonial.objects.filter(pk=pk, client_image=name).update(
+        client_image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        bump_model_version(Testimonial)
+        transaction.on_commit(partial(bump_model_version, Testimonial))
+    return bool(updated)
+
+
+class ImageDerivativeWorker(BackgroundWorker):
+    """Build image derivatives off the request path, one testimonial at a time"""
+    name = 'image-derivatives'
+    interval = 5.0
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue()
+
+    def submit(self, pk):
+        self.queue.put(pk)
+        if settings.IMAGE_DERIVATIVES_AUTOSTART:
+            self.start()
+            self.wake()
+
+    def run_once(self):
+        try:
+            pk = self.queue.get_nowait()
+        except queue.Empty:
+            return False
+        process_testimonial(pk)
+        return True
+
+
+worker = ImageDerivativeWorker()
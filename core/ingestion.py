@@ -0,0 +1,228 @@
+# ingestion.py
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .lookups import intern_metadata
+from .models import ContactSubmission
+from .signals import send_submissions_created
+from .stats import record_created
+from .workers import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolQueue:
+    """
+    A durable queue of contact submissions kept as one JSON file per entry.
+
+    Files are written to ``tmp/`` and renamed into ``pending/`` once fully
+    on disk, named after the time they may be claimed from. A worker claims
+    a batch by renaming files into ``inflight/`` under its pid, and deletes
+    them after the rows are committed. Entries claimed by a process that
+    died are moved back by ``recover()``; entries that failed go back by
+    ``retry()``, or to ``dead/`` once they have failed too often.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.tmp = self.directory / 'tmp'
+        self.pending = self.directory / 'pending'
+        self.inflight = self.directory / 'inflight'
+        self.dead = self.directory / 'dead'
+        for path in (self.tmp, self.pending, self.inflight, self.dead):
+            path.mkdir(parents=True, exist_ok=True)
+
+    def put(self, record, delay=0):
+        self._write(record, self.pending / f"{time.time_ns() + int(delay * 1e9)}-{record['token']}.json")
+
+    def _write(self, record, target):
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp)
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(record, tmp)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, target)
+
+    def __len__(self):
+        return sum(1 for _ in self.pending.iterdir())
+
+    def claim(self, limit):
+        """Move up to ``limit`` of the oldest due entries in flight and load them"""
+        claimed = []
+        now = time.time_ns()
+        for path in sorted(self.pending.iterdir())[:limit]:
+            if int(path.name.partition('-')[0]) > now:
+                break  # Waiting to be retried, as are all later ones
+            target = self.inflight / f'{os.getpid()}.{path.name}'
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue  # Claimed by another worker
+            with open(target) as fh:
+                claimed.append((target, json.load(fh)))
+        return claimed
+
+    def ack(self, paths):
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    def retry(self, path, record, max_attempts, delay):
+        """
+        Requeue a claimed entry that failed, ``delay`` seconds later for
+        every previous attempt, or move it to ``dead/`` after
+        ``max_attempts``. Return True if it was requeued.
+        """
+        record = {**record, 'attempts': record.get('attempts', 0) + 1}
+        if record['attempts'] >= max_attempts:
+            self._write(record, self.dead / path.name.partition('.')[2])
+            requeued = False
+        else:
+            self.put(record, delay * 2 ** (record['attempts'] - 1))
+            requeued = True
+        path.unlink(missing_ok=True)
+        return requeued
+
+    def recover(self):
+        """Requeue entries claimed by processes that are no longer running"""
+        recovered = 0
+        for path in self.inflight.iterdir():
+            pid, _, name = path.name.partition('.')
+            if int(pid) != os.getpid() and _pid_alive(int(pid)):
+                continue
+            os.replace(path, self.pending / name)
+            recovered += 1
+        return recovered
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def get_spool():
+    return SpoolQueue(settings.CONTACT_SPOOL_DIR)
+
+
+def enqueue_submission(data):
+    """Write a validated submission to the spool and return its token"""
+    token = uuid.uuid4()
+    get_spool().put({
+        'token': str(token),
+        'received_at': timezone.now().isoformat(),
+        'data': data,
+    })
+    if settings.CONTACT_SPOOL_AUTOFLUSH:
+        worker.notify()
+    return token
+
+
+def flush_spool(batch_size=None):
+    """
+    Insert one batch of spooled submissions and return how many entries
+    were taken off the queue. Entries whose token is already stored (a
+    replay after a crash between commit and ack) are skipped.
+
+    If the batch fails, its entries are inserted one by one so that one
+    bad entry does not hold back the rest; those that still fail are
+    requeued with a growing delay, and set aside in the spool's ``dead/``
+    after CONTACT_SPOOL_MAX_ATTEMPTS.
+    """
+    spool = get_spool()
+    claimed = spool.claim(batch_size or settings.CONTACT_SPOOL_BATCH_SIZE)
+    if not claimed:
+        return 0
+
+    try:
+        _insert_spooled([record for _, record in claimed])
+    except Exception:
+        if len(claimed) == 1:
+            _retry_spooled(spool, *claimed[0])
+        else:
+            logger.exception('Inserting %d spooled submissions failed, retrying one by one', len(claimed))
+            for path, record in claimed:
+                try:
+                    _insert_spooled([record])
+                except Exception:
+                    _retry_spooled(spool, path, record)
+                else:
+                    spool.ack([path])
+    else:
+        spool.ack(path for path, _ in claimed)
+    return len(claimed)
+
+
+def _retry_spooled(spool, path, record):
+    attempts = record.get('attempts', 0) + 1
+    if spool.retry(path, record, settings.CONTACT_SPOOL_MAX_ATTEMPTS, settings.CONTACT_SPOOL_RETRY_DELAY):
+        logger.exception('Spooled submission %s failed (attempt %d), requeued', record['token'], attempts)
+    else:
+        logger.exception('Spooled submission %s failed %d times, moved to dead/', record['token'], attempts)
+
+
+def _insert_spooled(records):
+    records = {record['token']: record for record in records}
+    with transaction.atomic():
+        existing = {
+            str(token) for token in ContactSubmission.objects.filter(
+                submission_token__in=list(records)
+            ).values_list('submission_token', flat=True)
+        }
+        new = {token: record for token, record in records.items() if token not in existing}
+        rows = intern_metadata([record['data'] for record in new.values()])
+        created = ContactSubmission.objects.bulk_create([
+            ContactSubmission(
+                submission_token=token,
+                created_at=parse_datetime(record['received_at']),
+                **data
+            )
+            for (token, record), data in zip(new.items(), rows)
+        ])
+        record_created(created)  # bulk_create() sends no post_save
+        send_submissions_created(created)
+
+
+class ContactIngestionWorker(BackgroundWorker):
+    name = 'contact-ingestion'
+
+    @property
+    def interval(self):
+        return settings.CONTACT_SPOOL_FLUSH_INTERVAL
+
+    def __init__(self):
+        super().__init__()
+        self.queued = 0
+
+    def start(self):
+        if not self.running:
+            get_spool().recover()
+        super().start()
+
+    def notify(self):
+        """Count a new entry; wake the worker early once a batch is ready"""
+        self.start()
+        self.queued += 1
+        if self.queued >= settings.CONTACT_SPOOL_BATCH_SIZE:
+            self.queued = 0
+            self.wake()
+
+    def run_once(self):
+        return flush_spool()
+
+
+worker = ContactIngestionWorker()
+
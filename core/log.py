@@ -0,0 +1,111 @@
+# log.py
+import atexit
+import copy
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from .metrics import registry
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                    .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Waits for room, where put_nowait() would raise
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Put records on a bounded queue that a daemon thread writes to
+    ``stream``, so logging never waits on I/O. Formatting happens on that
+    thread too. When the queue is full records are dropped and counted
+    rather than blocking the request. Stopped, and the queue flushed, at
+    interpreter exit.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = None
+        self._lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def start(self):
+        with self._lock:
+            if self.listener is None:
+                self.listener = _Listener(self.queue, self.target)
+                self.listener.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Write out everything queued so far and stop the thread"""
+        with self._lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            atexit.unregister(self.stop)
+            listener.stop()
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
+
+    def prepare(self, record):
+        # Only what can't wait: the arguments may change after the call and
+        # the traceback's frames go away. The JSON is built on the thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = (self.target.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.listener is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            registry.increment('core_log_records_dropped_total')
+
+
+def sampled(logger, rate, level=logging.DEBUG):
+    """
+    Whether to log a per-row trace: about ``rate`` of calls while ``logger``
+    is enabled for ``level``. Check it before building the message, so a
+    disabled trace costs one cached level check.
+    """
+    return logger.isEnabledFor(level) and (rate >= 1 or random.random() < rate)
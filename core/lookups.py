@@ -0,0 +1,158 @@
+# lookups.py
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import router, transaction
+from django.dispatch import receiver
+
+from .models import IPAddress, UserAgent
+
+BATCH_SIZE = 500
+
+
+class LRUCache:
+    """A mapping of at most ``max_entries`` keys that forgets the least recently used first"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def update(self, items):
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class InternTable:
+    """
+    Store each distinct value of ``model.field`` once and refer to it by
+    id. Ids and values are remembered per database in LRUs of
+    CONTACT_LOOKUP_CACHE_SIZE entries, so the usual agents cost no query.
+    Entries are only remembered once the transaction that saw them
+    commits: a rolled-back insert's id is never handed out.
+    """
+
+    def __init__(self, model, field, key_field=None, key=None):
+        self.model = model
+        self.field = field
+        self.key_field = key_field or field
+        self.key = key or (lambda value: value)
+        self.reset()
+
+    def reset(self):
+        self.ids = LRUCache(settings.CONTACT_LOOKUP_CACHE_SIZE)
+        self.values = LRUCache(settings.CONTACT_LOOKUP_CACHE_SIZE)
+
+    def ids_for(self, values):
+        """
+        Map each of ``values`` to its id, inserting the ones not seen
+        before. Empty values are left out; spellings with the same key
+        share an id. Uncached values cost one insert and one select per
+        BATCH_SIZE, whether they are new or not.
+        """
+        db = router.db_for_write(self.model)
+        ids, missing = {}, {}
+        for value in set(values):
+            if not value:
+                continue
+            pk = self.ids.get((db, value))
+            if pk is not None:
+                ids[value] = pk
+            else:
+                missing.setdefault(self.key(value), []).append(value)
+        if not missing:
+            return ids
+
+        keys = list(missing)
+        found, stored = {}, {}
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            self.model.objects.using(db).bulk_create(
+                [self.model(**self.fields(missing[key][0])) for key in batch], ignore_conflicts=True
+            )
+            rows = self.model.objects.using(db).filter(**{f'{self.key_field}__in': batch})
+            for key, pk, value in rows.values_list(self.key_field, 'pk', self.field):
+                found.update((spelling, pk) for spelling in missing[key])
+                stored[pk] = value
+        ids.update(found)
+        transaction.on_commit(partial(self.remember, db, found, stored), using=db)
+        return ids
+
+    def id_for(self, value):
+        return self.ids_for([value]).get(value)
+
+    def value_for(self, pk, using=None):
+        """The value with id ``pk``, or None for None"""
+        if pk is None:
+            return None
+        db = using or router.db_for_read(self.model)
+        value = self.values.get((db, pk))
+        if value is None:
+            value = self.model.objects.using(db).values_list(self.field, flat=True).get(pk=pk)
+            transaction.on_commit(partial(self.remember, db, {value: pk}, {pk: value}), using=db)
+        return value
+
+    def fields(self, value):
+        fields = {self.field: value}
+        if self.key_field != self.field:
+            fields[self.key_field] = self.key(value)
+        return fields
+
+    def remember(self, db, ids, values):
+        """Cache ``ids``, value to id, and ``values``, id to stored value"""
+        self.ids.update(((db, value), pk) for value, pk in ids.items())
+        self.values.update(((db, pk), value) for pk, value in values.items())
+
+
+def user_agent_digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+# The key is the address as the column stores it, IPv6 normalised
+ip_addresses = InternTable(IPAddress, 'address', key=IPAddress._meta.get_field('address').get_prep_value)
+user_agents = InternTable(UserAgent, 'value', key_field='digest', key=user_agent_digest)
+
+
+def intern_metadata(rows):
+    """
+    Return ``rows``, dicts of submission fields, with their ``ip_address``
+    and ``user_agent`` replaced by ``ip_id`` and ``agent_id``
+    """
+    ip_ids = ip_addresses.ids_for(row.get('ip_address') for row in rows)
+    agent_ids = user_agents.ids_for(row.get('user_agent') for row in rows)
+    interned = []
+    for row in rows:
+        row = dict(row)
+        row['ip_id'] = ip_ids.get(row.pop('ip_address', None))
+        row['agent_id'] = agent_ids.get(row.pop('user_agent', None))
+        interned.append(row)
+    return interned
+
+
+def reset_lookup_caches():
+    ip_addresses.reset()
+    user_agents.reset()
+
+
+@receiver(setting_changed)
+def resize_lookup_caches(setting, **kwargs):
+    if setting == 'CONTACT_LOOKUP_CACHE_SIZE':
+        reset_lookup_caches()
@@ -0,0 +1,33 @@
+# management/commands/archive_submissions.py
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.archive import CODECS, DEFAULT_CODEC, archivable_submissions, archive_submissions
+
+class Command(BaseCommand):
+    help = 'Move closed contact submissions older than CONTACT_ARCHIVE_AFTER_DAYS into compressed archive batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CONTACT_ARCHIVE_AFTER_DAYS,
+                            help='Archive closed submissions created more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=settings.CONTACT_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int,
+                            help='Stop after this many batches; run again to carry on')
+        parser.add_argument('--codec', choices=sorted(CODECS), default=DEFAULT_CODEC)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - datetime.timedelta(days=options['days'])
+        if options['dry_run']:
+            count = archivable_submissions(older_than).count()
+            self.stdout.write(f'{count} submissions would be archived')
+            return
+        moved = archive_submissions(
+            older_than, options['batch_size'], options['max_batches'], codec=options['codec']
+        )
+        left = archivable_submissions(older_than).exists()
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} submissions with {options['codec']}" + (' (more left)' if left else '')
+        ))
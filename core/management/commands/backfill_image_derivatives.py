@@ -0,0 +1,25 @@
+# management/commands/backfill_image_derivatives.py
+from django.core.management.base import BaseCommand
+from core.images import needs_derivatives, process_testimonial
+from core.models import Testimonial
+
+class Command(BaseCommand):
+    help = 'Build the resized derivatives of testimonial images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rebuild every image, e.g. after changing IMAGE_DERIVATIVE_WIDTHS'
+        )
+
+    def handle(self, *args, **options):
+        testimonials = Testimonial.objects.exclude(client_image='').exclude(client_image=None)
+        built = 0
+        for testimonial in testimonials.only('pk', 'client_image', 'client_image_variants').iterator():
+            if not options['force'] and not needs_derivatives(testimonial):
+                continue
+            if process_testimonial(testimonial.pk, force=options['force']):
+                built += 1
+                self.stdout.write(f'Built derivatives of {testimonial.client_image.name}')
+
+        self.stdout.write(self.style.SUCCESS(f'Derivatives are up to date ({built} images processed)'))
@@ -0,0 +1,303 @@
+# management/commands/benchmark.py
+import datetime
+import json
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from core.metrics import RequestStats
+from core.models import Service, Testimonial, ContactSubmission
+from core.urls import api_urlpatterns
+
+DEFAULT_VOLUMES = {'services': 100, 'testimonials': 10000, 'contacts': 1000000}
+
+CONTACT_POST = {
+    'name': 'Benchmark User',
+    'email': 'bench@example.com',
+    'phone': '555-0100',
+    'message': 'Benchmark message asking for a website quote.',
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Route:
+    """How to call one URL pattern from core/urls.py"""
+
+    def __init__(self, name, kwargs=None, params=None, method='get', data=None, authenticated=False,
+                 label=None):
+        self.name = name
+        self.label = label
+        self.kwargs = kwargs or {}
+        self.params = params or {}
+        self.method = method
+        self.data = data
+        self.authenticated = authenticated
+
+    def client(self):
+        client = APIClient(raise_request_exception=False)
+        if self.authenticated:
+            client.force_authenticate(User(username='benchmark', is_staff=True, is_superuser=True))
+        return client
+
+    def call(self, client):
+        url = reverse(self.name, kwargs=self.kwargs)
+        if self.method == 'get':
+            response = client.get(url, self.params)
+        else:
+            response = getattr(client, self.method)(url, self.data, format='json')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+
+def build_routes():
+    """One Route per pattern in core/urls.py, with arguments taken from the data"""
+    service = Service.objects.filter(is_active=True).order_by('pk').first()
+    contact = ContactSubmission.objects.order_by('-created_at').first()
+    special = {
+        'service_detail': {'kwargs': {'pk': service.pk if service else 1}},
+        'admin_contact_detail': {'kwargs': {'pk': contact.pk if contact else 1}},
+        'admin_contact_export': {
+            'kwargs': {'export_format': 'ndjson'},
+            'params': {'status': 'new', 'search': 'urgent quote'},
+        },
+        'contact_create': {'method': 'post', 'data': CONTACT_POST},
+    }
+    routes = []
+    for pattern in api_urlpatterns:
+        options = special.get(pattern.name, {})
+        authenticated = pattern.name.startswith('admin_') or pattern.name == 'metrics'
+        routes.append(Route(pattern.name, authenticated=authenticated, **options))
+        if pattern.name == 'admin_contact_list':
+            routes.append(Route(pattern.name, params={'search': 'website'}, authenticated=True))
+            routes.append(Route(pattern.name, params={'status': 'closed'}, authenticated=True))
+    return routes
+
+
+def route_label(route):
+    if route.label:
+        return route.label
+    if not route.params:
+        return route.name
+    return route.name + '?' + '&'.join(f'{key}={value}' for key, value in sorted(route.params.items()))
+
+
+def compare_reports(baseline, current, threshold):
+    """
+    Return a list of regressions of ``current`` against ``baseline``: p99
+    latency or throughput worse by more than ``threshold`` (a fraction),
+    or any increase in queries per request.
+    """
+    regressions = []
+    for label, base in baseline['routes'].items():
+        now = current['routes'].get(label)
+        if now is None:
+            continue
+        if base['p99_ms'] and now['p99_ms'] > base['p99_ms'] * (1 + threshold):
+            regressions.append(f"{label}: p99 {base['p99_ms']:.2f}ms -> {now['p99_ms']:.2f}ms")
+        if base.get('throughput_rps') and now.get('throughput_rps') is not None \
+                and now['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+            regressions.append(
+                f"{label}: throughput {base['throughput_rps']:.0f}/s -> {now['throughput_rps']:.0f}/s"
+            )
+        if now['queries_per_request'] > base['queries_per_request']:
+            regressions.append(
+                f"{label}: queries/request {base['queries_per_request']} -> {now['queries_per_request']}"
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Seed realistic volumes and benchmark every API route, sequentially and under concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=DEFAULT_VOLUMES['services'])
+        parser.add_argument('--testimonials', type=int, default=DEFAULT_VOLUMES['testimonials'])
+        parser.add_argument('--contacts', type=int, default=DEFAULT_VOLUMES['contacts'])
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per route in each phase')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Threads for the concurrent phase (0 to skip it)')
+        parser.add_argument('--routes', nargs='*', help='Only benchmark these URL names')
+        parser.add_argument('--output', default=str(Path(settings.BASE_DIR) / 'var' / 'benchmark.json'))
+        parser.add_argument('--compare', help='Baseline report to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed regression against the baseline (0.2 = 20%%)')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the benchmark database (and its seeded rows) between runs')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Run against the configured database instead of a throwaway one')
+
+    def handle(self, *args, **options):
+        if options['use_current_db']:
+            report = self.run(options)
+        else:
+            report = self.run_in_benchmark_db(options)
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Report written to {output}'))
+
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            regressions = compare_reports(baseline, report, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'REGRESSION {regression}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def run_in_benchmark_db(self, options):
+        """Create (or reuse with --keepdb) a separate database for the run"""
+        if connection.vendor == 'sqlite':
+            # A file, not the in-memory test database, so threads share it
+            path = Path(settings.BASE_DIR) / 'var' / 'benchmark.sqlite3'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            connection.settings_dict['TEST']['NAME'] = str(path)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            return self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def run(self, options):
+        self.seed(options)
+
+        # Throttling would turn most of the run into 429s. Views bind their
+        # throttle classes at import time, so switch off the check itself.
+        # The spam filter would quarantine the repeated contact POSTs.
+        with patch.object(APIView, 'check_throttles', lambda self, request: None), \
+                override_settings(CONTACT_FILTER_ENABLED=False):
+            routes = build_routes()
+            if options['routes']:
+                routes = [route for route in routes if route.name in options['routes']]
+
+            results = {}
+            for route in routes:
+                label = route_label(route)
+                result = self.measure_sequential(route, options['requests'])
+                if options['concurrency']:
+                    result.update(self.measure_concurrent(route, options['requests'], options['concurrency']))
+                results[label] = result
+                self.print_result(label, result)
+
+        return {
+            'meta': {
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'volumes': {
+                    'services': Service.objects.count(),
+                    'testimonials': Testimonial.objects.count(),
+                    'contacts': ContactSubmission.objects.count(),
+                },
+                'requests_per_route': options['requests'],
+                'concurrency': options['concurrency'],
+            },
+            'routes': results,
+        }
+
+    def seed(self, options):
+        existing = {
+            'services': Service.objects.count(),
+            'testimonials': Testimonial.objects.count(),
+            'contacts': ContactSubmission.objects.count(),
+        }
+        missing = {name: max(0, options[name] - count) for name, count in existing.items()}
+        if any(missing.values()):
+            self.stdout.write(f'Seeding {missing}...')
+            call_command('load_sample_data', stdout=self.stdout, **missing)
+
+    def measure_sequential(self, route, requests):
+        client = route.client()
+        for _ in range(min(3, requests)):  # Warm caches and snapshots
+            route.call(client)
+
+        latencies, queries, errors = [], [], 0
+        for _ in range(requests):
+            stats = RequestStats()
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(stats.sql_wrapper))
+                start = time.perf_counter()
+                response = route.call(client)
+                latencies.append(time.perf_counter() - start)
+            queries.append(stats.queries)
+            errors += response.status_code >= 500
+
+        return {
+            'status': response.status_code,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000,
+            'queries_per_request': max(queries),
+            'errors': errors,
+        }
+
+    def measure_concurrent(self, route, requests, concurrency):
+        def worker(count):
+            client = route.client()
+            latencies, errors = [], 0
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    response = route.call(client)
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code >= 500
+            finally:
+                connections.close_all()
+            return latencies, errors
+
+        shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(worker, shares))
+        wall = time.perf_counter() - start
+
+        latencies = [value for outcome in outcomes for value in outcome[0]]
+        return {
+            'concurrent_p50_ms': percentile(latencies, 0.5) * 1000,
+            'concurrent_p99_ms': percentile(latencies, 0.99) * 1000,
+            'throughput_rps': len(latencies) / wall if wall else 0.0,
+            'concurrent_errors': sum(outcome[1] for outcome in outcomes),
+        }
+
+    def print_result(self, label, result):
+        line = (
+            f"{label:<45} {result['status']:>3}  p50 {result['p50_ms']:8.2f}ms  "
+            f"p99 {result['p99_ms']:8.2f}ms  {result['queries_per_request']:>3} queries"
+        )
+        if 'throughput_rps' in result:
+            line += f"  {result['throughput_rps']:8.0f} req/s"
+        errors = result['errors'] + result.get('concurrent_errors', 0)
+        if errors:
+            line += f'  {errors} errors'
+        self.stdout.write(line)
@@ -0,0 +1,219 @@
+# management/commands/benchmark_asgi.py
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.views import APIView
+from core import async_views, cache as core_cache, views
+from core.models import Service
+from core.snapshots import snapshots
+from core.urls import build_urlconf
+from .benchmark import percentile
+
+ROUTES = ['api_overview', 'service_list', 'service_detail', 'testimonial_list', 'featured_testimonials']
+MODES = ['wsgi', 'asgi-sync', 'asgi-async']
+
+
+class InFlight:
+    """Count requests inside the application at once"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+class SlowCache:
+    """Add a fixed delay to every cache call, like a cache across the network"""
+
+    def __init__(self, cache, latency):
+        self.cache = cache
+        self.latency = latency
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def call(*args, **kwargs):
+            time.sleep(self.latency)
+            return method(*args, **kwargs)
+        return call
+
+
+class SlowAsyncCache(SlowCache):
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self.latency)
+            return await method(*args, **kwargs)
+        return call
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare one worker serving the public read API through WSGI with a '
+        'thread pool, through ASGI with the DRF views, and through ASGI with '
+        'the native async views'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', nargs='*', default=ROUTES, choices=ROUTES)
+        parser.add_argument('--modes', nargs='*', default=MODES, choices=MODES)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per route and mode')
+        parser.add_argument('--concurrency', type=int, default=64, help='Simultaneous clients')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Threads of the WSGI worker (as in gunicorn --threads)')
+        parser.add_argument('--cache-latency-ms', type=float, default=0,
+                            help='Delay added to every cache call, to model a networked cache')
+
+    def handle(self, *args, **options):
+        service = Service.objects.filter(is_active=True).order_by('pk').first()
+        kwargs = {'service_detail': {'pk': service.pk if service else 1}}
+        latency = options['cache_latency_ms'] / 1000
+        real_get_cache, real_get_async_cache = core_cache.get_cache, core_cache.get_async_cache
+
+        with patch.object(APIView, 'check_throttles', lambda self, request: None), \
+                patch.object(async_views.AsyncAPIView, 'check_throttles', self.no_throttle), \
+                patch.multiple(core_cache, get_cache=lambda: SlowCache(real_get_cache(), latency),
+                               get_async_cache=lambda: SlowAsyncCache(real_get_async_cache(), latency)), \
+                patch.object(views, 'get_cache', lambda: SlowCache(real_get_cache(), latency)), \
+                patch.object(async_views, 'get_async_cache', lambda: SlowAsyncCache(real_get_async_cache(), latency)):
+            for name in options['routes']:
+                for mode in options['modes']:
+                    urlconf = build_urlconf(['all'] if mode == 'asgi-async' else [])
+                    with override_settings(ROOT_URLCONF=urlconf, ALLOWED_HOSTS=['testserver']):
+                        path = reverse(name, kwargs=kwargs.get(name))
+                        snapshots.clear()
+                        if mode == 'wsgi':
+                            result = self.run_wsgi(path, options)
+                        else:
+                            result = asyncio.run(self.run_asgi(path, options))
+                    self.print_result(name, mode, result)
+
+    async def no_throttle(self, request):
+        pass
+
+    def run_wsgi(self, path, options):
+        handler = WSGIHandler()
+        in_flight = InFlight()
+        environ = RequestFactory()._base_environ(PATH_INFO=path, REQUEST_METHOD='GET')
+
+        def call():
+            statuses = []
+            with in_flight:
+                body = handler(dict(environ), lambda status, headers: statuses.append(status))
+                for _ in body:
+                    pass
+                body.close()
+            return int(statuses[0].split()[0])
+
+        self.run_wsgi_batch(call, min(options['concurrency'], 10), options)  # Warm up
+        in_flight.peak = 0
+        start = time.perf_counter()
+        outcomes = self.run_wsgi_batch(call, options['requests'], options)
+        return self.summarize(outcomes, time.perf_counter() - start, in_flight.peak)
+
+    def run_wsgi_batch(self, call, requests, options):
+        """
+        Keep ``concurrency`` requests outstanding against a pool of
+        ``threads``; requests waiting for a thread count the wait in their
+        latency, as they would in the server's backlog.
+        """
+        slots = threading.Semaphore(options['concurrency'])
+        outcomes = []
+
+        def finished(sent_at):
+            def callback(future):
+                outcomes.append((time.perf_counter() - sent_at, future.result()))
+                slots.release()
+            return callback
+
+        with ThreadPoolExecutor(options['threads']) as pool:
+            for _ in range(requests):
+                slots.acquire()
+                pool.submit(call).add_done_callback(finished(time.perf_counter()))
+        return outcomes
+
+    async def run_asgi(self, path, options):
+        handler = ASGIHandler()
+        in_flight = InFlight()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            async with semaphore:
+                start = time.perf_counter()
+                with in_flight:
+                    status = await self.asgi_request(handler, path)
+                return time.perf_counter() - start, status
+
+        await asyncio.gather(*(call() for _ in range(min(options['concurrency'], 10))))  # Warm up
+        in_flight.peak = 0
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        return self.summarize(outcomes, time.perf_counter() - start, in_flight.peak)
+
+    async def asgi_request(self, handler, path):
+        done = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status = None
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                done.set()
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': b'', 'root_path': '', 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        await handler(scope, receive, send)
+        return status
+
+    def summarize(self, outcomes, wall, peak):
+        latencies = [elapsed for elapsed, _ in outcomes]
+        return {
+            'throughput_rps': len(outcomes) / wall if wall else 0.0,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000,
+            'peak_in_flight': peak,
+            'errors': sum(status != 200 for _, status in outcomes),
+        }
+
+    def print_result(self, name, mode, result):
+        line = (
+            f"{name:<24} {mode:<11} {result['throughput_rps']:8.0f} req/s  "
+            f"p50 {result['p50_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+            f"{result['peak_in_flight']:>4} in flight"
+        )
+        if result['errors']:
+            line += f"  {result['errors']} errors"
+        self.stdout.write(line)
@@ -0,0 +1,64 @@
+# management/commands/benchmark_serializers.py
+import time
+
+from django.core.management.base import CommandError
+from rest_framework.settings import api_settings
+from core.models import Service, Testimonial
+from core.serializers import ServiceSerializer, TestimonialSerializer, compile_serializer
+from . import benchmark
+
+SERIALIZERS = {
+    'services': (ServiceSerializer, lambda: Service.objects.order_by('pk')),
+    'testimonials': (TestimonialSerializer, lambda: Testimonial.objects.order_by('pk')),
+}
+
+
+class Command(benchmark.Command):
+    help = 'Compare DRF and compiled serializers rendering the same rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per serializer')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per serializer; the best counts')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the benchmark database (and its seeded rows) between runs')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Run against the configured database instead of a throwaway one')
+
+    def handle(self, *args, **options):
+        options.update(services=options['rows'], testimonials=options['rows'], contacts=0)
+        if options['use_current_db']:
+            self.run(options)
+        else:
+            self.run_in_benchmark_db(options)
+
+    def run(self, options):
+        self.seed(options)
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        for name, (serializer_class, get_queryset) in SERIALIZERS.items():
+            queryset = get_queryset()[:options['rows']]
+            compiled = compile_serializer(serializer_class)
+
+            def drf():
+                return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+            def fast():
+                return renderer.render(compiled.serialize(compiled.rows(queryset.all())))
+
+            drf_time, drf_body = self.best_of(drf, options['repeat'])
+            fast_time, fast_body = self.best_of(fast, options['repeat'])
+            if fast_body != drf_body:
+                raise CommandError(f'{name}: compiled output differs from {serializer_class.__name__}')
+
+            rows = queryset.count()
+            self.stdout.write(
+                f'{name:<14} {rows:>7} rows  drf {drf_time / rows * 1e6:7.2f}us/row  '
+                f'compiled {fast_time / rows * 1e6:7.2f}us/row  {drf_time / fast_time:5.1f}x'
+            )
+
+    def best_of(self, render, repeat):
+        best, body = float('inf'), None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            body = render()
+            best = min(best, time.perf_counter() - start)
+        return best, body
@@ -0,0 +1,131 @@
+# management/commands/explain_endpoints.py
+import base64
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.snapshots import snapshots
+
+# (url name, url kwargs, query params) for every read path worth checking
+PROBES = [
+    ('service_list', {}, {}),
+    ('service_detail', {'pk': 1}, {}),
+    ('testimonial_list', {}, {}),
+    ('featured_testimonials', {}, {}),
+    ('admin_contact_list', {}, {}),
+    ('admin_contact_list', {}, {'status': 'new'}),
+    ('admin_contact_list', {}, {'search': 'website'}),
+    ('admin_contact_list', {}, {'cursor': 'deep'}),
+    ('admin_contact_list', {}, {'status': 'new', 'cursor': 'deep'}),
+    ('admin_contact_detail', {'pk': 1}, {}),
+]
+
+
+def deep_cursor():
+    """A cursor pointing far into the contact list, to check the seek plan"""
+    payload = {'v': [timezone.now().isoformat(), 2 ** 62], 'p': False}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def find_problems(vendor, plan):
+    """Return ``(full_scans, sorts)`` found in an EXPLAIN output"""
+    scans, sorts = [], []
+    for line in plan:
+        detail = line.strip()
+        if vendor == 'sqlite':
+            if detail.startswith('SCAN sqlite_'):
+                continue  # Schema introspection
+            if detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail:
+                scans.append(detail)
+            elif detail.startswith('USE TEMP B-TREE'):
+                sorts.append(detail)
+        elif vendor == 'postgresql':
+            if 'Seq Scan on pg_' in detail:
+                continue
+            if 'Seq Scan on' in detail:
+                scans.append(detail)
+            elif detail.lstrip('-> ').startswith('Sort '):
+                sorts.append(detail)
+    return scans, sorts
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the queries of every read endpoint and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Exit with an error if any query does a full table scan'
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full plan of every query'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'EXPLAIN parsing is not supported on {connection.vendor}')
+
+        user = User(username='explain', is_staff=True, is_superuser=True)
+        factory = APIRequestFactory()
+        total_scans = 0
+
+        # Bypass the caches and snapshots so every query actually runs
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy_cache, SNAPSHOT_DIR=None):
+            for name, kwargs, params in PROBES:
+                if params.get('cursor') == 'deep':
+                    params = {**params, 'cursor': deep_cursor()}
+                path = reverse(name, kwargs=kwargs)
+                request = factory.get(path, params)
+                force_authenticate(request, user=user)
+
+                snapshots.clear()
+                queries = []
+                with connection.execute_wrapper(self.capture(queries)):
+                    match = resolve(path)
+                    match.func(request, **match.kwargs)
+
+                label = name + (f" {sorted(k for k in params)}" if params else '')
+                self.stdout.write(f'{label}: {len(queries)} queries')
+                for sql, query_params in queries:
+                    plan = self.explain(sql, query_params)
+                    scans, sorts = find_problems(connection.vendor, plan)
+                    total_scans += len(scans)
+                    for detail in scans:
+                        self.stdout.write(self.style.ERROR(f'  FULL SCAN: {detail}'))
+                        self.stdout.write(f'    {sql[:200]}')
+                    for detail in sorts:
+                        self.stdout.write(self.style.WARNING(f'  sort: {detail}'))
+                    if options['verbose_plans']:
+                        for line in plan:
+                            self.stdout.write(f'    {line}')
+        snapshots.clear()
+
+        if total_scans and options['fail_on_scan']:
+            raise CommandError(f'{total_scans} full table scans found')
+        if total_scans:
+            self.stdout.write(self.style.WARNING(f'{total_scans} full table scans found'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full table scans'))
+
+    def capture(self, queries):
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def explain(self, sql, params):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        if connection.vendor == 'sqlite':
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
@@ -0,0 +1,27 @@
+# management/commands/export_contacts.py
+from django.core.management.base import BaseCommand
+from core.exports import DEFAULT_CHUNK_SIZE, EXPORTERS, export_contact_submissions
+from core.models import ContactSubmission
+from core.search import filter_contact_submissions
+
+class Command(BaseCommand):
+    help = 'Stream contact submissions to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORTERS), default='csv')
+        parser.add_argument('--status', help='Only export submissions with this status')
+        parser.add_argument('--search', help='Only export submissions matching this search')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = filter_contact_submissions(ContactSubmission.objects.all(), options)
+        chunks = export_contact_submissions(queryset, options['format'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+                fh.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Exported to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,28 @@
+# management/commands/flush_contact_spool.py
+from django.core.management.base import BaseCommand
+from core.ingestion import flush_spool, get_spool
+
+class Command(BaseCommand):
+    help = 'Insert every spooled contact submission into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Rows per bulk insert (default: CONTACT_SPOOL_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+        recovered = spool.recover()
+        if recovered:
+            self.stdout.write(f'Requeued {recovered} submissions left in flight')
+
+        total = 0
+        while True:
+            flushed = flush_spool(options['batch_size'])
+            if not flushed:
+                break
+            total += flushed
+            self.stdout.write(f'Flushed {flushed} submissions')
+
+        self.stdout.write(self.style.SUCCESS(f'Spool is empty ({total} submissions flushed)'))
@@ -1,12 +1,106 @@
 # management/commands/load_sample_data.py
+import datetime
+import random
+
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import Service, Testimonial
+from core.cache import bump_model_version
+from core.lookups import ip_addresses, user_agents
+from core.models import Service, Testimonial, ContactSubmission
+from core.stats import rebuild_counters
+
+FIRST_NAMES = ['Sarah', 'Michael', 'Emily', 'David', 'Lisa', 'James', 'Anna', 'Robert', 'Maria', 'Tom']
+LAST_NAMES = ['Johnson', 'Chen', 'Rodriguez', 'Wilson', 'Thompson', 'Smith', 'Brown', 'Garcia', 'Lee', 'Martin']
+COMPANIES = ['Tech Innovations Inc.', 'Digital Solutions Ltd.', 'StartUp Hub', 'E-commerce Plus', 'Creative Agency']
+WORDS = (
+    'website mobile app design seo marketing budget launch redesign store brand '
+    'campaign analytics hosting migration support quote timeline project urgent'
+).split()
+USER_AGENTS = [
+    f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/{v}.0 Safari/537.36'
+    for v in range(100, 140)
+] + ['python-requests/2.31.0', 'curl/8.4.0']
+IP_POOL_SIZE = 2000  # Repeat visitors, like bots
+STATUS_WEIGHTS = [('new', 20), ('in_progress', 10), ('replied', 30), ('closed', 40)]
 
 class Command(BaseCommand):
     help = 'Load sample data for services and testimonials'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=0,
+                            help='Also generate this many synthetic services')
+        parser.add_argument('--testimonials', type=int, default=0,
+                            help='Also generate this many synthetic testimonials')
+        parser.add_argument('--contacts', type=int, default=0,
+                            help='Also generate this many synthetic contact submissions')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed, so generated volumes are reproducible')
+
     def handle(self, *args, **options):
+        self.load_fixtures()
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        if options['services']:
+            self.generate(Service, options['services'], batch_size, lambda i: self.make_service(rng, i))
+        if options['testimonials']:
+            self.generate(Testimonial, options['testimonials'], batch_size, lambda i: self.make_testimonial(rng, i))
+        if options['contacts']:
+            now = timezone.now()
+            ips = sorted(ip_addresses.ids_for(
+                f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}' for _ in range(IP_POOL_SIZE)
+            ).values())
+            agents = sorted(user_agents.ids_for(USER_AGENTS).values())
+            self.generate(ContactSubmission, options['contacts'], batch_size,
+                          lambda i: self.make_contact(rng, i, now, ips, agents))
+            # bulk_create() skips the signals that keep the stats counters up to date
+            counters = rebuild_counters()
+            self.stdout.write(f'Rebuilt {len(counters)} submission counter rows')
+
+    def generate(self, model, count, batch_size, make):
+        """Bulk insert ``count`` generated rows in batches"""
+        for start in range(0, count, batch_size):
+            model.objects.bulk_create([make(i) for i in range(start, min(start + batch_size, count))])
+            self.stdout.write(f'Generated {min(start + batch_size, count)}/{count} {model._meta.verbose_name_plural}')
+        # bulk_create sends no post_save, so invalidate cached reads here
+        bump_model_version(model)
+
+    def make_service(self, rng, i):
+        return Service(
+            title=f'Service {i}',
+            description=' '.join(rng.choices(WORDS, k=30)),
+            icon='fa-star',
+            is_active=rng.random() < 0.9,
+            order=i,
+        )
+
+    def make_testimonial(self, rng, i):
+        return Testimonial(
+            client_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            client_company=rng.choice(COMPANIES),
+            client_position='Manager',
+            testimonial_text=' '.join(rng.choices(WORDS, k=40)),
+            rating=rng.randint(3, 5),
+            is_featured=rng.random() < 0.05,
+            is_active=rng.random() < 0.95,
+        )
+
+    def make_contact(self, rng, i, now, ips, agents):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        statuses, weights = zip(*STATUS_WEIGHTS)
+        return ContactSubmission(
+            name=f'{first} {last}',
+            email=f'{first.lower()}.{last.lower()}{i}@example.com',
+            phone=f'555-{rng.randint(1000, 9999)}',
+            message=' '.join(rng.choices(WORDS, k=rng.randint(10, 80))),
+            status=rng.choices(statuses, weights)[0],
+            ip_id=rng.choice(ips),
+            agent_id=rng.choice(agents),
+            created_at=now - datetime.timedelta(seconds=rng.randint(0, 365 * 86400)),
+        )
+
+    def load_fixtures(self):
         self.stdout.write('Loading sample data...')
         
         # Create sample services
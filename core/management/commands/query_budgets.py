@@ -0,0 +1,88 @@
+# management/commands/query_budgets.py
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from rest_framework.views import APIView
+from core.budgets import budget_usage, check_query_budget, get_query_budget
+from core.metrics import RequestStats
+from core.snapshots import snapshots
+from .benchmark import Route, build_routes, route_label
+
+
+def budget_routes():
+    """The benchmark routes, plus the write paths that have budgets too"""
+    routes = build_routes()
+    detail = next(route for route in routes if route.name == 'admin_contact_detail')
+    routes.append(Route(
+        'admin_contact_detail', kwargs=detail.kwargs, method='patch', data={'status': 'replied'},
+        authenticated=True, label='admin_contact_detail PATCH'
+    ))
+    return routes
+
+
+def measure_route(route, requests):
+    """
+    Call ``route`` once with cold caches, then ``requests`` more times, and
+    return the worst ``(queries, sql_time)`` seen
+    """
+    cache.clear()
+    snapshots.clear()
+    client = route.client()
+    worst_queries, worst_sql_time = 0, 0.0
+    for _ in range(requests + 1):
+        stats = RequestStats()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats.sql_wrapper))
+            route.call(client)
+        worst_queries = max(worst_queries, stats.queries)
+        worst_sql_time = max(worst_sql_time, stats.sql_time)
+    return worst_queries, worst_sql_time
+
+
+class Command(BaseCommand):
+    help = 'Measure every endpoint against its @query_budget, closest to the limit first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5,
+                            help='Warm requests per route after the cold one')
+        parser.add_argument('--fail', action='store_true',
+                            help='Exit with an error if a route is over budget or has none')
+
+    def handle(self, *args, **options):
+        rows, failures = [], []
+        # Views bind their throttle classes at import time, so switch off the
+        # check itself; the spam filter would quarantine repeated POSTs
+        with patch.object(APIView, 'check_throttles', lambda self, request: None), \
+                override_settings(CONTACT_FILTER_ENABLED=False):
+            for route in budget_routes():
+                label = route_label(route)
+                budget = get_query_budget(resolve(reverse(route.name, kwargs=route.kwargs)).func)
+                if budget is None:
+                    failures.append(f'{label}: no @query_budget')
+                    continue
+                queries, sql_time = measure_route(route, options['requests'])
+                problems = check_query_budget(budget, queries, sql_time)
+                failures.extend(f'{label}: {problem}' for problem in problems)
+                rows.append((budget_usage(budget, queries, sql_time), label, budget, queries, sql_time))
+
+        rows.sort(key=lambda row: row[0], reverse=True)
+        for usage, label, budget, queries, sql_time in rows:
+            sql_budget = f'{budget.sql_ms}ms' if budget.sql_ms is not None else '-'
+            line = (
+                f'{label:<55} {usage:5.0%}  queries {queries:>2}/{budget.queries:<2}  '
+                f'sql {sql_time * 1000:7.2f}ms/{sql_budget}'
+            )
+            self.stdout.write(self.style.ERROR(line) if usage > 1 else line)
+
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(f'FAIL {failure}'))
+        if failures and options['fail']:
+            raise CommandError(f'{len(failures)} query budget failures')
+        if not failures:
+            self.stdout.write(self.style.SUCCESS('All endpoints within their query budgets'))
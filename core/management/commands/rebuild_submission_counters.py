@@ -0,0 +1,13 @@
+# management/commands/rebuild_submission_counters.py
+from django.core.management.base import BaseCommand
+from core.stats import rebuild_counters
+
+class Command(BaseCommand):
+    help = 'Recompute the per-day, per-status contact submission counters from the submissions'
+
+    def handle(self, *args, **options):
+        counters = rebuild_counters()
+        total = sum(counter.count for counter in counters)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(counters)} counter rows covering {total} submissions'
+        ))
@@ -0,0 +1,25 @@
+# management/commands/run_bulk_operations.py
+from django.core.management.base import BaseCommand
+from core.bulk import pending_operations, worker
+from core.models import BulkOperation
+
+class Command(BaseCommand):
+    help = 'Apply the remaining chunks of every unfinished bulk operation, e.g. after a crash'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Also resume operations stopped by an error, from their first unapplied chunk'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = BulkOperation.objects.filter(state='failed').update(state='running', error='', finished_at=None)
+            if retried:
+                self.stdout.write(f'Retrying {retried} failed operations')
+
+        for operation in pending_operations():
+            self.stdout.write(f'Resuming: {operation} at {operation.processed}/{operation.total}')
+        worker.drain()
+
+        self.stdout.write(self.style.SUCCESS('No bulk operations left to run'))
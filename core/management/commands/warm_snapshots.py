@@ -0,0 +1,25 @@
+# management/commands/warm_snapshots.py
+from django.core.management.base import BaseCommand, CommandError
+from core.snapshots import snapshots
+
+class Command(BaseCommand):
+    help = 'Render the pre-rendered JSON snapshots served by the public list endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Snapshots to render (default: all of them)'
+        )
+
+    def handle(self, *args, **options):
+        names = options['names']
+        unknown = set(names) - set(snapshots.specs)
+        if unknown:
+            raise CommandError(f"Unknown snapshots: {', '.join(sorted(unknown))}")
+
+        for snapshot in snapshots.warm(names):
+            self.stdout.write(
+                f'Rendered {snapshot.name} (version {snapshot.version}, {len(snapshot.body)} bytes)'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Snapshots are warm'))
@@ -0,0 +1,252 @@
+# metrics.py
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SUB_BUCKETS = 32  # per power of two, i.e. ~3% relative error
+
+# Prometheus histogram families: (help, unit scale, exported bucket bounds)
+HISTOGRAMS = {
+    'core_http_request_duration_seconds': (
+        'Wall time spent handling a request',
+        1e6, [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    ),
+    'core_db_query_duration_seconds': (
+        'Total SQL time per request',
+        1e6, [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5],
+    ),
+    'core_db_queries_per_request': (
+        'Number of SQL queries per request',
+        1, [0, 1, 2, 3, 5, 10, 20, 50, 100],
+    ),
+    'core_serializer_duration_seconds': (
+        'Time spent in DRF serializers per request',
+        1e6, [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1],
+    ),
+    'core_http_response_size_bytes': (
+        'Response body size',
+        1, [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304],
+    ),
+}
+COUNTERS = {
+    'core_http_requests_total': 'Requests handled',
+    'core_query_budget_exceeded_total': 'Requests that went over their query budget',
+    'core_throttle_fallback_total': 'Throttle checks made in-process because Redis failed',
+    'core_contact_filtered_total': 'Contact submissions rejected or quarantined instead of stored',
+    'core_log_records_dropped_total': 'Log records dropped because the logging queue was full',
+}
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+class Histogram:
+    """
+    An HDR-style histogram with log-linear buckets: every power of two is
+    split into SUB_BUCKETS equal buckets, so memory stays bounded while
+    quantiles keep a fixed relative precision from microseconds to minutes.
+    """
+
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket_index(units):
+        if units < 1:
+            return 0
+        exponent = int(math.log2(units))
+        sub = int((units / 2 ** exponent - 1) * SUB_BUCKETS)
+        return 1 + exponent * SUB_BUCKETS + min(sub, SUB_BUCKETS - 1)
+
+    @staticmethod
+    def bucket_lower(index):
+        if index == 0:
+            return 0
+        exponent, sub = divmod(index - 1, SUB_BUCKETS)
+        return 2 ** exponent * (1 + sub / SUB_BUCKETS)
+
+    @staticmethod
+    def bucket_upper(index):
+        if index == 0:
+            return 1
+        exponent, sub = divmod(index - 1, SUB_BUCKETS)
+        return 2 ** exponent * (1 + (sub + 1) / SUB_BUCKETS)
+
+    def record(self, value):
+        index = self.bucket_index(value * self.scale)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    return min(self.bucket_upper(index) / self.scale, self.max)
+            return self.max
+
+    def cumulative(self, bounds):
+        """
+        Counts of values at or below each bound, for Prometheus buckets. A
+        bucket counts towards a bound once its lower edge is within it, so
+        the counts are exact for integers and within a bucket otherwise.
+        """
+        with self._lock:
+            items = sorted(self.counts.items())
+        return [
+            sum(n for index, n in items if self.bucket_lower(index) <= bound * self.scale)
+            for bound in bounds
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(HISTOGRAMS[name][1]))
+        histogram.record(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def get_counter(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def get_histogram(self, name, **labels):
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+        lines = []
+        counter_names = sorted({name for (name, _), _ in counters})
+        for name in counter_names:
+            lines.append(f'# HELP {name} {COUNTERS.get(name, name)}')
+            lines.append(f'# TYPE {name} counter')
+            for (metric, labels), value in counters:
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+
+        histogram_names = sorted({name for (name, _), _ in histograms})
+        for name in histogram_names:
+            help_text, _, bounds = HISTOGRAMS[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), histogram in histograms:
+                if metric != name:
+                    continue
+                for bound, count in zip(bounds, histogram.cumulative(bounds)):
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {count}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(histogram.total)}')
+                lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+
+            # Quantiles from the full-resolution histogram, as a gauge family
+            lines.append(f'# HELP {name}_quantile {help_text} (quantile estimate)')
+            lines.append(f'# TYPE {name}_quantile gauge')
+            for (metric, labels), histogram in histograms:
+                if metric == name:
+                    for q in QUANTILES:
+                        value = _number(histogram.quantile(q))
+                        lines.append(f'{name}_quantile{_labels(labels + (("quantile", str(q)),))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+registry = MetricsRegistry()
+
+
+class RequestStats:
+    """Per-request counters filled in by the SQL wrapper and timed_serializer()"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+current_stats = ContextVar('core_request_stats', default=None)
+
+
+def record_sql(execute, sql, params, many, context):
+    """Count the query towards the current request, if there is one"""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.sql_wrapper(execute, sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Put record_sql on every connection as it opens. Async views query from
+    sync_to_async threads, on their own connections, which the
+    current_stats context variable follows but a wrapper installed by the
+    middleware on the event loop's connections would not.
+    """
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+@contextmanager
+def timed_serializer():
+    """Add the time spent in the block to the current request's serializer time"""
+    stats = current_stats.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += time.perf_counter() - start
@@ -0,0 +1,235 @@
+# middleware.py
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .budgets import check_query_budget, get_query_budget
+from .compression import compress, negotiate_encoding
+from .metrics import RequestStats, current_stats, registry
+from .routers import request_routing
+
+logger = logging.getLogger(__name__)
+
+# cProfile can't run two profilers at once, so only one request is sampled at a time
+_profiler_lock = threading.Lock()
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, SQL query count and time, serializer time and
+    response size per view name into the in-process metrics registry,
+    exposed by the metrics endpoint. A sample of requests runs under
+    cProfile and requests slower than REQUEST_PROFILING_SLOW_MS keep their
+    profile in REQUEST_PROFILING_DIR. With QUERY_BUDGET_WARNINGS on,
+    requests over their view's query budget (core/budgets.py) are logged.
+    Queries are counted by record_sql (core/metrics.py), which sits on
+    every connection, those of async views' worker threads included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        profiler = self.start_profiler()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_stats.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                _profiler_lock.release()
+
+        view = self.record(request, response, stats, elapsed)
+        if profiler is not None and elapsed * 1000 >= settings.REQUEST_PROFILING_SLOW_MS:
+            self.dump_profile(profiler, view, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        # Not profiled: cProfile would also see every other request
+        # interleaved on the event loop
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_stats.reset(token)
+
+        self.record(request, response, stats, elapsed)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        view = self.get_view_name(request)
+        registry.increment('core_http_requests_total', view=view, status=response.status_code)
+        registry.observe('core_http_request_duration_seconds', elapsed, view=view)
+        registry.observe('core_db_queries_per_request', stats.queries, view=view)
+        registry.observe('core_db_query_duration_seconds', stats.sql_time, view=view)
+        registry.observe('core_serializer_duration_seconds', stats.serializer_time, view=view)
+        if not response.streaming:
+            registry.observe('core_http_response_size_bytes', len(response.content), view=view)
+        if settings.QUERY_BUDGET_WARNINGS:
+            self.check_budget(request, view, stats)
+        return view
+
+    def get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match is not None else 'unmatched'
+
+    def check_budget(self, request, view, stats):
+        match = getattr(request, 'resolver_match', None)
+        budget = get_query_budget(match.func) if match is not None else None
+        if budget is None:
+            return
+        problems = check_query_budget(budget, stats.queries, stats.sql_time)
+        if problems:
+            registry.increment('core_query_budget_exceeded_total', view=view)
+            logger.warning('%s %s over query budget: %s', request.method, view, ', '.join(problems))
+
+    def start_profiler(self):
+        rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return None
+        if not _profiler_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def dump_profile(self, profiler, view, elapsed):
+        directory = Path(settings.REQUEST_PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{view.replace(':', '-')}-{int(elapsed * 1000)}ms-{time.time_ns()}-{os.getpid()}.prof"
+        profiler.dump_stats(directory / name)
+
+
+def is_public(request, response):
+    """Whether ``response`` is JSON for a request without a session or credentials"""
+    if not response.get('Content-Type', '').startswith('application/json'):
+        return False
+    if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    user = getattr(request, 'user', None)
+    return user is None or not user.is_authenticated
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least RESPONSE_COMPRESSION_MIN_BYTES with
+    brotli (when installed) or gzip, whichever Accept-Encoding prefers.
+    Unlike GZipMiddleware it runs on the event loop under ASGI, and a
+    response can provide ``compressed_content(encoding)`` so shared
+    payloads like snapshots are compressed once rather than per request.
+    Streaming responses are sent as they are.
+
+    Only anonymous JSON is compressed: a response to a request carrying a
+    session or credentials can hold a secret next to reflected input,
+    which compression lets an attacker guess byte by byte (BREACH). The
+    admin's HTML with its CSRF tokens is never compressed either.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            not settings.RESPONSE_COMPRESSION
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES
+            or not is_public(request, response)
+        ):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed_content = getattr(response, 'compressed_content', None)
+        if compressed_content is not None:
+            content = compressed_content(encoding)
+        else:
+            content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Same as GZipMiddleware: the bytes differ, so the ETag can only be weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe requests read from the replicas (see core/routers.py). Unsafe
+    methods and DATABASE_REPLICA_EXEMPT_PATHS, like the admin whose pages
+    follow its own writes, read from the primary throughout.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with request_routing(self.use_replicas(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_routing(self.use_replicas(request)):
+            return await self.get_response(request)
+
+    def use_replicas(self, request):
+        return request.method in ('GET', 'HEAD', 'OPTIONS') and not request.path.startswith(
+            tuple(settings.DATABASE_REPLICA_EXEMPT_PATHS)
+        )
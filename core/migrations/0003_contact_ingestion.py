@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_testimonial_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='submission_token',
+            field=models.UUIDField(blank=True, editable=False, help_text='Returned to the client; makes spooled inserts idempotent', null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='contactsubmission',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_contact_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['created_at', 'id'], name='core_contact_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_contact_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='core_contact_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'title'], name='core_service_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['is_featured', 'created_at'], name='core_testimonial_active_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testimonial',
+            name='client_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of client_image, built in the background (see core/images.py)'),
+        ),
+    ]
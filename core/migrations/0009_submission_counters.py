@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:34
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def count_existing_submissions(apps, schema_editor):
+    # Inlined from core.stats.count_submissions(), which uses the current models
+    ContactSubmission = apps.get_model('core', 'ContactSubmission')
+    SubmissionCounter = apps.get_model('core', 'SubmissionCounter')
+    db = schema_editor.connection.alias
+    rows = (
+        ContactSubmission.objects.using(db)
+        .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('day', 'status').annotate(count=Count('pk')).order_by()
+    )
+    SubmissionCounter.objects.using(db).bulk_create(
+        [SubmissionCounter(day=row['day'], status=row['status'], count=row['count']) for row in rows],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_bulk_operations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('new', 'New'), ('in_progress', 'In Progress'), ('replied', 'Replied'), ('closed', 'Closed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='core_submission_counter_unique')],
+            },
+        ),
+        migrations.RunPython(count_existing_submissions, migrations.RunPython.noop),
+    ]
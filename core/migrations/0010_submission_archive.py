@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_submission_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('created_from', models.DateTimeField()),
+                ('created_to', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('day_counts', models.JSONField(default=dict, help_text='Submissions per day, for the stats counters')),
+                ('codec', models.CharField(max_length=10)),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['first_id'],
+                'indexes': [models.Index(fields=['created_to', 'created_from'], name='core_archive_created_idx')],
+            },
+        ),
+    ]
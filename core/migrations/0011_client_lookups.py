@@ -0,0 +1,106 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:46
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def intern_client_metadata(apps, schema_editor):
+    """Point every submission at its IP address and user agent rows, creating them"""
+    ContactSubmission = apps.get_model('core', 'ContactSubmission')
+    IPAddress = apps.get_model('core', 'IPAddress')
+    UserAgent = apps.get_model('core', 'UserAgent')
+    db = schema_editor.connection.alias
+    submissions = ContactSubmission.objects.using(db)
+
+    addresses = submissions.exclude(ip_address=None).values_list('ip_address', flat=True).distinct()
+    IPAddress.objects.using(db).bulk_create(
+        [IPAddress(address=address) for address in addresses], batch_size=500, ignore_conflicts=True
+    )
+    submissions.exclude(ip_address=None).update(ip_id=Subquery(
+        IPAddress.objects.using(db).filter(address=OuterRef('ip_address')).values('pk')[:1]
+    ))
+
+    # Agents are unique on a digest the database can't compute, so they are
+    # inserted from here; matching them up is one update like the above
+    agents = submissions.exclude(user_agent='').values_list('user_agent', flat=True).distinct()
+    UserAgent.objects.using(db).bulk_create(
+        [UserAgent(value=value, digest=hashlib.sha256(value.encode()).hexdigest()) for value in agents],
+        batch_size=500, ignore_conflicts=True
+    )
+    submissions.exclude(user_agent='').update(agent_id=Subquery(
+        UserAgent.objects.using(db).filter(value=OuterRef('user_agent')).values('pk')[:1]
+    ))
+
+
+def restore_client_metadata(apps, schema_editor):
+    ContactSubmission = apps.get_model('core', 'ContactSubmission')
+    IPAddress = apps.get_model('core', 'IPAddress')
+    UserAgent = apps.get_model('core', 'UserAgent')
+    db = schema_editor.connection.alias
+    submissions = ContactSubmission.objects.using(db)
+    submissions.exclude(ip=None).update(ip_address=Subquery(
+        IPAddress.objects.using(db).filter(pk=OuterRef('ip_id')).values('address')
+    ))
+    submissions.exclude(agent=None).update(user_agent=Subquery(
+        UserAgent.objects.using(db).filter(pk=OuterRef('agent_id')).values('value')
+    ))
+
+
+def install_search_index(apps, schema_editor):
+    # Dropping columns rebuilds the table on SQLite, and its FTS triggers with it
+    from core.search import install_search_index
+    install_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_submission_archive'),
+    ]
+
+    operations = [
+        # Undone last, after the column changes
+        migrations.RunPython(migrations.RunPython.noop, install_search_index),
+        migrations.CreateModel(
+            name='IPAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.GenericIPAddressField(unique=True)),
+            ],
+            options={
+                'verbose_name': 'IP address',
+                'verbose_name_plural': 'IP addresses',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('digest', models.CharField(editable=False, max_length=64, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='ip',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.ipaddress', verbose_name='IP address'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='agent',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.useragent', verbose_name='user agent'),
+        ),
+        migrations.RunPython(intern_client_metadata, restore_client_metadata),
+        migrations.RemoveField(
+            model_name='contactsubmission',
+            name='ip_address',
+        ),
+        migrations.RemoveField(
+            model_name='contactsubmission',
+            name='user_agent',
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 # models.py
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
@@ -14,6 +16,12 @@ class Service(models.Model):
 
     class Meta:
         ordering = ['order', 'title']
+        indexes = [
+            models.Index(
+                fields=['order', 'title'], condition=Q(is_active=True),
+                name='core_service_active_order_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -28,16 +36,53 @@ class Testimonial(models.Model):
         default=5
     )
     client_image = models.ImageField(upload_to='testimonials/', blank=True, null=True)
+    client_image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="Resized copies of client_image, built in the background (see core/images.py)"
+    )
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            # Serves both the full list and the featured-only list
+            models.Index(
+                fields=['is_featured', 'created_at'], condition=Q(is_active=True),
+                name='core_testimonial_active_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.client_name} - {self.rating} stars"
 
+class IPAddress(models.Model):
+    """A client IP address, stored once for all its contact submissions (see core/lookups.py)"""
+    address = models.GenericIPAddressField(unique=True)
+
+    class Meta:
+        verbose_name = 'IP address'
+        verbose_name_plural = 'IP addresses'
+
+    def __str__(self):
+        return self.address
+
+
+class UserAgent(models.Model):
+    """
+    A User-Agent header, stored once for all its contact submissions (see
+    core/lookups.py). Unique on a digest: headers can be longer than an
+    index entry may be.
+    """
+    value = models.TextField()
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+
+    def __str__(self):
+        return self.value
+
+
 class ContactSubmission(models.Model):
     STATUS_CHOICES = [
         ('new', 'New'),
@@ -51,13 +96,129 @@ class ContactSubmission(models.Model):
     phone = models.CharField(max_length=20, blank=True)
     message = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
-    ip_address = models.GenericIPAddressField(blank=True, null=True)
-    user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Interned, most submissions come from a few hundred agents. No index:
+    # nothing looks submissions up by either.
+    ip = models.ForeignKey(IPAddress, null=True, blank=True, editable=False, on_delete=models.PROTECT,
+                           related_name='+', db_index=False, verbose_name='IP address')
+    agent = models.ForeignKey(UserAgent, null=True, blank=True, editable=False, on_delete=models.PROTECT,
+                              related_name='+', db_index=False, verbose_name='user agent')
+    submission_token = models.UUIDField(
+        unique=True, null=True, blank=True, editable=False,
+        help_text="Returned to the client; makes spooled inserts idempotent"
+    )
+    # Not auto_now_add: spooled submissions keep the time they were received
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Backs keyset pagination on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='core_contact_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='core_contact_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.email} ({self.status})"
+
+    @property
+    def ip_address(self):
+        from .lookups import ip_addresses
+        return ip_addresses.value_for(self.ip_id, using=self._state.db)
+
+    @property
+    def user_agent(self):
+        from .lookups import user_agents
+        return user_agents.value_for(self.agent_id, using=self._state.db) or ''
+
+
+class SubmissionCounter(models.Model):
+    """
+    Contact submissions received on ``day`` that now have ``status``, kept
+    up to date as submissions are created, change status or are deleted
+    (see core/stats.py). Archived submissions stay counted.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=ContactSubmission.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='core_submission_counter_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
+
+
+class SubmissionArchive(models.Model):
+    """
+    One batch of closed contact submissions moved out of the hot table
+    (see core/archive.py): their export rows as compressed NDJSON, with
+    the id and creation ranges to find them again
+    """
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    created_from = models.DateTimeField()
+    created_to = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    day_counts = models.JSONField(default=dict, help_text="Submissions per day, for the stats counters")
+    codec = models.CharField(max_length=10)
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['first_id']
+        indexes = [
+            models.Index(fields=['created_to', 'created_from'], name='core_archive_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Submissions {self.first_id}-{self.last_id} ({self.count})"
+
+
+class BulkOperation(models.Model):
+    """
+    A status change over many contact submissions, applied chunk by chunk
+    in the background (see core/bulk.py)
+    """
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=20, choices=ContactSubmission.STATUS_CHOICES,
+                              help_text="Status the submissions are changed to")
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='pending')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0, help_text="Submissions that had another status")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.name} - {self.email} ({self.status})"
\ No newline at end of file
+        return f"Mark {self.total} submissions as {self.status} ({self.state})"
+
+
+class BulkOperationChunk(models.Model):
+    """
+    The ids one transaction of a BulkOperation changes. Chunks are taken
+    when the operation starts and marked done in the transaction that
+    applies them, so a restarted worker carries on where it stopped.
+    """
+    operation = models.ForeignKey(BulkOperation, on_delete=models.CASCADE, related_name='chunks')
+    ids = models.JSONField()
+    done = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['done', 'operation'], name='core_bulk_chunk_pending_idx'),
+        ]
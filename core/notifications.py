@@ -0,0 +1,139 @@
+# notifications.py
+import logging
+import queue
+import random
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from .workers import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_FIELDS = ['id', 'name', 'email', 'phone', 'message', 'created_at', 'ip_address']
+
+
+def build_notification(submission):
+    subject = f"New Contact Form Submission from {submission['name']}"
+    body = f"""New contact form submission received:
+
+Name: {submission['name']}
+Email: {submission['email']}
+Phone: {submission['phone']}
+Message: {submission['message']}
+
+Submitted at: {submission['created_at']}
+IP Address: {submission['ip_address']}
+"""
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [settings.ADMIN_EMAIL])
+
+
+def build_digest(submissions):
+    subject = f"{len(submissions)} new contact form submissions"
+    entries = '\n'.join(
+        f"- {s['created_at']} {s['name']} <{s['email']}>: {s['message'][:200]}"
+        for s in submissions
+    )
+    body = f"{len(submissions)} contact form submissions received:\n\n{entries}\n"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [settings.ADMIN_EMAIL])
+
+
+class NotificationWorker(BackgroundWorker):
+    """
+    Take whatever is queued, send it over one SMTP connection that stays
+    open while there is work, and retry failed sends with exponential
+    backoff. A batch at or above NOTIFICATION_DIGEST_THRESHOLD is sent as
+    a single digest.
+    """
+    interval = 5.0
+
+    def __init__(self, dispatcher, index):
+        super().__init__()
+        self.dispatcher = dispatcher
+        self.name = f'notification-worker-{index}'
+        self.connection = None
+
+    def run_once(self):
+        batch = self.dispatcher.take_batch()
+        if not batch:
+            self.close_connection()
+            return False
+
+        if len(batch) >= settings.NOTIFICATION_DIGEST_THRESHOLD:
+            messages = [build_digest(batch)]
+        else:
+            messages = [build_notification(submission) for submission in batch]
+        self.send(messages)
+        return True
+
+    def send(self, messages):
+        retries = settings.NOTIFICATION_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                if self.connection is None:
+                    self.connection = get_connection(
+                        backend=settings.NOTIFICATION_EMAIL_BACKEND, fail_silently=False
+                    )
+                    self.connection.open()
+                self.connection.send_messages(messages)
+                return True
+            except Exception:
+                self.close_connection()
+                if attempt == retries:
+                    logger.exception('Giving up on %d notification emails', len(messages))
+                    return False
+                delay = settings.NOTIFICATION_RETRY_BACKOFF * 2 ** attempt
+                logger.warning('Notification send failed, retrying in %.1fs', delay)
+                self._stopping.wait(delay * random.uniform(0.5, 1.0))
+
+    def close_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                logger.warning('Failed to close notification email connection', exc_info=True)
+            self.connection = None
+
+
+class NotificationDispatcher:
+    """
+    Collect new contact submissions and hand them to a pool of background
+    workers, so a POST never waits for the mail server.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.workers = []
+
+    def start(self):
+        if not self.workers:
+            self.workers = [
+                NotificationWorker(self, index)
+                for index in range(settings.NOTIFICATION_WORKERS)
+            ]
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def submit(self, submissions, start=True):
+        for submission in submissions:
+            self.queue.put({field: getattr(submission, field) for field in SUBMISSION_FIELDS})
+        if start:
+            self.start()
+            for worker in self.workers:
+                worker.wake()
+
+    def take_batch(self, limit=100):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+
+dispatcher = NotificationDispatcher()
@@ -0,0 +1,125 @@
+# pagination.py
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination with opaque cursors.
+
+    Each page is fetched with ``WHERE (keys) < (last row's keys) LIMIT n``
+    instead of an OFFSET, so page 10,000 costs the same as page 1 given an
+    index on the keys. The view supplies the keys through
+    ``get_keyset_ordering()`` as ``(field, descending)`` pairs; the last one
+    must be unique. ``COUNT(*)`` only runs when the client asks for
+    ``?count=true``.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.count_query_param)
+        self.ordering = view.get_keyset_ordering()
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['previous']
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(self.seek(cursor['values'], reverse))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        order_by = [
+            ('-' if descending != reverse else '') + field
+            for field, descending in self.ordering
+        ]
+        rows = list(queryset.order_by(*order_by)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], previous=False)
+            if (has_more and reverse) or (cursor is not None and not reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], previous=True)
+        return rows
+
+    def seek(self, values, reverse):
+        """
+        Rows strictly after ``values`` in the pagination order. The leading
+        ``k1 <= v1`` term is redundant but lets the database seek the index
+        instead of filtering an index scan.
+        """
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        first_field, first_descending = self.ordering[0]
+        bound = 'lte' if first_descending != reverse else 'gte'
+        return Q(**{f'{first_field}__{bound}': values[0]}) & condition
+
+    def encode_cursor(self, row, previous):
+        values = []
+        for field, _ in self.ordering:
+            value = getattr(row, field)
+            if isinstance(value, datetime.datetime):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({'v': values, 'p': previous}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, previous = payload['v'], bool(payload['p'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': values, 'previous': previous}
+
+    def get_paginated_response(self, data):
+        body = OrderedDict()
+        if self.count is not None:
+            body['count'] = self.count
+        body['next'] = self.next_cursor
+        body['previous'] = self.previous_cursor
+        body['results'] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
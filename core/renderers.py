@@ -0,0 +1,48 @@
+# renderers.py
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson when it is installed, producing the same bytes
+    as DRF's renderer (compact, UTF-8, datetimes with a 'Z' for UTC,
+    U+2028/U+2029 escaped) except that some floats are spelled
+    differently, e.g. 1e22 for 1e+22. Types orjson doesn't know (Decimal,
+    lazy strings, querysets...) go through DRF's own encoder.
+
+    Falls back to the stdlib renderer without orjson, and for what orjson
+    can't reproduce: indented or ASCII-only output, or a custom encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not self.use_orjson(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        try:
+            ret = orjson.dumps(data, default=self.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # e.g. integers past 64 bits, which the stdlib encoder handles
+            return super().render(data, accepted_media_type, renderer_context)
+        # Valid JSON, but not valid JavaScript; see JSONRenderer.render()
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+    def use_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None
+            and self.encoder_class is encoders.JSONEncoder
+            and not self.ensure_ascii
+            and self.compact
+            and self.get_indent(accepted_media_type, renderer_context or {}) is None
+        )
+
+    def default(self, obj):
+        return self.encoder_class().default(obj)
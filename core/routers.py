@@ -0,0 +1,82 @@
+# routers.py
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class RoutingState:
+    """
+    Where one request's reads go. Mutable and shared by reference, so a
+    write made in a thread by sync_to_async still pins the request.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+
+
+current_routing = ContextVar('core_db_routing', default=None)
+
+
+@contextmanager
+def request_routing(use_replicas=True):
+    """
+    Let reads in the block go to DATABASE_REPLICAS until the first write,
+    after which they stay on the primary so they see that write
+    """
+    token = current_routing.set(RoutingState(pinned=not use_replicas))
+    try:
+        yield
+    finally:
+        current_routing.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary in the block. For results cached under a model
+    version: read from a lagging replica they would outlive the lag.
+    """
+    token = current_routing.set(RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        current_routing.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads of DATABASE_REPLICA_APPS models to a random one of
+    DATABASE_REPLICAS, and everything else to the primary. Replicas are
+    only read inside request_routing() (see ReplicaRoutingMiddleware), so
+    commands and background workers always see the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label not in settings.DATABASE_REPLICA_APPS:
+            return None
+        state = current_routing.get()
+        if state is None or state.pinned:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a transaction belong with its writes
+            state.pinned = True
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db not in settings.DATABASE_REPLICAS
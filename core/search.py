@@ -0,0 +1,148 @@
+# search.py
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import ContactSubmission
+
+TABLE = ContactSubmission._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+SEARCH_FIELDS = ['name', 'email', 'message']
+
+# Postgres: the GIN index is built on exactly this expression, so queries
+# must use it verbatim for the planner to pick the index.
+PG_DOCUMENT = "to_tsvector('english', " + " || ' ' || ".join(
+    f"coalesce({field}, '')" for field in SEARCH_FIELDS
+) + ")"
+PG_INDEX = f'{TABLE}_search_idx'
+
+SQLITE_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, email, message, content='{TABLE}', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, email, message ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+        INSERT INTO {FTS_TABLE}(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def install_search_index(schema_editor):
+    """
+    Create the full-text index for contact submissions and fill it.
+
+    SQLite keeps an FTS5 table in sync with triggers, so bulk inserts and
+    queryset updates are indexed too. Migrations that make Django rebuild
+    the contact table drop those triggers and must call this again; it is
+    idempotent.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sql in SQLITE_FTS_SQL:
+            schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} USING GIN (({PG_DOCUMENT}))'
+        )
+
+
+def remove_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sql in SQLITE_DROP_SQL:
+            schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_INDEX}')
+
+
+def fts_query(term):
+    """Turn user input into an FTS5 query: every word, as a prefix, must match"""
+    words = ['"' + word.replace('"', '""') + '"*' for word in term.split()]
+    return ' '.join(words)
+
+
+def search_contact_submissions(queryset, term):
+    """
+    Filter ``queryset`` to submissions matching ``term`` through the
+    full-text index, annotated with ``search_rank`` (higher is better) and
+    ordered by it. Falls back to ``icontains`` where no index exists.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite' and _has_fts_table(connection):
+        query = fts_query(term)
+        if not query:
+            return queryset
+        match = RawSQL(
+            f'"{TABLE}"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            (query,), output_field=BooleanField()
+        )
+        # LIMIT -1 stops SQLite flattening the ranked matches into the
+        # correlated subquery, which would rerun MATCH and bm25() per row;
+        # this way they are computed once and probed through an automatic
+        # index.
+        rank = RawSQL(
+            f'SELECT rank FROM (SELECT rowid AS match_id, -bm25({FTS_TABLE}) AS rank '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT -1) '
+            f'WHERE match_id = "{TABLE}"."id"',
+            (query,), output_field=FloatField()
+        )
+    elif connection.vendor == 'postgresql':
+        match = RawSQL(
+            f"{PG_DOCUMENT} @@ websearch_to_tsquery('english', %s)",
+            (term,), output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f"ts_rank({PG_DOCUMENT}, websearch_to_tsquery('english', %s))",
+            (term,), output_field=FloatField()
+        )
+    else:
+        return queryset.filter(
+            Q(name__icontains=term) |
+            Q(email__icontains=term) |
+            Q(message__icontains=term)
+        )
+    return queryset.filter(match).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+def filter_contact_submissions(queryset, params):
+    """Apply the ``status`` and ``search`` filters shared by the list and exports"""
+    # Filter by status
+    status_filter = params.get('status', None)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    
+    # Full-text search, best matches first
+    search = params.get('search', None)
+    if search:
+        queryset = search_contact_submissions(queryset, search)
+    
+    return queryset
+
+
+_fts_tables = {}
+
+
+def _has_fts_table(connection):
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            _fts_tables[key] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_tables[key]
@@ -1,33 +1,180 @@
 # serializers.py
-from rest_framework import serializers
+import logging
+from functools import cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .log import sampled
+from .lookups import intern_metadata
+from .metrics import timed_serializer
 from .models import Service, Testimonial, ContactSubmission
 
-class ServiceSerializer(serializers.ModelSerializer):
+logger = logging.getLogger(__name__)
+
+class InstrumentedListSerializer(serializers.ListSerializer):
+    """Count serialization time towards the request's metrics"""
+    @property
+    def data(self):
+        with timed_serializer():
+            return super().data
+
+class InstrumentedSerializerMixin:
+    """Count serialization time towards the request's metrics"""
+    @property
+    def data(self):
+        with timed_serializer():
+            return super().data
+
+def _file_name(value):
+    # A FieldFile renders as its name, and as '' when empty or NULL
+    return value or ''
+
+
+def _datetime_converter(field):
+    """DateTimeField.to_representation() with its settings looked up once"""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+# Fields whose to_representation() leaves database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.FloatField, serializers.IntegerField,
+)
+
+
+class CompiledSerializer:
+    """
+    Read-only fast path for a ModelSerializer. The field list and each
+    field's conversion are worked out once, and rows are built from
+    ``.values_list()`` tuples instead of model instances, skipping DRF's
+    per-field get_attribute()/to_representation() calls. Output is the
+    same as ``serializer_class(queryset, many=True).data``.
+
+    Only fields backed by a model column (optionally renamed with
+    ``source``) are supported, and ``to_representation()`` overrides on
+    the serializer are not applied.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.field_names, self.sources, self.fields = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} is not a model column and cannot be compiled'
+                )
+            self.field_names.append(name)
+            self.sources.append(model_field.attname)
+            self.fields.append((field, model_field))
+
+    def converters(self):
+        """``(index, convert)`` for each column that needs converting"""
+        converters = []
+        for index, (field, model_field) in enumerate(self.fields):
+            if isinstance(model_field, models.FileField):
+                converters.append((index, _file_name))
+            elif isinstance(field, serializers.DateTimeField):
+                # Per call, as the current timezone can change between requests
+                converters.append((index, _datetime_converter(field)))
+            elif not isinstance(field, PASSTHROUGH_FIELDS):
+                converters.append((index, field.to_representation))
+        return converters
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.sources)
+
+    def serialize(self, rows):
+        """Build the representation of every row from ``rows()``"""
+        names = self.field_names
+        with timed_serializer():
+            converters = self.converters()
+            data = []
+            for row in rows:
+                if converters:
+                    row = list(row)
+                    for index, convert in converters:
+                        value = row[index]
+                        # DRF renders None as None without calling the field
+                        if value is not None or convert is _file_name:
+                            row[index] = convert(value)
+                data.append(dict(zip(names, row)))
+            return data
+
+
+@cache
+def compile_serializer(serializer_class):
+    return CompiledSerializer(serializer_class)
+
+
+class ServiceSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
+        list_serializer_class = InstrumentedListSerializer
         fields = ['id', 'title', 'description', 'icon', 'order', 'created_at']
         
     def to_representation(self, instance):
-        """Override to add debug info"""
         data = super().to_representation(instance)
-        print(f"Serializing service: {instance.title} -> {data}")  # Debug print
+        if sampled(logger, settings.LOG_TRACE_SAMPLE_RATE):
+            logger.debug('Serialized service', extra={'service_id': instance.pk, 'fields': data})
         return data
 
-class TestimonialSerializer(serializers.ModelSerializer):
+class SrcsetField(serializers.Field):
+    """
+    The derivatives recorded in an image's variants column (core/images.py)
+    as one ``srcset`` string per format, smallest first
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return {
+            image_format: ', '.join(
+                f'{default_storage.url(name)} {width}w'
+                for width, name in sorted(sizes.items(), key=lambda item: int(item[0]))
+            )
+            for image_format, sizes in value.get('formats', {}).items()
+            if sizes
+        }
+
+
+class TestimonialSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     client_image_url = serializers.URLField(source='client_image', read_only=True)
-    
+    client_image_srcset = SrcsetField(source='client_image_variants')
+
     class Meta:
         model = Testimonial
+        list_serializer_class = InstrumentedListSerializer
         fields = [
             'id', 'client_name', 'client_company', 'client_position', 
-            'testimonial_text', 'rating', 'client_image_url', 'is_featured',
+            'testimonial_text', 'rating', 'client_image_url', 'client_image_srcset', 'is_featured',
             'created_at'
         ]
 
-class ContactSubmissionSerializer(serializers.ModelSerializer):
+class ContactSubmissionSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ContactSubmission
-        fields = ['id', 'name', 'email', 'phone', 'message', 'created_at']
+        list_serializer_class = InstrumentedListSerializer
+        fields = ['id', 'name', 'email', 'phone', 'message', 'status', 'created_at']
         read_only_fields = ['id', 'created_at']
     
     def validate_email(self, value):
@@ -56,20 +203,26 @@ class ContactSubmissionCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Name must be at least 2 characters long.")
         return value.strip()
     
-    # def validate_message(self, value):
-    #     if len(value.strip()) < 10:
-    #         raise serializers.ValidationError("Message must be at least 10 characters long.")
-    #     return value.strip()
+    def validate_message(self, value):
+        if len(value.strip()) < 10:
+            raise serializers.ValidationError("Message must be at least 10 characters long.")
+        return value.strip()
 
     def create(self, validated_data):
-        # Add IP address and user agent from request context
-        request = self.context.get('request')
-        if request:
-            validated_data['ip_address'] = self.get_client_ip(request)
-            validated_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
-        
+        # Stored as ids into the lookup tables (core/lookups.py)
+        validated_data = intern_metadata([{**validated_data, **self.get_request_metadata()}])[0]
         return super().create(validated_data)
     
+    def get_request_metadata(self):
+        """IP address and user agent from the request context"""
+        request = self.context.get('request')
+        if not request:
+            return {}
+        return {
+            'ip_address': self.get_client_ip(request),
+            'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        }
+    
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
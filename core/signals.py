@@ -0,0 +1,98 @@
+# signals.py
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .cache import bump_model_version
+from .models import ContactSubmission, Service, Testimonial
+from .stats import archiving, record_created, record_deleted, record_status_change
+
+# Sent after commit with ``submissions``, a list of new ContactSubmission
+# rows, whether they were inserted one by one or in a spooled batch.
+submissions_created = Signal()
+
+# Sent inside the transaction that changed the status of the submissions
+# with ``ids`` to ``status``, on behalf of ``user`` (or None): one PATCH or
+# one chunk of a bulk operation (core/bulk.py). ``previous`` holds the
+# ``(created_at, status)`` of each of them before the change.
+submissions_status_changed = Signal()
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+@receiver(submissions_status_changed)
+def invalidate_public_cache(sender, **kwargs):
+    """
+    Bump the model's cache version on every admin edit, list_editable
+    included, and on status changes of contact submissions. The second
+    bump after commit stops a reader that rendered uncommitted-but-old
+    rows under the new version from being served.
+    """
+    bump_model_version(sender)
+    transaction.on_commit(partial(bump_model_version, sender))
+
+
+@receiver(pre_save, sender=Testimonial)
+def reset_image_variants(sender, instance, **kwargs):
+    """Stop serving the old image's derivatives once client_image changes"""
+    source = instance.client_image_variants.get('source')
+    if source is not None and source != instance.client_image.name:
+        instance.client_image_variants = {}
+
+
+@receiver(post_save, sender=Testimonial)
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    from .images import needs_derivatives, worker
+    if not raw and needs_derivatives(instance):
+        transaction.on_commit(partial(worker.submit, instance.pk))
+
+
+def send_submissions_created(submissions):
+    """Send ``submissions_created`` once the current transaction commits"""
+    if submissions:
+        transaction.on_commit(
+            partial(submissions_created.send, sender=submissions[0].__class__, submissions=submissions)
+        )
+
+
+@receiver(submissions_created)
+def notify_admins(sender, submissions, **kwargs):
+    if settings.CONTACT_NOTIFICATIONS_ENABLED:
+        from .notifications import dispatcher
+        dispatcher.submit(submissions)
+
+
+@receiver(submissions_status_changed)
+def audit_status_change(sender, ids, status, user=None, **kwargs):
+    """Record the change in the admin history, like an edit in the admin would be"""
+    if user is None or user.pk is None or not ids:
+        return
+    from django.contrib.admin.models import CHANGE, LogEntry
+
+    LogEntry.objects.log_actions(
+        user.pk, sender.objects.filter(pk__in=ids), CHANGE,
+        change_message=[{'changed': {'fields': ['Status']}}],
+    )
+
+
+@receiver(submissions_status_changed)
+def count_status_change(sender, status, previous, **kwargs):
+    record_status_change(previous, status)
+
+
+@receiver(post_save, sender=ContactSubmission)
+def count_created_submission(sender, instance, created, **kwargs):
+    # bulk_create() sends no post_save; its callers count the rows themselves
+    if created and not archiving.get():
+        record_created([instance])
+
+
+@receiver(post_delete, sender=ContactSubmission)
+def count_deleted_submission(sender, instance, **kwargs):
+    if not archiving.get():
+        record_deleted([instance])
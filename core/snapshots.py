@@ -0,0 +1,236 @@
+# snapshots.py
+import json
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .cache import aget_model_version, get_model_version
+from .compression import compress
+from .conditional import ConditionalGetMixin, acompute_validators, compute_validators
+from .routers import use_primary
+from .serializers import compile_serializer
+
+Snapshot = namedtuple('Snapshot', ['name', 'version', 'body', 'etag', 'last_modified'])
+
+
+class SnapshotSpec:
+    """
+    Describe how to render one pre-rendered JSON payload. Rendering goes
+    through the compiled form of ``serializer_class``.
+    """
+
+    def __init__(self, name, models, get_queryset, serializer_class):
+        self.name = name
+        self.models = tuple(models)
+        self.get_queryset = get_queryset
+        self.serializer_class = serializer_class
+
+    def current_version(self):
+        return '.'.join(str(get_model_version(model)) for model in self.models)
+
+    def render(self):
+        compiled = compile_serializer(self.serializer_class)
+        data = compiled.serialize(compiled.rows(self.get_queryset()))
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        return renderer.render(data)
+
+    def validators(self):
+        return compute_validators(self.get_queryset(), salt=self.name)
+
+    async def acurrent_version(self):
+        return '.'.join([str(await aget_model_version(model)) for model in self.models])
+
+    async def arender(self):
+        compiled = compile_serializer(self.serializer_class)
+        rows = [row async for row in compiled.rows(self.get_queryset())]
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        return renderer.render(compiled.serialize(rows))
+
+    async def avalidators(self):
+        return await acompute_validators(self.get_queryset(), salt=self.name)
+
+
+class SnapshotStore:
+    """
+    Keep the rendered bytes of every registered snapshot in memory and,
+    when SNAPSHOT_DIR is set, on disk so other workers can load them
+    instead of rendering again. A snapshot is stale once one of its
+    models' cache versions has been bumped (see core/signals.py).
+    """
+
+    def __init__(self):
+        self.specs = {}
+        self._memory = {}
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, models, get_queryset, serializer_class):
+        self.specs[name] = SnapshotSpec(name, models, get_queryset, serializer_class)
+
+    def register_view(self, view_class):
+        """Register the snapshot a list view serves, from its own queryset and serializer"""
+        view = view_class()
+        self.register(
+            view_class.snapshot_name, [view.get_queryset().model],
+            lambda: view_class().get_queryset(), view.get_serializer_class(),
+        )
+
+    @property
+    def directory(self):
+        directory = getattr(settings, 'SNAPSHOT_DIR', None)
+        return Path(directory) if directory else None
+
+    def get(self, name):
+        """Return the up-to-date snapshot, rendering it only if needed"""
+        spec = self.specs[name]
+        version = spec.current_version()
+        snapshot = self._memory.get(name)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        # Read from the primary: a lagging replica's rows would be kept
+        # under the new version
+        with self._lock, use_primary():
+            snapshot = self._memory.get(name)
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._load(spec, version)
+                if snapshot is None:
+                    body = spec.render()
+                    snapshot = Snapshot(name, version, body, *spec.validators())
+                    self._write(snapshot)
+                self._memory[name] = snapshot
+        return snapshot
+
+    async def aget(self, name):
+        """
+        Async get(). The lock can't be held across awaits, so concurrent
+        misses may both render; they produce the same snapshot.
+        """
+        spec = self.specs[name]
+        version = await spec.acurrent_version()
+        snapshot = self._memory.get(name)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        body = self._read(spec.name, version)
+        with use_primary():
+            if body is None:
+                body = await spec.arender()
+                snapshot = Snapshot(name, version, body, *await spec.avalidators())
+                self._write(snapshot)
+            else:
+                snapshot = Snapshot(name, version, body, *await spec.avalidators())
+        self._memory[name] = snapshot
+        return snapshot
+
+    def compressed(self, snapshot, encoding):
+        """The body of ``snapshot`` compressed with ``encoding``, kept until the next version"""
+        key = (snapshot.name, encoding)
+        cached = self._compressed.get(key)
+        if cached is not None and cached[0] == snapshot.version:
+            return cached[1]
+        body = compress(snapshot.body, encoding)
+        self._compressed[key] = (snapshot.version, body)
+        return body
+
+    def warm(self, names=None):
+        return [self.get(name) for name in (names or self.specs)]
+
+    def clear(self):
+        self._memory.clear()
+        self._compressed.clear()
+
+    def _path(self, name, version):
+        return self.directory / f'{name}.{version}.json'
+
+    def _load(self, spec, version):
+        body = self._read(spec.name, version)
+        if body is None:
+            return None
+        # Files only hold the body; validators are one aggregate query
+        return Snapshot(spec.name, version, body, *spec.validators())
+
+    def _read(self, name, version):
+        if self.directory is None:
+            return None
+        try:
+            return self._path(name, version).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, snapshot):
+        directory = self.directory
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{snapshot.name}.')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(snapshot.body)
+        path = self._path(snapshot.name, snapshot.version)
+        os.replace(tmp_path, path)
+
+        # Drop files left over from older versions
+        for old in directory.glob(f'{snapshot.name}.*.json'):
+            if old != path:
+                old.unlink(missing_ok=True)
+
+
+class SnapshotResponse(Response):
+    """A DRF response whose body was rendered ahead of time"""
+
+    def __init__(self, snapshot, **kwargs):
+        self.snapshot = snapshot
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        # Only decoded when something inspects it, e.g. the test client
+        return json.loads(self.snapshot.body)
+
+    @data.setter
+    def data(self, value):
+        pass
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = 'application/json'
+        return self.snapshot.body
+
+    def compressed_content(self, encoding):
+        return snapshots.compressed(self.snapshot, encoding)
+
+
+class SnapshotListMixin(ConditionalGetMixin):
+    """
+    Serve a list view from its pre-rendered snapshot. A view naming a
+    ``snapshot_name`` registers it, rendered from the view's own
+    ``get_queryset()`` and ``get_serializer_class()``.
+    """
+    snapshot_name = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.snapshot_name is not None:
+            snapshots.register_view(cls)
+
+    def get_snapshot(self):
+        if not hasattr(self, '_snapshot'):
+            self._snapshot = snapshots.get(self.snapshot_name)
+        return self._snapshot
+
+    def get_validators(self):
+        snapshot = self.get_snapshot()
+        return snapshot.etag, snapshot.last_modified
+
+    def list(self, request, *args, **kwargs):
+        return SnapshotResponse(self.get_snapshot())
+
+
+snapshots = SnapshotStore()
+
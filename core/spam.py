@@ -0,0 +1,149 @@
+# spam.py
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+
+# action is 'accept', 'quarantine' (answered as if accepted, not stored)
+# or 'reject' (answered with a 400)
+Verdict = namedtuple('Verdict', ['action', 'reason'])
+ACCEPT = Verdict('accept', None)
+
+_whitespace_re = re.compile(r'\s+')
+_link_re = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+
+def normalize_message(message):
+    return _whitespace_re.sub(' ', message).strip().casefold()
+
+
+def score_links(data, ip_address):
+    """A point for every link in the message after the first"""
+    return max(0, len(_link_re.findall(data.get('message', ''))) - 1)
+
+
+def score_link_in_name(data, ip_address):
+    """Nobody's name is a URL"""
+    return 3 if _link_re.search(data.get('name', '')) else 0
+
+
+@cache
+def _import_scorers(paths):
+    return [import_string(path) for path in paths]
+
+
+def get_scorers():
+    """
+    The callables listed in CONTACT_SPAM_SCORERS. Each takes the validated
+    data and the client IP and returns a score; the scores are summed.
+    """
+    return _import_scorers(tuple(settings.CONTACT_SPAM_SCORERS))
+
+
+class RecentKeys:
+    """
+    Remember keys for ``window`` seconds in bounded memory: past
+    ``max_entries`` the least recently seen key is forgotten early
+    """
+
+    def __init__(self, window, max_entries):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Record ``key``; return True if it was already seen within the window"""
+        now = time.monotonic()
+        with self._lock:
+            # Ordered by last sighting, so expired keys are at the front
+            while self._seen and next(iter(self._seen.values())) <= now - self.window:
+                self._seen.popitem(last=False)
+            seen = key in self._seen
+            self._seen[key] = now
+            self._seen.move_to_end(key)
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        return seen
+
+    def __len__(self):
+        return len(self._seen)
+
+
+class WindowCounter:
+    """Count hits per key in fixed windows of ``window`` seconds, in bounded memory"""
+
+    def __init__(self, window, max_entries):
+        self.window = window
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Count one hit and return the key's total in the current window"""
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._counts.pop(key, (now, 0))
+            if started <= now - self.window:
+                started, count = now, 0
+            self._counts[key] = (started, count + 1)
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count + 1
+
+
+class SubmissionFilter:
+    """
+    Cheap checks run on a validated contact submission before it is stored:
+    the same email and message seen recently, too many submissions from
+    one IP, and the scorers in CONTACT_SPAM_SCORERS. State is per process.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.duplicates = RecentKeys(settings.CONTACT_DUPLICATE_WINDOW, settings.CONTACT_FILTER_MAX_ENTRIES)
+        self.ip_counts = WindowCounter(settings.CONTACT_IP_WINDOW, settings.CONTACT_FILTER_MAX_ENTRIES)
+
+    def check(self, data, ip_address):
+        if not settings.CONTACT_FILTER_ENABLED:
+            return ACCEPT
+        verdict = self.evaluate(data, ip_address)
+        if verdict.action != 'accept':
+            registry.increment('core_contact_filtered_total', action=verdict.action, reason=verdict.reason)
+        return verdict
+
+    def evaluate(self, data, ip_address):
+        score = sum(scorer(data, ip_address) for scorer in get_scorers())
+        if score >= settings.CONTACT_SPAM_REJECT_SCORE:
+            return Verdict('reject', 'score')
+        if self.duplicates.add(self.fingerprint(data)):
+            return Verdict('quarantine', 'duplicate')
+        if ip_address and self.ip_counts.hit(ip_address) > settings.CONTACT_IP_MAX_SUBMISSIONS:
+            return Verdict('quarantine', 'ip_volume')
+        if score >= settings.CONTACT_SPAM_QUARANTINE_SCORE:
+            return Verdict('quarantine', 'score')
+        return ACCEPT
+
+    def fingerprint(self, data):
+        text = f"{data.get('email', '').lower()}\0{normalize_message(data.get('message', ''))}"
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+submission_filter = SubmissionFilter()
+
+
+@receiver(setting_changed)
+def reset_submission_filter(setting, **kwargs):
+    if setting in ('CONTACT_DUPLICATE_WINDOW', 'CONTACT_IP_WINDOW', 'CONTACT_FILTER_MAX_ENTRIES'):
+        submission_filter.reset()
@@ -0,0 +1,130 @@
+# stats.py
+import datetime
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ContactSubmission, SubmissionArchive, SubmissionCounter
+
+
+def submission_day(created_at):
+    """The day a submission counts towards, in TIME_ZONE"""
+    return timezone.localdate(created_at)
+
+
+def apply_deltas(deltas):
+    """
+    Add ``deltas``, a mapping of ``(day, status)`` to a count, to the
+    counter rows: insert the missing rows, ignoring conflicts, then
+    increment each, so concurrent writers never trip the unique
+    constraint. Run it in the transaction that made the change.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    SubmissionCounter.objects.bulk_create(
+        [SubmissionCounter(day=day, status=status, count=0) for day, status in deltas], ignore_conflicts=True
+    )
+    for (day, status), delta in deltas.items():
+        SubmissionCounter.objects.filter(day=day, status=status).update(count=F('count') + delta)
+
+
+def record_created(submissions):
+    apply_deltas(Counter((submission_day(s.created_at), s.status) for s in submissions))
+
+
+# Set while submissions are deleted because they were archived, or
+# otherwise should not move the counters
+archiving = ContextVar('core_stats_archiving', default=False)
+
+
+@contextmanager
+def keep_counted():
+    """
+    Leave the counters as they are for submissions created or deleted in
+    the block: archived ones (core/archive.py) stay counted as closed
+    """
+    token = archiving.set(True)
+    try:
+        yield
+    finally:
+        archiving.reset(token)
+
+
+def record_deleted(submissions):
+    deltas = Counter()
+    deltas.subtract((submission_day(s.created_at), s.status) for s in submissions)
+    apply_deltas(deltas)
+
+
+def record_status_change(previous, status):
+    """``previous`` holds ``(created_at, status)`` of each changed submission before the change"""
+    deltas = Counter()
+    for created_at, old_status in previous:
+        day = submission_day(created_at)
+        deltas[day, old_status] -= 1
+        deltas[day, status] += 1
+    apply_deltas(deltas)
+
+
+def count_submissions():
+    """
+    The counter rows for the submissions as they are, computed from
+    scratch. Archived submissions (core/archive.py) count as closed.
+    """
+    counts = Counter()
+    rows = (
+        ContactSubmission.objects.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('day', 'status').annotate(count=Count('pk')).order_by()
+    )
+    for row in rows:
+        counts[row['day'], row['status']] += row['count']
+    for day_counts in SubmissionArchive.objects.values_list('day_counts', flat=True).iterator():
+        for day, count in day_counts.items():
+            counts[datetime.date.fromisoformat(day), 'closed'] += count
+    return [SubmissionCounter(day=day, status=status, count=count) for (day, status), count in counts.items()]
+
+
+def rebuild_counters():
+    """
+    Replace every counter row with a fresh count. One transaction, so
+    submissions written meanwhile wait rather than being miscounted.
+    """
+    with transaction.atomic():
+        counters = count_submissions()
+        SubmissionCounter.objects.all().delete()
+        SubmissionCounter.objects.bulk_create(counters, batch_size=500)
+    return counters
+
+
+def submission_stats(days):
+    """
+    Totals per status and per-day volumes for the last ``days`` days, from
+    the counter rows alone: O(days), however many submissions there are
+    """
+    today = timezone.localdate()
+    since = today - datetime.timedelta(days=days - 1)
+    by_status = dict.fromkeys((choice for choice, _ in ContactSubmission.STATUS_CHOICES), 0)
+    for row in SubmissionCounter.objects.values('status').annotate(total=Sum('count')).order_by():
+        by_status[row['status']] = row['total']
+
+    per_day = defaultdict(Counter)
+    for day, status, count in SubmissionCounter.objects.filter(day__gte=since).values_list('day', 'status', 'count'):
+        per_day[day][status] += count
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'days': [
+            {
+                'date': day.isoformat(),
+                'total': sum(per_day[day].values()),
+                'by_status': {status: per_day[day][status] for status in by_status if per_day[day][status]},
+            }
+            for day in (since + datetime.timedelta(days=n) for n in range(days))
+        ],
+    }
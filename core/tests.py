@@ -1,10 +1,76 @@
 # tests.py
-from django.test import TestCase
+import csv
+import datetime
+import decimal
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from unittest import SkipTest, skipUnless
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
-from .models import Service, Testimonial, ContactSubmission
+from rest_framework.authtoken.models import Token
+from rest_framework.views import APIView
+from . import bulk
+from .archive import DEFAULT_CODEC, archive_submissions, archived_submissions, read_archive
+from .bulk import set_status, start_status_change
+from .cache import get_model_version
+from .log import BackgroundHandler, JSONFormatter, sampled
+from .ingestion import enqueue_submission, flush_spool, get_spool
+from .exports import export_contact_submissions
+from .lookups import intern_metadata, ip_addresses, reset_lookup_caches, user_agents
+from .metrics import Histogram, registry
+from .models import (
+    Service, Testimonial, ContactSubmission, IPAddress, SubmissionArchive, SubmissionCounter, UserAgent
+)
+from .notifications import NotificationDispatcher, NotificationWorker
+from .routers import ReplicaRouter, request_routing
+from .serializers import ServiceSerializer, TestimonialSerializer, compile_serializer
+from .snapshots import snapshots
+from .spam import submission_filter
+from .stats import rebuild_counters, submission_stats
+from .throttling import local_buckets
+from .urls import build_api_urlpatterns, build_urlconf
+
+
+@contextmanager
+def local_spool(**overrides):
+    """
+    Switch contact ingestion to spool mode on a throwaway directory, with
+    the background worker disabled so tests flush explicitly.
+    """
+    directory = tempfile.mkdtemp(prefix='contact-spool-')
+    options = {
+        'CONTACT_INGESTION_MODE': 'spool',
+        'CONTACT_SPOOL_DIR': directory,
+        'CONTACT_SPOOL_AUTOFLUSH': False,
+        **overrides,
+    }
+    try:
+        with override_settings(**options):
+            yield get_spool()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
 
 class ServiceModelTest(TestCase):
     def setUp(self):
@@ -112,6 +178,10 @@ class TestimonialAPITest(APITestCase):
         self.assertEqual(response.data[0]['client_name'], "John Doe")
 
 class ContactAPITest(APITestCase):
+    def setUp(self):
+        submission_filter.reset()
+        local_buckets.clear()
+
     def test_create_contact_submission(self):
         url = reverse('contact_create')
         data = {
@@ -122,8 +192,9 @@ class ContactAPITest(APITestCase):
         }
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn('message', response.data)
-        self.assertEqual(ContactSubmission.objects.count(), 1)
+        self.assertEqual(set(response.data), {'message', 'id', 'token'})
+        contact = ContactSubmission.objects.get()
+        self.assertEqual((response.data['id'], response.data['token']), (contact.id, str(contact.submission_token)))
 
     def test_create_contact_submission_invalid_data(self):
         url = reverse('contact_create')
@@ -190,4 +261,1880 @@ class APIOverviewTest(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('message', response.data)
-        self.assertIn('endpoints', response.data)
\ No newline at end of file
+        self.assertIn('endpoints', response.data)
+
+
+class VersionedCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.testimonial = Testimonial.objects.create(
+            client_name="John Doe",
+            client_company="Company A",
+            testimonial_text="Great service!",
+            rating=5,
+            is_featured=True
+        )
+
+    def test_edit_invalidates_cached_list(self):
+        url = reverse('featured_testimonials')
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+        self.testimonial.is_featured = False
+        self.testimonial.save()
+        self.assertEqual(len(self.client.get(url).data), 0)
+
+    def test_delete_invalidates_cached_list(self):
+        url = reverse('featured_testimonials')
+        self.client.get(url)
+        self.testimonial.delete()
+        self.assertEqual(len(self.client.get(url).data), 0)
+
+    def test_cached_list_skips_database(self):
+        url = reverse('featured_testimonials')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_admin_list_editable_invalidates_cache(self):
+        User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        self.client.login(username='root', password='testpass123')
+        url = reverse('featured_testimonials')
+        self.client.get(url)
+
+        version = get_model_version(Testimonial)
+        response = self.client.post(reverse('admin:core_testimonial_changelist'), {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': str(self.testimonial.pk),
+            'form-0-is_active': 'on',
+            '_save': 'Save',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(get_model_version(Testimonial), version)
+        self.assertEqual(len(self.client.get(url).data), 0)
+
+    @override_settings(CORE_CACHE_TIMEOUT=60)
+    def test_query_strings_share_the_cached_detail(self):
+        service = Service.objects.create(title="Web", description="Web", icon="fa-code")
+        for async_routes in ([], ['all']):
+            cache.clear()
+            with override_settings(ROOT_URLCONF=build_urlconf(async_routes)):
+                url = reverse('service_detail', kwargs={'pk': service.pk})
+                self.client.get(url)
+                entries = len(cache._cache)
+                with self.assertNumQueries(0):
+                    for i in range(5):
+                        self.assertEqual(self.client.get(f'{url}?junk={i}').status_code, 200)
+            self.assertEqual(len(cache._cache), entries, async_routes)
+            expiries = [expires for key, expires in cache._expire_info.items() if ':ServiceDetailView:' in key]
+            self.assertEqual(len(expiries), 1)
+            self.assertLessEqual(expiries[0], time.time() + 60)
+
+    @override_settings(CORE_CACHE_TIMEOUT=60)
+    def test_detail_validators_expire_and_misses_are_not_cached(self):
+        service = Service.objects.create(title="Web", description="Web", icon="fa-code")
+        for async_routes in ([], ['all']):
+            cache.clear()
+            with override_settings(ROOT_URLCONF=build_urlconf(async_routes)):
+                for pk in range(1000, 1010):
+                    self.assertEqual(self.client.get(reverse('service_detail', kwargs={'pk': pk})).status_code, 404)
+                self.assertFalse([key for key in cache._cache if ':validators:' in key], async_routes)
+
+                self.client.get(reverse('service_detail', kwargs={'pk': service.pk}))
+            expiries = [expires for key, expires in cache._expire_info.items() if ':validators:' in key]
+            self.assertEqual(len(expiries), 1)
+            self.assertLessEqual(expiries[0], time.time() + 60)
+
+
+class SnapshotTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+        Service.objects.create(
+            title="Web Development",
+            description="Custom web development",
+            icon="fa-code",
+            order=1
+        )
+
+    def test_snapshot_matches_serializer_output(self):
+        response = self.client.get(reverse('service_list'))
+        expected = ServiceSerializer(
+            Service.objects.filter(is_active=True).order_by('order'), many=True
+        ).data
+        self.assertEqual(response.json(), json.loads(json.dumps(expected)))
+
+    def test_snapshot_follows_the_view_queryset(self):
+        from .views import ServiceListView
+
+        Service.objects.create(title="SEO", description="Search", icon="fa-search", order=2)
+        with patch.object(ServiceListView, 'get_queryset', lambda view: Service.objects.filter(order=2)):
+            response = self.client.get(reverse('service_list'))
+        self.assertEqual([service['title'] for service in response.json()], ["SEO"])
+
+    def test_snapshot_served_without_queries(self):
+        call_command('warm_snapshots', stdout=StringIO())
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('service_list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_snapshot_rerendered_after_edit(self):
+        self.client.get(reverse('service_list'))
+        Service.objects.update(title="Ignored")  # no signal, stays cached
+        service = Service.objects.get()
+        service.title = "Web Design"
+        service.save()
+        response = self.client.get(reverse('service_list'))
+        self.assertEqual(response.data[0]['title'], "Web Design")
+
+    @override_settings(CORE_CACHE_LOCAL_VERSION_TIMEOUT=600)
+    def test_edits_by_other_workers_show_once_local_versions_expire(self):
+        self.client.get(reverse('service_list'))
+        # Saved by another worker: its version bump never reaches this cache
+        Service.objects.update(title="Edited elsewhere")
+        self.assertEqual(self.client.get(reverse('service_list')).data[0]['title'], "Web Development")
+        later = time.time() + 601
+        with patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            response = self.client.get(reverse('service_list'))
+        self.assertEqual(response.data[0]['title'], "Edited elsewhere")
+
+    def test_snapshot_loaded_from_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(SNAPSHOT_DIR=directory):
+                snapshot = snapshots.get('services')
+                self.assertTrue(os.path.exists(
+                    os.path.join(directory, f'services.{snapshot.version}.json')
+                ))
+                # A fresh worker loads the file instead of rendering; only
+                # the validators aggregate hits the database
+                snapshots.clear()
+                with self.assertNumQueries(1):
+                    self.assertEqual(snapshots.get('services').body, snapshot.body)
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+        self.service = Service.objects.create(
+            title="Web Development",
+            description="Custom web development",
+            icon="fa-code",
+            order=1
+        )
+        Testimonial.objects.create(
+            client_name="John Doe",
+            testimonial_text="Great service!",
+            is_featured=True
+        )
+
+    def test_list_endpoints_send_validators(self):
+        for name in ['service_list', 'testimonial_list', 'featured_testimonials']:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('Last-Modified', response)
+
+    def test_matching_etag_returns_not_modified(self):
+        url = reverse('testimonial_list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_changes_with_row_count(self):
+        url = reverse('testimonial_list')
+        etag = self.client.get(url)['ETag']
+        Testimonial.objects.create(client_name="Jane Smith", testimonial_text="Good work!")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_conditional_get(self):
+        url = reverse('service_detail', kwargs={'pk': self.service.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_detail_is_not_conditional(self):
+        url = reverse('service_detail', kwargs={'pk': self.service.pk + 1})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SpooledIngestionTest(APITestCase):
+    data = {
+        'name': 'Test User',
+        'email': 'Test@Example.com',
+        'message': 'This is a test message for contact form.'
+    }
+
+    def setUp(self):
+        submission_filter.reset()
+        local_buckets.clear()
+
+    def test_post_is_queued_and_flushed_in_batch(self):
+        with local_spool() as spool:
+            for i in range(3):
+                # Distinct messages, or the duplicate filter would drop two
+                data = {**self.data, 'message': f"{self.data['message']} #{i}"}
+                response = self.client.post(
+                    reverse('contact_create'), data, format='json',
+                    HTTP_USER_AGENT='test-agent'
+                )
+                self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(ContactSubmission.objects.count(), 0)
+            self.assertEqual(len(spool), 3)
+
+            # savepoint, token lookup, IP and agent insert-if-missing + select, insert, counter insert + update, release
+            with self.assertNumQueries(10):
+                self.assertEqual(flush_spool(), 3)
+            self.assertEqual(len(spool), 0)
+
+        contact = ContactSubmission.objects.get(submission_token=response.data['token'])
+        self.assertEqual(contact.email, 'test@example.com')
+        self.assertEqual(contact.user_agent, 'test-agent')
+        self.assertEqual(contact.ip_address, '127.0.0.1')
+
+    def test_replayed_entry_is_inserted_once(self):
+        with local_spool() as spool:
+            token = enqueue_submission(self.data)
+            record = json.loads(next(spool.pending.iterdir()).read_text())
+            flush_spool()
+            spool.put(record)
+            flush_spool()
+        self.assertEqual(ContactSubmission.objects.filter(submission_token=token).count(), 1)
+
+    def test_entries_of_dead_worker_are_recovered(self):
+        with local_spool() as spool:
+            enqueue_submission(self.data)
+            path = next(spool.pending.iterdir())
+            os.rename(path, spool.inflight / f'999999999.{path.name}')
+            self.assertEqual(flush_spool(), 0)
+
+            call_command('flush_contact_spool', stdout=StringIO())
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def failing_bulk_create(self, names):
+        """Make inserting submissions named one of ``names`` fail"""
+        bulk_create = QuerySet.bulk_create
+
+        def wrapper(queryset, objs, *args, **kwargs):
+            if any(getattr(obj, 'name', None) in names for obj in objs):
+                raise DatabaseError('insert failed')
+            return bulk_create(queryset, objs, *args, **kwargs)
+        return patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=wrapper)
+
+    @override_settings(CONTACT_SPOOL_RETRY_DELAY=60, CONTACT_SPOOL_MAX_ATTEMPTS=3)
+    def test_failed_batch_is_requeued_with_a_delay(self):
+        with local_spool() as spool, self.failing_bulk_create({'Test User'}), self.assertLogs('core.ingestion'):
+            token = enqueue_submission(self.data)
+            self.assertEqual(flush_spool(), 1)
+            self.assertEqual(len(spool), 1)
+            self.assertEqual(list(spool.inflight.iterdir()), [])
+            record = json.loads(next(spool.pending.iterdir()).read_text())
+            self.assertEqual((record['token'], record['attempts']), (str(token), 1))
+            self.assertEqual(flush_spool(), 0)  # Not due for a minute
+        self.assertEqual(ContactSubmission.objects.count(), 0)
+
+    @override_settings(CONTACT_SPOOL_RETRY_DELAY=0, CONTACT_SPOOL_MAX_ATTEMPTS=3)
+    def test_failing_entry_goes_to_dead_letters_without_the_rest(self):
+        with local_spool() as spool, self.failing_bulk_create({'Poison'}), self.assertLogs('core.ingestion') as logs:
+            enqueue_submission(self.data)
+            poison = enqueue_submission({**self.data, 'name': 'Poison', 'message': 'Another message.'})
+            self.assertEqual(flush_spool(), 2)
+            self.assertEqual(ContactSubmission.objects.get().name, 'Test User')
+
+            while flush_spool():
+                pass
+            self.assertEqual(len(spool), 0)
+            [dead] = spool.dead.iterdir()
+            record = json.loads(dead.read_text())
+        self.assertEqual((record['token'], record['attempts']), (str(poison), 3))
+        self.assertIn('moved to dead/', logs.output[-1])
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyEmailBackend.failures:
+            FlakyEmailBackend.failures -= 1
+            raise ConnectionError('SMTP unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    CONTACT_NOTIFICATIONS_ENABLED=True,
+    NOTIFICATION_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_DIGEST_THRESHOLD=3,
+    NOTIFICATION_RETRY_BACKOFF=0,
+)
+class NotificationDispatcherTest(APITestCase):
+    def setUp(self):
+        submission_filter.reset()
+        local_buckets.clear()
+        self.dispatcher = NotificationDispatcher()
+        self.worker = NotificationWorker(self.dispatcher, 0)
+
+    def make_submissions(self, count):
+        return [
+            ContactSubmission.objects.create(
+                name=f"User {i}", email=f"user{i}@example.com", message="Hello there, we need a website."
+            )
+            for i in range(count)
+        ]
+
+    def test_post_does_not_send_inline(self):
+        # The lookup ids learnt on "commit" are rolled back with the test
+        self.addCleanup(reset_lookup_caches)
+        with patch('core.notifications.dispatcher.submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('contact_create'), {
+                    'name': 'Test User',
+                    'email': 'test@example.com',
+                    'message': 'This is a test message for contact form.'
+                }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        submitted = submit.call_args.args[0]
+        self.assertEqual(str(submitted[0].submission_token), response.data['token'])
+
+    def test_small_batch_sends_one_email_each(self):
+        self.dispatcher.submit(self.make_submissions(2), start=False)
+        self.worker.drain()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, "New Contact Form Submission from User 0")
+        self.assertEqual(mail.outbox[0].to, [settings.ADMIN_EMAIL])
+
+    def test_large_batch_sends_digest(self):
+        self.dispatcher.submit(self.make_submissions(5), start=False)
+        self.worker.drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "5 new contact form submissions")
+
+    @override_settings(NOTIFICATION_EMAIL_BACKEND='core.tests.FlakyEmailBackend')
+    def test_failed_send_is_retried(self):
+        FlakyEmailBackend.failures = 2
+        self.dispatcher.submit(self.make_submissions(1), start=False)
+        self.worker.drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(FlakyEmailBackend.failures, 0)
+
+
+class ContactSearchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.website = ContactSubmission.objects.create(
+            name="Alice Brown", email="alice@example.com",
+            message="We need a new website, the website is slow"
+        )
+        self.mobile = ContactSubmission.objects.create(
+            name="Bob Green", email="bob@corp.io",
+            message="Looking for a mobile app and maybe a website"
+        )
+        ContactSubmission.objects.create(
+            name="Carol White", email="carol@example.org", message="SEO audit please"
+        )
+
+    def search(self, term):
+        response = self.client.get(reverse('admin_contact_list'), {'search': term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_results_are_ranked(self):
+        self.assertEqual(self.search('website'), [self.website.id, self.mobile.id])
+
+    def test_matches_name_email_and_word_prefixes(self):
+        self.assertEqual(self.search('Bob'), [self.mobile.id])
+        self.assertEqual(self.search('corp.io'), [self.mobile.id])
+        self.assertEqual(self.search('mobi'), [self.mobile.id])
+        self.assertEqual(self.search('website slow'), [self.website.id])
+
+    def test_index_follows_updates_and_bulk_inserts(self):
+        ContactSubmission.objects.filter(pk=self.mobile.pk).update(message="Branding only")
+        self.assertEqual(self.search('mobile'), [])
+        ContactSubmission.objects.bulk_create([
+            ContactSubmission(name="Dan Black", email="dan@example.com", message="Mobile game")
+        ])
+        self.assertEqual(len(self.search('mobile')), 1)
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"website OR NEAR( *'), [])
+
+    def test_admin_search(self):
+        ContactSubmission.objects.filter(pk=self.mobile.pk).update(phone='+1 (555) 010-0199')
+        User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        self.client.login(username='root', password='testpass123')
+        url = reverse('admin:core_contactsubmission_changelist')
+        for term, expected in [('website', [self.website, self.mobile]), ('010-0199', [self.mobile]),
+                               ('+1 (555)', [self.mobile]), ('555 999', [])]:
+            response = self.client.get(url, {'q': term})
+            self.assertEqual(list(response.context['cl'].result_list), expected, term)
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        now = timezone.now()
+        # Pairs share a timestamp so ties have to be broken by id
+        ContactSubmission.objects.bulk_create([
+            ContactSubmission(
+                name=f"User {i}", email=f"user{i}@example.com", message="Hello",
+                created_at=now - datetime.timedelta(minutes=i // 2)
+            )
+            for i in range(45)
+        ])
+        self.expected = list(
+            ContactSubmission.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def test_walks_every_row_once_in_both_directions(self):
+        url = reverse('admin_contact_list')
+        seen, pages = [], []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            pages.append(response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_count_is_opt_in(self):
+        response = self.client.get(reverse('admin_contact_list'), {'count': 'true'})
+        self.assertEqual(response.data['count'], 45)
+        self.assertNotIn('count=', response.data['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ['garbage', 'eyJ2IjpbIm5vdC1hLWRhdGUiLDFdLCJwIjpmYWxzZX0=']:
+            response = self.client.get(reverse('admin_contact_list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_results_are_paginated_by_rank(self):
+        url = reverse('admin_contact_list') + '?search=hello'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(self.expected))
+
+
+class IndexAdvisorTest(TestCase):
+    def test_read_endpoints_do_not_scan_tables(self):
+        out = StringIO()
+        call_command('explain_endpoints', '--fail-on-scan', stdout=out)
+        self.assertIn('No full table scans', out.getvalue())
+
+
+class ContactExportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        ContactSubmission.objects.create(
+            name="Alice Brown", email="alice@example.com",
+            message="Need a website,\nwith \"quotes\"", status='replied'
+        )
+        ContactSubmission.objects.create(
+            name="Bob Green", email="bob@example.com", message="Mobile app please"
+        )
+
+    def export(self, export_format, **params):
+        response = self.client.get(
+            reverse('admin_contact_export', kwargs={'export_format': export_format}), params
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+        self.assertEqual([row['name'] for row in rows], ["Bob Green", "Alice Brown"])
+        self.assertEqual(rows[1]['message'], "Need a website,\nwith \"quotes\"")
+
+    def test_csv_export_escapes_formulas(self):
+        ContactSubmission.objects.all().delete()
+        ContactSubmission.objects.create(
+            name="=HYPERLINK(\"http://evil.example\")", email="@evil@example.com",
+            phone="+1 555 0100", message="-2+3"
+        )
+        ContactSubmission.objects.create(name="\tTab", email="ok@example.com", message="\rcarriage")
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+        self.assertEqual(
+            [(row['name'], row['email'], row['phone'], row['message']) for row in rows],
+            [("'\tTab", "ok@example.com", "", "'\rcarriage"),
+             ("'=HYPERLINK(\"http://evil.example\")", "'@evil@example.com", "'+1 555 0100", "'-2+3")]
+        )
+        # NDJSON is data, not a spreadsheet: left as is
+        lines = self.export('ndjson').splitlines()
+        self.assertEqual(json.loads(lines[1])['message'], "-2+3")
+
+    def test_ndjson_export_with_filters(self):
+        lines = self.export('ndjson', status='new').splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ["Bob Green"])
+        lines = self.export('ndjson', search='website').splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ["Alice Brown"])
+
+    def test_export_requires_auth_and_known_format(self):
+        url = reverse('admin_contact_export', kwargs={'export_format': 'xml'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=None)
+        url = reverse('admin_contact_export', kwargs={'export_format': 'csv'})
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contacts.ndjson')
+            call_command('export_contacts', '--format', 'ndjson', '--status', 'replied',
+                         '--output', path, stderr=StringIO())
+            with open(path) as fh:
+                self.assertEqual(json.loads(fh.readline())['email'], "alice@example.com")
+
+
+class RequestMetricsTest(APITestCase):
+    def setUp(self):
+        registry.reset()
+        snapshots.clear()
+        self.user = User.objects.create_user(username='admin', password='testpass123')
+        ContactSubmission.objects.create(name="Test User", email="test@example.com", message="Hello")
+
+    def test_records_per_view_metrics(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse('admin_contact_list'))
+        self.client.get(reverse('admin_contact_list'))
+
+        self.assertEqual(registry.get_counter(
+            'core_http_requests_total', view='admin_contact_list', status=200), 2)
+        queries = registry.get_histogram('core_db_queries_per_request', view='admin_contact_list')
+        self.assertEqual(queries.count, 2)
+        self.assertEqual(queries.quantile(0.5), 1)
+        serializer = registry.get_histogram('core_serializer_duration_seconds', view='admin_contact_list')
+        self.assertGreater(serializer.total, 0)
+        size = registry.get_histogram('core_http_response_size_bytes', view='admin_contact_list')
+        self.assertGreater(size.max, 100)
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        self.client.get(reverse('service_list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertIn(response.status_code, (401, 403))
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE core_http_request_duration_seconds histogram', body)
+        self.assertIn('core_http_request_duration_seconds_bucket{view="service_list",le="+Inf"} 1', body)
+        self.assertIn('core_http_request_duration_seconds_quantile{view="service_list",quantile="0.99"}', body)
+
+    def test_slow_sampled_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(REQUEST_PROFILING_SAMPLE_RATE=1.0,
+                               REQUEST_PROFILING_SLOW_MS=0,
+                               REQUEST_PROFILING_DIR=directory):
+                self.client.get(reverse('api_overview'))
+            profiles = os.listdir(directory)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith('api_overview-'))
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram(scale=1e6)
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.5, delta=0.5 * 0.04)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.99, delta=0.99 * 0.04)
+        self.assertEqual(histogram.cumulative([0.1, 10])[1], 1000)
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+
+    def test_benchmark_covers_every_route(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark', use_current_db=True, services=3, testimonials=3, contacts=20,
+                requests=2, concurrency=0, output=output, stdout=StringIO()
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['meta']['volumes']['contacts'], 20 + 2 + 2)  # plus the POSTs
+        routes = report['routes']
+        for name in ('service_list', 'service_detail', 'contact_create', 'admin_contact_list',
+                     'admin_contact_list?search=website', 'admin_contact_export?search=urgent quote&status=new'):
+            self.assertIn(name, routes)
+            self.assertLess(routes[name]['status'], 400, name)
+        self.assertEqual(routes['service_list']['queries_per_request'], 0)
+        self.assertEqual(routes['admin_contact_list']['queries_per_request'], 1)
+
+    def test_compare_reports_flags_regressions(self):
+        from .management.commands.benchmark import compare_reports
+
+        baseline = {'routes': {
+            'service_list': {'p99_ms': 10.0, 'throughput_rps': 100.0, 'queries_per_request': 0},
+            'admin_contact_list': {'p99_ms': 10.0, 'throughput_rps': 100.0, 'queries_per_request': 1},
+        }}
+        current = {'routes': {
+            'service_list': {'p99_ms': 11.0, 'throughput_rps': 90.0, 'queries_per_request': 0},
+            'admin_contact_list': {'p99_ms': 15.0, 'throughput_rps': 50.0, 'queries_per_request': 2},
+        }}
+        regressions = compare_reports(baseline, current, threshold=0.2)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(r.startswith('admin_contact_list:') for r in regressions))
+
+
+class QueryBudgetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+        for i in range(3):
+            Service.objects.create(title=f"Service {i}", description="Web work", icon="fa-code", order=i)
+            Testimonial.objects.create(
+                client_name=f"Client {i}", client_company="Co", client_position="CEO",
+                testimonial_text="Great", rating=5, is_featured=True
+            )
+            ContactSubmission.objects.create(
+                name=f"Person {i}", email=f"p{i}@example.com", message="Need an urgent website quote"
+            )
+
+    def test_every_endpoint_is_within_budget(self):
+        out = StringIO()
+        call_command('query_budgets', requests=2, fail=True, stdout=out)
+        self.assertIn('All endpoints within their query budgets', out.getvalue())
+
+    def test_budget_report_fails_when_exceeded(self):
+        from .budgets import QueryBudget
+        from .views import ContactSubmissionListView
+
+        with patch.object(ContactSubmissionListView, 'query_budget', QueryBudget(0, None)):
+            out = StringIO()
+            with self.assertRaises(CommandError):
+                call_command('query_budgets', requests=1, fail=True, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('admin_contact_list'))  # Most over budget first
+        self.assertIn('FAIL admin_contact_list: 1 queries (budget 0)', out.getvalue())
+
+    @override_settings(QUERY_BUDGET_WARNINGS=True)
+    def test_runtime_warning_when_over_budget(self):
+        from .budgets import QueryBudget
+        from .views import ContactSubmissionListView
+
+        user = User.objects.create_user(username='admin', password='testpass123')
+        self.client.force_authenticate(user=user)
+        registry.reset()
+        with patch.object(ContactSubmissionListView, 'query_budget', QueryBudget(0, None)):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.client.get(reverse('admin_contact_list'))
+        self.assertIn('admin_contact_list over query budget: 1 queries (budget 0)', logs.output[0])
+        self.assertEqual(registry.get_counter('core_query_budget_exceeded_total', view='admin_contact_list'), 1)
+
+
+class AsyncViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+        self.service = Service.objects.create(
+            title="Web Development", description="Custom web development", icon="fa-code", order=1
+        )
+        Testimonial.objects.create(
+            client_name="John Doe", client_company="Test Corp", client_position="CEO",
+            testimonial_text="Great service!", rating=5, is_featured=True
+        )
+
+    def get(self, async_routes, name, **kwargs):
+        with override_settings(ROOT_URLCONF=build_urlconf(async_routes)):
+            return self.client.get(reverse(name, kwargs=kwargs or None))
+
+    def test_async_views_match_sync_views(self):
+        routes = [
+            ('api_overview', {}),
+            ('service_list', {}),
+            ('service_detail', {'pk': self.service.pk}),
+            ('testimonial_list', {}),
+            ('featured_testimonials', {}),
+        ]
+        for name, kwargs in routes:
+            sync_response = self.get([], name, **kwargs)
+            cache.clear()
+            snapshots.clear()
+            async_response = self.get(['all'], name, **kwargs)
+            self.assertEqual(async_response.status_code, 200, name)
+            self.assertEqual(async_response.content, sync_response.content, name)
+            self.assertEqual(async_response['Content-Type'], 'application/json')
+            self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'), name)
+
+    def test_async_routes_are_switchable(self):
+        from .async_views import ServiceListView as AsyncServiceListView
+
+        with override_settings(ROOT_URLCONF=build_urlconf(['service_list'])):
+            from django.urls import resolve
+            self.assertIs(resolve(reverse('service_list')).func.view_class, AsyncServiceListView)
+            self.assertEqual(resolve(reverse('service_detail', kwargs={'pk': 1})).func.view_class.__module__,
+                             'core.views')
+
+    def test_async_detail_conditional_get_and_404(self):
+        with override_settings(ROOT_URLCONF=build_urlconf(['all'])):
+            url = reverse('service_detail', kwargs={'pk': self.service.pk})
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+            response = self.client.get(reverse('service_detail', kwargs={'pk': 999}))
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {'detail': 'No Service matches the given query.'})
+
+            self.service.title = "Changed"
+            self.service.save()
+            self.assertEqual(self.client.get(url).json()['title'], "Changed")
+
+    def test_async_views_are_throttled(self):
+        from rest_framework.throttling import AnonRateThrottle
+
+        with patch.object(AnonRateThrottle, 'THROTTLE_RATES', {'anon': '2/min', 'user': None}):
+            statuses = [self.get(['all'], 'service_list').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    async def test_async_views_recorded_by_metrics(self):
+        # Through the ASGI handler, so the middleware runs on the event loop
+        # and the queries in a sync_to_async thread
+        registry.reset()
+        with override_settings(ROOT_URLCONF=build_urlconf(['all'])):
+            response = await self.async_client.get(reverse('service_list'))
+        self.assertEqual(response.status_code, 200)
+        queries = registry.get_histogram('core_db_queries_per_request', view='service_list')
+        self.assertEqual(queries.count, 1)
+        self.assertEqual(queries.max, 2)  # Snapshot rebuild: list + validators
+
+    def test_benchmark_asgi_runs_every_mode(self):
+        out = StringIO()
+        call_command('benchmark_asgi', routes=['api_overview'], requests=4, concurrency=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[1] for line in lines], ['wsgi', 'asgi-sync', 'asgi-async'])
+        self.assertFalse(any('errors' in line for line in lines))
+
+
+class CompiledSerializerTest(TestCase):
+    def setUp(self):
+        Service.objects.create(title="Web Development", description="Custom sites", icon="fa-code", order=1)
+        Service.objects.create(title="SEO", description="Ünïcode \"quoted\"", icon="", order=2)
+        Testimonial.objects.create(
+            client_name="John Doe", client_company="Test Corp", testimonial_text="Great service!",
+            rating=5, is_featured=True, client_image='testimonials/john.jpg'
+        )
+        Testimonial.objects.create(client_name="Jane Roe", testimonial_text="Good", rating=4)
+        Testimonial.objects.create(client_name="No Image", testimonial_text="Fine", rating=3, client_image='')
+
+    def assertSameBytes(self, serializer_class, queryset):
+        from rest_framework.renderers import JSONRenderer
+
+        compiled = compile_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        self.assertEqual(JSONRenderer().render(compiled.serialize(compiled.rows(queryset))), expected)
+
+    def test_output_matches_drf_byte_for_byte(self):
+        for tz in ('UTC', 'America/New_York'):
+            with timezone.override(tz):
+                self.assertSameBytes(ServiceSerializer, Service.objects.all())
+                self.assertSameBytes(TestimonialSerializer, Testimonial.objects.all())
+
+    def test_snapshots_render_compiled(self):
+        with patch.object(ServiceSerializer, 'to_representation') as to_representation:
+            response = self.client.get(reverse('service_list'))
+        to_representation.assert_not_called()
+        expected = ServiceSerializer(Service.objects.filter(is_active=True).order_by('order'), many=True).data
+        self.assertEqual(response.json(), json.loads(json.dumps(expected)))
+
+    def test_non_column_fields_are_rejected(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from rest_framework import serializers
+
+        class WithMethodField(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Service
+                fields = ['id', 'label']
+
+        with self.assertRaises(ImproperlyConfigured):
+            compile_serializer(WithMethodField)
+
+    def test_benchmark_checks_parity(self):
+        out = StringIO()
+        call_command('benchmark_serializers', use_current_db=True, rows=20, repeat=1, stdout=out)
+        self.assertIn('services', out.getvalue())
+        self.assertIn('testimonials', out.getvalue())
+
+
+class FastJSONRendererTest(TestCase):
+    data = [{
+        'created_at': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        'local': datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+        'day': datetime.date(2024, 1, 2),
+        'price': decimal.Decimal('19.90'),
+        'text': 'Ünïcode "quoted" \u2028 line',
+        'rating': 5,
+        'nested': {'ok': True, 'none': None},
+    }]
+
+    def test_same_bytes_as_drf_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_falls_back_to_stdlib(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        indented = FastJSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertIn(b'\n  ', indented)
+
+    def test_api_uses_configured_renderer(self):
+        from rest_framework.settings import api_settings
+        from .renderers import FastJSONRenderer
+
+        self.assertIs(api_settings.DEFAULT_RENDERER_CLASSES[0], FastJSONRenderer)
+
+
+class CompressionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+        Testimonial.objects.bulk_create(
+            Testimonial(client_name=f"Client {i}", testimonial_text="Great service! " * 5, rating=5)
+            for i in range(30)
+        )
+
+    def test_large_responses_are_compressed(self):
+        import gzip
+
+        plain = self.client.get(reverse('testimonial_list'))
+        response = self.client.get(reverse('testimonial_list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+
+        not_modified = self.client.get(
+            reverse('testimonial_list'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_small_or_refused_responses_are_not_compressed(self):
+        response = self.client.get(reverse('api_overview'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get(reverse('testimonial_list'), HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', response)
+        with override_settings(RESPONSE_COMPRESSION=False):
+            response = self.client.get(reverse('testimonial_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_admin_and_authenticated_responses_are_not_compressed(self):
+        User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        for i in range(30):
+            ContactSubmission.objects.create(name=f"Client {i}", email=f"c{i}@example.com", message="Hello " * 20)
+
+        self.client.login(username='root', password='testpass123')
+        for url in [reverse('admin:core_contactsubmission_changelist'), reverse('admin_contact_list')]:
+            response = self.client.get(url, {'search': 'hello'} if url.startswith('/api') else {},
+                                       HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, 200, url)
+            self.assertGreater(len(response.content), settings.RESPONSE_COMPRESSION_MIN_BYTES, url)
+            self.assertNotIn('Content-Encoding', response, url)
+        # The public lists, even with a session
+        response = self.client.get(reverse('testimonial_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+        self.client.logout()
+        token = Token.objects.create(user=User.objects.get(username='root'))
+        response = self.client.get(reverse('admin_contact_list'), HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_snapshots_are_compressed_once(self):
+        from . import compression
+
+        with patch('core.snapshots.compress', wraps=compression.compress) as mock:
+            for _ in range(3):
+                self.client.get(reverse('testimonial_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(mock.call_count, 1)
+
+    def test_negotiation_prefers_client_weights_then_brotli(self):
+        from . import compression
+
+        encoders = {'br': lambda content: content, 'gzip': lambda content: content}
+        with patch.object(compression, 'ENCODERS', encoders):
+            self.assertEqual(compression.negotiate_encoding('gzip, br'), 'br')
+            self.assertEqual(compression.negotiate_encoding('gzip;q=1.0, br;q=0.5'), 'gzip')
+            self.assertEqual(compression.negotiate_encoding('*'), 'br')
+            self.assertIsNone(compression.negotiate_encoding('identity'))
+            self.assertIsNone(compression.negotiate_encoding(''))
+
+
+@override_settings(IMAGE_DERIVATIVES_AUTOSTART=False)
+class ImageDerivativeTest(TestCase):
+    def setUp(self):
+        from . import images
+
+        self.images = images
+        media_root = tempfile.mkdtemp(prefix='media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        cache.clear()
+        snapshots.clear()
+
+    def make_upload(self, size=(800, 600), name='avatar.jpg', image_format='JPEG', exif=True):
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        image = Image.new('RGB', size, (200, 30, 30))
+        options = {}
+        if exif:
+            metadata = Image.Exif()
+            metadata[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+            metadata[0x010F] = 'SecretCam'  # Make
+            options['exif'] = metadata.tobytes()
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def create_testimonial(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            testimonial = Testimonial.objects.create(
+                client_name="John Doe", testimonial_text="Great service!", rating=5, client_image=upload
+            )
+        self.images.worker.drain()
+        testimonial.refresh_from_db()
+        return testimonial
+
+    def test_upload_builds_derivatives_in_background(self):
+        from PIL import Image
+
+        testimonial = self.create_testimonial(self.make_upload())
+        variants = testimonial.client_image_variants
+        self.assertEqual(variants['source'], testimonial.client_image.name)
+        self.assertEqual(set(variants['formats']), {'webp', 'jpeg'})
+        storage = self.images.get_storage()
+        for image_format, extension in (('webp', 'webp'), ('jpeg', 'jpg')):
+            sizes = variants['formats'][image_format]
+            self.assertEqual(list(sizes), ['96', '192', '384'])
+            for width, name in sizes.items():
+                self.assertRegex(name, rf'^testimonials/derived/[0-9a-f]{{16}}-{width}w\.{extension}$')
+                with storage.open(name) as f, Image.open(f) as image:
+                    # Rotated by its EXIF orientation, then stripped of metadata
+                    self.assertEqual(image.size, (int(width), round(int(width) * 800 / 600)))
+                    self.assertEqual(len(image.getexif()), 0)
+                    self.assertNotIn('icc_profile', image.info)
+
+    def test_serializer_exposes_srcset(self):
+        testimonial = self.create_testimonial(self.make_upload())
+        item = self.client.get(reverse('testimonial_list')).json()[0]
+        webp = testimonial.client_image_variants['formats']['webp']
+        self.assertEqual(
+            item['client_image_srcset']['webp'],
+            f"/media/{webp['96']} 96w, /media/{webp['192']} 192w, /media/{webp['384']} 384w",
+        )
+        self.assertIn('jpeg', item['client_image_srcset'])
+        self.assertEqual(item['client_image_url'], testimonial.client_image.name)
+
+    def test_small_images_are_not_upscaled(self):
+        testimonial = self.create_testimonial(self.make_upload(size=(60, 40), name='tiny.png',
+                                                               image_format='PNG', exif=False))
+        self.assertEqual(list(testimonial.client_image_variants['formats']['webp']), ['60'])
+
+    def test_replacing_the_image_drops_old_derivatives(self):
+        testimonial = self.create_testimonial(self.make_upload())
+        testimonial.client_image = self.make_upload(name='new.jpg')
+        testimonial.save()
+        self.assertEqual(testimonial.client_image_variants, {})
+        self.assertEqual(Testimonial.objects.get().client_image_variants, {})
+
+    def test_unreadable_image_is_recorded_once(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        with self.assertLogs('core.images', 'WARNING'):
+            testimonial = self.create_testimonial(SimpleUploadedFile('broken.jpg', b'not an image'))
+        self.assertEqual(testimonial.client_image_variants,
+                         {'source': testimonial.client_image.name, 'formats': {}})
+
+    def test_backfill_command(self):
+        name = self.images.get_storage().save('testimonials/old.jpg', self.make_upload())
+        Testimonial.objects.create(client_name="Old", testimonial_text="Imported", rating=4)
+        Testimonial.objects.update(client_image=name)  # As if uploaded before the pipeline existed
+
+        out = StringIO()
+        call_command('backfill_image_derivatives', stdout=out)
+        self.assertIn('1 images processed', out.getvalue())
+        self.assertEqual(Testimonial.objects.get().client_image_variants['source'], name)
+
+        call_command('backfill_image_derivatives', stdout=out)
+        self.assertIn('0 images processed', out.getvalue())
+
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401  fakeredis needs it to run Lua scripts
+except ImportError:
+    fakeredis = None
+
+
+class BrokenRedis:
+    """A Redis client whose server is down"""
+
+    def register_script(self, source):
+        def script(**kwargs):
+            from redis.exceptions import ConnectionError
+            raise ConnectionError('Connection refused')
+        return script
+
+
+class TokenBucketThrottleTest(APITestCase):
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+
+    def test_local_bucket_refills_over_time(self):
+        from .throttling import LocalTokenBuckets
+
+        buckets = LocalTokenBuckets()
+        with patch('core.throttling.time.time', return_value=1000.0):
+            results = [buckets.take('key', 2, 0.5) for _ in range(3)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, False])
+        self.assertAlmostEqual(results[2][1], 2.0)  # One token every 2s
+        with patch('core.throttling.time.time', return_value=1002.0):
+            self.assertTrue(buckets.take('key', 2, 0.5)[0])
+            self.assertFalse(buckets.take('key', 2, 0.5)[0])
+
+    def test_local_buckets_are_bounded(self):
+        from .throttling import LocalTokenBuckets
+
+        buckets = LocalTokenBuckets(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            buckets.take(key, 1, 1.0)
+        self.assertEqual(list(buckets._buckets), ['b', 'c'])
+
+    @skipUnless(fakeredis, 'fakeredis with lupa is not installed')
+    def test_redis_buckets_are_shared_between_workers(self):
+        from .throttling import LocalTokenBuckets, RedisTokenBuckets
+
+        server = fakeredis.FakeServer()
+        workers = [
+            RedisTokenBuckets(fakeredis.FakeRedis(server=server), LocalTokenBuckets()) for _ in range(2)
+        ]
+        results = [workers[i % 2].take('core:throttle:test', 3, 3 / 3600) for i in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[3][1], 1200, delta=1)
+        self.assertGreater(fakeredis.FakeRedis(server=server).pttl('core:throttle:test'), 0)
+
+    @skipUnless(fakeredis, 'fakeredis with lupa is not installed')
+    def test_async_views_use_redis_buckets(self):
+        from rest_framework.throttling import SimpleRateThrottle
+        from .throttling import RedisTokenBuckets
+
+        server = fakeredis.FakeServer()
+        buckets = RedisTokenBuckets(
+            fakeredis.FakeRedis(server=server), local_buckets,
+            async_client_factory=lambda: fakeredis.FakeAsyncRedis(server=server),
+        )
+        rates = {'anon': '2/min', 'user': None}
+        with patch('core.throttling.get_token_buckets', return_value=buckets), \
+                patch.object(SimpleRateThrottle, 'THROTTLE_RATES', rates), \
+                override_settings(ROOT_URLCONF=build_urlconf(['all'])):
+            statuses = [self.client.get(reverse('api_overview')).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(len(fakeredis.FakeRedis(server=server).keys('core:throttle:*')), 1)
+
+    def test_redis_outage_falls_back_to_local_buckets(self):
+        from .throttling import LocalTokenBuckets, RedisTokenBuckets
+
+        registry.reset()
+        buckets = RedisTokenBuckets(BrokenRedis(), LocalTokenBuckets())
+        with self.assertLogs('core.throttling', 'WARNING') as logs:
+            results = [buckets.take('key', 1, 1 / 60)[0] for _ in range(3)]
+        self.assertEqual(results, [True, False, False])
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(registry.get_counter('core_throttle_fallback_total'), 3)
+
+    def test_contact_form_has_its_own_scope(self):
+        from rest_framework.throttling import SimpleRateThrottle
+
+        rates = {'anon': '100/hour', 'user': '1000/hour', 'contact': '2/minute'}
+        data = {'name': 'Jane Smith', 'email': 'jane@example.com', 'message': 'Need a new website soon.'}
+        with patch.object(SimpleRateThrottle, 'THROTTLE_RATES', rates), \
+                override_settings(CONTACT_FILTER_ENABLED=False):
+            statuses = [self.client.post(reverse('contact_create'), data, format='json').status_code
+                        for _ in range(3)]
+            throttled = self.client.post(reverse('contact_create'), data, format='json')
+            self.assertEqual(self.client.get(reverse('api_overview')).status_code, 200)
+        self.assertEqual(statuses, [201, 201, 429])
+        self.assertEqual(throttled['Retry-After'], '30')
+
+
+class SubmissionFilterTest(APITestCase):
+    data = {
+        'name': 'Jane Smith',
+        'email': 'Jane@Example.com',
+        'message': 'We need a new website for our bakery.',
+    }
+
+    def setUp(self):
+        submission_filter.reset()
+        local_buckets.clear()
+        registry.reset()
+
+    def post(self, data=None, **extra):
+        return self.client.post(reverse('contact_create'), data or self.data, format='json', **extra)
+
+    def filtered(self, action, reason):
+        return registry.get_counter('core_contact_filtered_total', action=action, reason=reason)
+
+    def test_duplicates_are_quarantined_not_stored(self):
+        stored = self.post()
+        self.assertEqual(stored.status_code, status.HTTP_201_CREATED)
+        reworded = {**self.data, 'email': 'jane@example.com', 'message': '  we need a NEW website\nfor our bakery. '}
+        response = self.post(reworded)
+        # Answered exactly like a stored submission, down to a plausible id
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(response.data), set(stored.data))
+        self.assertEqual(response.data['id'], stored.data['id'] + 1)
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+        self.assertEqual(self.filtered('quarantine', 'duplicate'), 1)
+
+        self.assertEqual(self.post({**self.data, 'message': 'Something else entirely.'}).status_code, 201)
+
+    def test_per_ip_volume_is_quarantined(self):
+        with override_settings(CONTACT_IP_MAX_SUBMISSIONS=2):
+            statuses = [
+                self.post({**self.data, 'message': f'Message number {i} about a website.'}).status_code
+                for i in range(3)
+            ]
+            other_ip = self.post({**self.data, 'message': 'From another office.'}, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(statuses, [201, 201, 201])  # The third is quarantined, not stored
+        self.assertEqual(other_ip.status_code, 201)
+        self.assertEqual(ContactSubmission.objects.count(), 3)
+        self.assertEqual(self.filtered('quarantine', 'ip_volume'), 1)
+
+    def test_scorers_reject_and_quarantine(self):
+        spammy = {**self.data, 'message': 'Buy now http://a.example http://b.example http://c.example'}
+        self.assertEqual(self.post(spammy).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.filtered('quarantine', 'score'), 1)
+        with local_spool() as spool:
+            response = self.post({**spammy, 'message': spammy['message'] + ' again'})
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)  # As spooled ones are
+            self.assertEqual(set(response.data), {'message', 'token'})
+            self.assertEqual(len(spool), 0)
+
+        response = self.post({**self.data, 'name': 'www.cheap-pills.example',
+                              'message': 'Visit http://x.example http://y.example http://z.example'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.filtered('reject', 'score'), 1)
+        self.assertEqual(ContactSubmission.objects.count(), 0)
+
+    def test_scorers_are_pluggable(self):
+        with override_settings(CONTACT_SPAM_SCORERS=['core.tests.score_everything']):
+            self.assertEqual(self.post().status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(CONTACT_FILTER_ENABLED=False):
+            self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+
+    def test_message_is_validated_again(self):
+        response = self.post({**self.data, 'message': '  too short  '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('message', response.data)
+
+    def test_duplicate_memory_is_bounded(self):
+        from .spam import RecentKeys
+
+        keys = RecentKeys(window=60, max_entries=3)
+        for key in 'abcd':
+            self.assertFalse(keys.add(key))
+        self.assertEqual(len(keys), 3)
+        self.assertFalse(keys.add('a'))  # Forgotten early
+        self.assertTrue(keys.add('d'))
+        with patch('core.spam.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertFalse(keys.add('d'))
+            self.assertEqual(len(keys), 1)
+
+
+def score_everything(data, ip_address):
+    return 100
+
+
+def add_sqlite_database(alias, path):
+    """Add a migrated SQLite file with the default's settings as ``alias``"""
+    connections.settings[alias] = connections.configure_settings({
+        'default': settings.DATABASES['default'],
+        alias: {**settings.DATABASES['default'], 'NAME': path},
+    })[alias]
+    call_command('migrate', database=alias, verbosity=0)
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+class SQLiteConcurrencyTest(TransactionTestCase):
+    """Contact POSTs from many threads against a file database with the SQLite profile"""
+    threads = 8
+    posts_per_thread = 10
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'sqlite':
+            raise SkipTest('SQLite profile only')
+        # A second alias on a real file: the test database is in memory
+        cls.directory = tempfile.mkdtemp(prefix='concurrency-')
+        add_sqlite_database('concurrency', os.path.join(cls.directory, 'db.sqlite3'))
+        # Set here, not on the class: the runner checks ``databases`` before the alias exists
+        cls.databases = {'default', 'concurrency'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_database('concurrency')
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_simultaneous_posts_are_all_stored(self):
+        from threading import Barrier
+
+        barrier = Barrier(self.threads)
+
+        def post_many(index):
+            client = APIClient()
+            statuses = []
+            try:
+                barrier.wait()
+                for i in range(self.posts_per_thread):
+                    response = client.post(reverse('contact_create'), {
+                        'name': f'User {index}',
+                        'email': f'user{index}@example.com',
+                        'message': f'Concurrent message {i} from thread {index}.',
+                    }, format='json')
+                    statuses.append(response.status_code)
+            finally:
+                connections['concurrency'].close()
+            return statuses
+
+        with override_settings(DATABASE_ROUTERS=[ConcurrencyRouter()],
+                               CONTACT_FILTER_ENABLED=False), \
+                patch.object(APIView, 'check_throttles', lambda self, request: None), \
+                ThreadPoolExecutor(self.threads) as pool:
+            results = list(pool.map(post_many, range(self.threads)))
+
+        statuses = [code for result in results for code in result]
+        self.assertEqual(statuses, [201] * self.threads * self.posts_per_thread)
+        self.assertEqual(ContactSubmission.objects.using('concurrency').count(), len(statuses))
+        with connections['concurrency'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+class ConcurrencyRouter:
+    """Send every query to the file database of SQLiteConcurrencyTest"""
+
+    def db_for_read(self, model, **hints):
+        return 'concurrency'
+
+    def db_for_write(self, model, **hints):
+        return 'concurrency'
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    """Two SQLite files stand in for replicas, holding different rows than the primary"""
+    replicas = ['replica_a', 'replica_b']
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'sqlite':
+            raise SkipTest('SQLite profile only')
+        cls.directory = tempfile.mkdtemp(prefix='replicas-')
+        for alias in cls.replicas:
+            add_sqlite_database(alias, os.path.join(cls.directory, f'{alias}.sqlite3'))
+        cls.databases = {'default', *cls.replicas}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.replicas:
+            remove_database(alias)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        snapshots.clear()
+        submission_filter.reset()
+        local_buckets.clear()
+        self.user = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        ContactSubmission.objects.create(name='Primary', email='primary@example.com', message='On the primary.')
+        for alias in self.replicas:
+            ContactSubmission.objects.using(alias).create(name=alias, email=f'{alias}@example.com', message='Replica.')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.settings_override = override_settings(DATABASE_REPLICAS=self.replicas)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def contact_names(self):
+        response = self.client.get(reverse('admin_contact_list'))
+        self.assertEqual(response.status_code, 200)
+        return {row['name'] for row in response.data['results']}
+
+    def test_safe_requests_read_from_a_replica(self):
+        names = set()
+        for _ in range(20):
+            names |= self.contact_names()
+        self.assertEqual(names, set(self.replicas))
+
+    def test_exports_stream_from_a_replica(self):
+        names = set()
+        for _ in range(20):
+            response = self.client.get(reverse('admin_contact_export', kwargs={'export_format': 'ndjson'}))
+            names |= {json.loads(line)['name'] for line in b''.join(response.streaming_content).splitlines()}
+        self.assertEqual(names, set(self.replicas))
+
+    def test_without_replicas_reads_go_to_the_primary(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.contact_names(), {'Primary'})
+
+    def test_writes_go_to_the_primary_and_pin_later_reads(self):
+        router = ReplicaRouter()
+        with request_routing():
+            self.assertIn(router.db_for_read(ContactSubmission), self.replicas)
+            self.assertEqual(router.db_for_write(ContactSubmission), 'default')
+            self.assertIsNone(router.db_for_read(ContactSubmission))
+        with request_routing():
+            self.assertIn(router.db_for_read(ContactSubmission), self.replicas)
+
+    def test_update_of_a_replica_row_is_written_to_the_primary(self):
+        with request_routing():
+            submission = ContactSubmission.objects.filter(email__startswith='replica').first()
+            self.assertIn(submission._state.db, self.replicas)
+            submission.status = 'closed'
+            submission.save(update_fields=['status'])
+            self.assertEqual(ContactSubmission.objects.using('default').get(pk=submission.pk).status, 'closed')
+            # Pinned: this read sees the primary's row with the same pk
+            self.assertEqual(ContactSubmission.objects.get(pk=submission.pk).name, 'Primary')
+
+    def test_reads_outside_requests_and_in_transactions_use_the_primary(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(ContactSubmission))
+        with request_routing():
+            self.assertIsNone(router.db_for_read(User))  # Not in DATABASE_REPLICA_APPS
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(ContactSubmission))
+            self.assertIsNone(router.db_for_read(ContactSubmission))
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        pk = ContactSubmission.objects.get(name='Primary').pk
+        response = self.client.patch(reverse('admin_contact_detail', args=[pk]), {'phone': '555 0100'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Primary')
+
+    def test_cached_snapshots_are_built_from_the_primary(self):
+        Service.objects.create(title='Primary service', description='d', icon='i', order=1)
+        for alias in self.replicas:
+            Service.objects.using(alias).create(title='Stale service', description='d', icon='i', order=1)
+        response = self.client.get(reverse('service_list'))
+        self.assertEqual([row['title'] for row in response.data], ['Primary service'])
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertTrue(router.allow_migrate('default', 'core'))
+        self.assertFalse(router.allow_migrate('replica_a', 'core'))
+
+
+class StructuredLoggingTest(TestCase):
+    def setUp(self):
+        self.stream = StringIO()
+        self.handler = BackgroundHandler(self.stream)
+        self.handler.setFormatter(JSONFormatter())
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger('core.tests.logging')
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def entries(self):
+        self.handler.stop()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_written_as_json_by_the_background_thread(self):
+        self.logger.warning('Slow %s', 'query', extra={'view': 'service_list', 'ms': 120})
+        self.assertIsNotNone(self.handler.listener)
+        entry, = self.entries()
+        self.assertEqual(entry['message'], 'Slow query')
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['logger'], 'core.tests.logging')
+        self.assertEqual((entry['view'], entry['ms']), ('service_list', 120))
+
+    def test_message_and_traceback_are_captured_when_logged(self):
+        items = ['a']
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            self.logger.exception('Failed on %s', items)
+        items.append('b')  # Changed before the thread formats the record
+        entry, = self.entries()
+        self.assertEqual(entry['message'], "Failed on ['a']")
+        self.assertIn('ZeroDivisionError', entry['exc_info'])
+
+    def test_full_queue_drops_records_instead_of_blocking(self):
+        handler = BackgroundHandler(StringIO(), maxsize=2)
+        self.addCleanup(handler.close)
+        before = registry.get_counter('core_log_records_dropped_total')
+        with patch.object(handler, 'start'):  # Nothing empties the queue
+            for number in range(5):
+                handler.handle(logging.makeLogRecord({'msg': f'record {number}'}))
+        self.assertEqual(registry.get_counter('core_log_records_dropped_total') - before, 3)
+
+    def test_sampled_is_gated_by_level_then_rate(self):
+        self.logger.setLevel(logging.INFO)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+        with patch('core.log.random.random') as random:
+            self.assertFalse(sampled(self.logger, 1.0))
+            random.assert_not_called()
+        self.logger.setLevel(logging.DEBUG)
+        self.assertTrue(sampled(self.logger, 1.0))
+        self.assertFalse(sampled(self.logger, 0.0))
+        with patch('core.log.random.random', return_value=0.3):
+            self.assertTrue(sampled(self.logger, 0.5))
+            self.assertFalse(sampled(self.logger, 0.2))
+
+    def test_service_serializer_traces_through_logging_not_stdout(self):
+        service = Service.objects.create(title='Web Design', description='d', icon='i')
+        stdout = StringIO()
+        with redirect_stdout(stdout), override_settings(LOG_TRACE_SAMPLE_RATE=0), \
+                self.assertNoLogs('core.serializers', logging.DEBUG):
+            ServiceSerializer(service).data
+        self.assertEqual(stdout.getvalue(), '')
+        with override_settings(LOG_TRACE_SAMPLE_RATE=1), \
+                self.assertLogs('core.serializers', logging.DEBUG) as logs:
+            ServiceSerializer(service).data
+        self.assertEqual(logs.records[0].service_id, service.pk)
+
+    def test_debug_views_are_opt_in(self):
+        names = {pattern.name for pattern in build_api_urlpatterns()}
+        self.assertNotIn('debug_services', names)
+        with override_settings(DEBUG_VIEWS=True):
+            names = {pattern.name for pattern in build_api_urlpatterns()}
+        self.assertTrue({'debug_services', 'debug_services_drf'} <= names)
+
+
+@override_settings(BULK_OPERATIONS_AUTOSTART=False, BULK_OPERATION_CHUNK_SIZE=3)
+class BulkOperationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        self.submissions = [
+            ContactSubmission.objects.create(
+                name=f'Person {i}', email=f'p{i}@example.com', message='Please call me back.',
+                status='closed' if i == 0 else 'new'
+            )
+            for i in range(7)
+        ]
+
+    def test_changes_are_applied_in_chunks_by_the_worker(self):
+        operation = start_status_change(ContactSubmission.objects.all(), 'closed', user=self.user)
+        self.assertEqual((operation.state, operation.total), ('pending', 7))
+        self.assertEqual([len(chunk.ids) for chunk in operation.chunks.order_by('pk')], [3, 3, 1])
+        self.assertEqual(ContactSubmission.objects.filter(status='closed').count(), 1)
+
+        bulk.worker.run_once()
+        operation.refresh_from_db()
+        self.assertEqual((operation.state, operation.processed), ('running', 3))
+        self.assertEqual(ContactSubmission.objects.filter(status='closed').count(), 3)
+
+        bulk.worker.drain()
+        operation.refresh_from_db()
+        self.assertEqual((operation.state, operation.processed, operation.changed), ('done', 7, 6))
+        self.assertIsNotNone(operation.finished_at)
+        self.assertEqual(ContactSubmission.objects.filter(status='closed').count(), 7)
+
+    def test_changes_fire_the_cache_and_audit_hooks(self):
+        from django.contrib.admin.models import LogEntry
+
+        version = get_model_version(ContactSubmission)
+        start_status_change(ContactSubmission.objects.all(), 'replied', user=self.user)
+        bulk.worker.drain()
+        self.assertGreater(get_model_version(ContactSubmission), version)
+        entries = LogEntry.objects.filter(user=self.user)
+        self.assertEqual(entries.count(), 7)
+        self.assertEqual(entries.first().get_change_message(), 'Changed Status.')
+
+    def test_a_restarted_worker_resumes_without_reapplying(self):
+        from .bulk import BulkOperationWorker, apply_chunk
+
+        operation = start_status_change(ContactSubmission.objects.all(), 'replied', user=self.user)
+        first = operation.chunks.order_by('pk').first()
+        apply_chunk(first.pk)
+        apply_chunk(first.pk)  # Already done: skipped
+        BulkOperationWorker().drain()  # A new process after a crash
+        operation.refresh_from_db()
+        self.assertEqual((operation.state, operation.processed, operation.changed), ('done', 7, 7))
+
+    def test_a_chunk_is_claimed_before_it_is_applied(self):
+        from .bulk import apply_chunk
+
+        operation = start_status_change(ContactSubmission.objects.all(), 'replied', user=self.user)
+        first = operation.chunks.order_by('pk').first()
+        calls = []
+
+        def racing_set_status(*args, **kwargs):
+            # Another worker takes the same chunk while this one applies it
+            calls.append(args)
+            if len(calls) == 1:
+                apply_chunk(first.pk)
+            return set_status(*args, **kwargs)
+
+        with patch('core.bulk.set_status', racing_set_status):
+            apply_chunk(first.pk)
+        self.assertEqual(len(calls), 1)
+        operation.refresh_from_db()
+        self.assertEqual(operation.processed, 3)
+        self.assertEqual(SubmissionCounter.objects.get(status='replied').count, 3)
+
+    def test_failed_operation_is_recorded_and_can_be_retried(self):
+        operation = start_status_change(ContactSubmission.objects.all(), 'replied')
+        with patch('core.bulk.set_status', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('core.bulk', 'ERROR'):
+            bulk.worker.drain()
+        operation.refresh_from_db()
+        self.assertEqual((operation.state, operation.error, operation.processed), ('failed', 'disk full', 0))
+
+        out = StringIO()
+        call_command('run_bulk_operations', retry_failed=True, stdout=out)
+        operation.refresh_from_db()
+        self.assertEqual((operation.state, operation.processed), ('done', 7))
+        self.assertIn('Retrying 1 failed operations', out.getvalue())
+
+    def test_admin_action_queues_an_operation_and_reports_progress(self):
+        self.client.force_login(self.user)
+        url = reverse('admin:core_contactsubmission_changelist')
+        response = self.client.post(url, {
+            'action': 'mark_as_replied', 'select_across': '1', 'index': '0',
+            '_selected_action': [self.submissions[0].pk],
+        }, follow=True)
+        self.assertContains(response, '7 submissions will be marked as replied in the background.')
+        self.assertContains(response, 'Marking 7 submissions as replied: 0 done.')
+        self.assertEqual(ContactSubmission.objects.filter(status='replied').count(), 0)
+
+        bulk.worker.drain()
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Marking 7 submissions')
+        self.assertEqual(ContactSubmission.objects.filter(status='replied').count(), 7)
+
+    def test_patch_status_fires_the_same_hooks(self):
+        from django.contrib.admin.models import LogEntry
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        submission = self.submissions[1]
+        response = self.client.patch(
+            reverse('admin_contact_detail', args=[submission.pk]), {'status': 'replied'}, format='json'
+        )
+        self.assertEqual(response.data['status'], 'replied')
+        self.assertEqual(LogEntry.objects.get(user=self.user).object_id, str(submission.pk))
+
+        self.client.patch(reverse('admin_contact_detail', args=[submission.pk]), {'phone': '555'}, format='json')
+        self.assertEqual(LogEntry.objects.filter(user=self.user).count(), 1)  # Status unchanged
+
+
+class SubmissionStatsTest(APITestCase):
+    def setUp(self):
+        submission_filter.reset()
+        local_buckets.clear()
+        self.user = User.objects.create_user(username='admin', password='testpass123')
+        self.today = timezone.localdate()
+        now = timezone.now()
+        self.old = ContactSubmission.objects.create(
+            name='Old', email='old@example.com', message='From last week.', created_at=now - datetime.timedelta(days=7)
+        )
+        for i in range(3):
+            ContactSubmission.objects.create(name=f'New {i}', email=f'new{i}@example.com', message='Hello there.')
+
+    def counters(self):
+        return {(c.day, c.status): c.count for c in SubmissionCounter.objects.exclude(count=0)}
+
+    def test_counters_follow_creates_status_changes_and_deletes(self):
+        week_ago = self.today - datetime.timedelta(days=7)
+        self.assertEqual(self.counters(), {(week_ago, 'new'): 1, (self.today, 'new'): 3})
+
+        response = self.client.post(reverse('contact_create'), {
+            'name': 'Posted', 'email': 'posted@example.com', 'message': 'A message from the form.',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.counters()[self.today, 'new'], 4)
+
+        self.client.force_authenticate(user=self.user)
+        self.client.patch(reverse('admin_contact_detail', args=[self.old.pk]), {'status': 'closed'}, format='json')
+        with transaction.atomic():
+            bulk.set_status(ContactSubmission.objects.filter(name__startswith='New').values_list('pk', flat=True), 'replied')
+        ContactSubmission.objects.get(name='Posted').delete()
+        self.assertEqual(self.counters(), {(week_ago, 'closed'): 1, (self.today, 'replied'): 3})
+
+        expected = self.counters()
+        SubmissionCounter.objects.all().delete()
+        call_command('rebuild_submission_counters', stdout=StringIO())
+        self.assertEqual(self.counters(), expected)
+
+    def test_spooled_batches_are_counted(self):
+        rebuild_counters()
+        with local_spool():
+            for i in range(2):
+                self.client.post(reverse('contact_create'), {
+                    'name': 'Spooled', 'email': 'spool@example.com', 'message': f'Spooled message {i}.',
+                }, format='json')
+            flush_spool()
+        self.assertEqual(self.counters()[self.today, 'new'], 5)
+
+    def test_admin_added_and_deleted_submissions_are_counted(self):
+        User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        self.client.login(username='root', password='testpass123')
+        response = self.client.post(reverse('admin:core_contactsubmission_add'), {
+            'name': 'By phone', 'email': 'phone@example.com', 'phone': '555-0100',
+            'message': 'Called in.', 'status': 'in_progress',
+        })
+        self.assertEqual(response.status_code, 302)
+        stats = submission_stats(1)
+        self.assertEqual((stats['by_status']['new'], stats['by_status']['in_progress']), (4, 1))
+
+        added = ContactSubmission.objects.get(name='By phone')
+        self.client.post(reverse('admin:core_contactsubmission_delete', args=[added.pk]), {'post': 'yes'})
+        self.assertEqual(submission_stats(1)['by_status']['in_progress'], 0)
+        self.assertFalse(SubmissionCounter.objects.filter(count__lt=0).exists())
+
+    def test_sample_contacts_are_counted(self):
+        call_command('load_sample_data', contacts=50, stdout=StringIO())
+        self.assertEqual(sum(self.counters().values()), ContactSubmission.objects.count())
+
+    def test_stats_endpoint(self):
+        rebuild_counters()
+        url = reverse('admin_contact_stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'days': 8})
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(response.data['by_status'], {'new': 4, 'in_progress': 0, 'replied': 0, 'closed': 0})
+        days = response.data['days']
+        self.assertEqual(len(days), 8)
+        self.assertEqual(days[0], {'date': (self.today - datetime.timedelta(days=7)).isoformat(),
+                                   'total': 1, 'by_status': {'new': 1}})
+        self.assertEqual(days[-1]['total'], 3)
+        self.assertEqual(sum(day['total'] for day in days[1:-1]), 0)
+
+        self.assertEqual(len(self.client.get(url, {'days': 1}).data['days']), 1)
+        self.assertEqual(self.client.get(url, {'days': 'all'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'days': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SubmissionArchiveTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='testpass123')
+        now = timezone.now()
+        agent = user_agents.id_for('Mozilla/5.0')
+        self.old = [
+            ContactSubmission.objects.create(
+                name=f'Old {i}', email=f'old{i}@example.com', message='An old closed question.',
+                status='closed', agent_id=agent, created_at=now - datetime.timedelta(days=400 + i)
+            )
+            for i in range(3)
+        ]
+        self.recent = ContactSubmission.objects.create(
+            name='Recent', email='recent@example.com', message='Closed last week.', status='closed',
+            created_at=now - datetime.timedelta(days=7)
+        )
+        self.open = ContactSubmission.objects.create(
+            name='Open', email='open@example.com', message='Still waiting.', created_at=now - datetime.timedelta(days=500)
+        )
+        rebuild_counters()
+
+    def counters(self):
+        return {(c.day, c.status): c.count for c in SubmissionCounter.objects.exclude(count=0)}
+
+    def test_archives_old_closed_submissions_in_resumable_batches(self):
+        counters = self.counters()
+        self.assertEqual(archive_submissions(batch_size=2, max_batches=1), 2)
+        self.assertEqual(archive_submissions(batch_size=2), 1)  # Carries on where it stopped
+        self.assertEqual(archive_submissions(batch_size=2), 0)
+
+        self.assertEqual(
+            set(ContactSubmission.objects.values_list('name', flat=True)), {'Recent', 'Open'}
+        )
+        batches = list(SubmissionArchive.objects.values_list('first_id', 'last_id', 'count', 'codec'))
+        ids = [s.pk for s in self.old]
+        self.assertEqual(batches, [(ids[0], ids[1], 2, DEFAULT_CODEC), (ids[2], ids[2], 1, DEFAULT_CODEC)])
+
+        # Archived submissions stay counted, also after a rebuild
+        self.assertEqual(self.counters(), counters)
+        rebuild_counters()
+        self.assertEqual(self.counters(), counters)
+
+    def test_archived_rows_are_kept_whole(self):
+        archive_submissions(codec='zlib')
+        records = list(archived_submissions())
+        self.assertEqual([r['id'] for r in records], [s.pk for s in self.old])
+        old = self.old[1]
+        record = records[1]
+        self.assertEqual(record['email'], old.email)
+        self.assertEqual(record['user_agent'], 'Mozilla/5.0')
+        self.assertEqual(datetime.datetime.fromisoformat(record['created_at']), old.created_at)
+
+        self.assertEqual([r['name'] for r in archived_submissions(email='OLD2@example.com')], ['Old 2'])
+        self.assertEqual([r['name'] for r in archived_submissions(ids=[old.pk])], ['Old 1'])
+        since = old.created_at - datetime.timedelta(hours=1)
+        self.assertEqual([r['name'] for r in archived_submissions(since=since)], ['Old 0', 'Old 1'])
+        self.assertEqual([r['name'] for r in archived_submissions(until=since)], ['Old 2'])
+
+        archive = SubmissionArchive.objects.get()
+        self.assertLess(len(archive.data), len(b''.join(
+            json.dumps(r).encode() for r in records
+        )))
+        archive.codec = 'lz4'
+        with self.assertRaises(LookupError):
+            read_archive(archive)
+
+    def test_archived_endpoint(self):
+        archive_submissions()
+        url = reverse('admin_contact_archived')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url, {'email': 'old0@example.com'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.old[0].pk])
+
+        day = timezone.localdate(self.old[1].created_at)
+        response = self.client.get(url, {'since': day.isoformat(), 'until': (day + datetime.timedelta(days=1)).isoformat()})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Old 1'])
+
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'id': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_submissions', '--dry-run', stdout=out)
+        self.assertIn('3 submissions would be archived', out.getvalue())
+        self.assertEqual(SubmissionArchive.objects.count(), 0)
+
+        out = StringIO()
+        call_command('archive_submissions', '--days', '5', '--batch-size', '2', '--max-batches', '1', stdout=out)
+        self.assertIn('Archived 2 submissions', out.getvalue())
+        self.assertIn('(more left)', out.getvalue())
+        call_command('archive_submissions', '--days', '5', stdout=StringIO())
+        self.assertEqual(ContactSubmission.objects.get().name, 'Open')
+
+
+class LookupTableTest(APITestCase):
+    def setUp(self):
+        submission_filter.reset()
+        local_buckets.clear()
+        reset_lookup_caches()
+        self.addCleanup(reset_lookup_caches)
+
+    def post(self, i, agent='Mozilla/5.0 (X11; Linux x86_64) Firefox/131.0', ip='203.0.113.7'):
+        return self.client.post(reverse('contact_create'), {
+            'name': 'Bot', 'email': 'bot@example.com', 'message': f'Buy our SEO services now #{i}.',
+        }, format='json', HTTP_USER_AGENT=agent, REMOTE_ADDR=ip)
+
+    @override_settings(CONTACT_FILTER_ENABLED=False)
+    def test_values_are_stored_once_and_read_back(self):
+        for i in range(3):
+            self.assertEqual(self.post(i).status_code, status.HTTP_201_CREATED)
+        self.post(3, agent='', ip='2001:DB8:0::1')
+
+        self.assertEqual(UserAgent.objects.count(), 1)
+        self.assertEqual(IPAddress.objects.count(), 2)
+        self.assertEqual(len({s.agent_id for s in ContactSubmission.objects.exclude(agent=None)}), 1)
+        submission = ContactSubmission.objects.order_by('pk').first()
+        self.assertEqual(submission.user_agent, 'Mozilla/5.0 (X11; Linux x86_64) Firefox/131.0')
+        self.assertEqual(submission.ip_address, '203.0.113.7')
+        last = ContactSubmission.objects.order_by('pk').last()
+        self.assertEqual((last.user_agent, last.ip_address), ('', '2001:db8::1'))
+        self.assertEqual(ip_addresses.id_for('2001:db8::1'), last.ip_id)
+
+        long_agent = 'Mozilla/5.0 ' + 'x' * 10000
+        self.assertEqual(user_agents.id_for(long_agent), user_agents.id_for(long_agent))
+
+        rows = ''.join(export_contact_submissions(ContactSubmission.objects.order_by('pk'), 'ndjson')).splitlines()
+        self.assertEqual(json.loads(rows[0])['user_agent'], submission.user_agent)
+        self.assertEqual(json.loads(rows[0])['ip_address'], '203.0.113.7')
+
+    def test_equivalent_spellings_share_an_id(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = ip_addresses.ids_for(['::1', '0:0:0:0:0:0:0:1', '2001:DB8::1', '2001:db8:0::1'])
+        self.assertEqual(IPAddress.objects.count(), 2)
+        self.assertEqual(ids['::1'], ids['0:0:0:0:0:0:0:1'])
+        self.assertEqual(ids['2001:DB8::1'], ids['2001:db8:0::1'])
+        self.assertNotEqual(ids['::1'], ids['2001:DB8::1'])
+        rows = intern_metadata([{'ip_address': '::1'}, {'ip_address': '0:0:0:0:0:0:0:1'}])
+        self.assertEqual({row['ip_id'] for row in rows}, {ids['::1']})
+        with self.assertNumQueries(0):
+            self.assertEqual(ip_addresses.value_for(ids['::1'], using='default'), '::1')
+
+    def test_ids_are_cached_after_commit_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                user_agents.id_for('curl/8.4.0')
+                raise RuntimeError
+        self.assertIsNone(user_agents.ids.get(('default', 'curl/8.4.0')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agent = user_agents.id_for('curl/8.4.0')
+        with self.assertNumQueries(0):
+            self.assertEqual(user_agents.id_for('curl/8.4.0'), agent)
+            self.assertEqual(user_agents.value_for(agent, using='default'), 'curl/8.4.0')
+
+    def test_least_recently_used_are_forgotten(self):
+        with override_settings(CONTACT_LOOKUP_CACHE_SIZE=2):
+            with self.captureOnCommitCallbacks(execute=True):
+                user_agents.ids_for(['a/1', 'b/1'])
+            user_agents.id_for('a/1')
+            with self.captureOnCommitCallbacks(execute=True):
+                user_agents.id_for('c/1')
+            self.assertEqual(len(user_agents.ids), 2)
+            self.assertIsNotNone(user_agents.ids.get(('default', 'a/1')))
+            self.assertIsNone(user_agents.ids.get(('default', 'b/1')))
+
+    def test_admin_shows_resolved_values(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        self.client.force_login(admin)
+        with override_settings(CONTACT_FILTER_ENABLED=False):
+            pk = ContactSubmission.objects.get(submission_token=self.post(0).data['token']).pk
+        response = self.client.get(reverse('admin:core_contactsubmission_change', args=[pk]))
+        self.assertContains(response, 'Mozilla/5.0 (X11; Linux x86_64) Firefox/131.0')
+        self.assertContains(response, '203.0.113.7')
@@ -0,0 +1,213 @@
+# throttling.py
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle, UserRateThrottle
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'core:throttle'
+
+# Refill the bucket for the time since its last update, then take one token.
+# Runs atomically in Redis on Redis' own clock, so every worker shares the
+# same bucket. Returns {allowed, seconds until a token is available}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+-- Once full again the bucket is the same as a missing one
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+if allowed == 1 then
+    return {1, '0'}
+end
+return {0, tostring((1 - tokens) / rate)}
+"""
+
+
+class LocalTokenBuckets:
+    """
+    Token buckets in this process, the least recently used dropped beyond
+    ``max_keys``. Used without Redis, or while it is unreachable; limits
+    are then per worker.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    async def atake(self, key, capacity, rate):
+        return self.take(key, capacity, rate)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisTokenBuckets:
+    """
+    Token buckets in Redis, updated by TOKEN_BUCKET_SCRIPT. If Redis fails
+    the request is counted against ``fallback`` instead, so throttling
+    degrades to per-worker limits rather than letting everything through.
+    """
+
+    def __init__(self, client, fallback, async_client_factory=None):
+        from redis.exceptions import RedisError
+
+        self.errors = RedisError
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.fallback = fallback
+        self.async_client_factory = async_client_factory
+        self._async_scripts = weakref.WeakKeyDictionary()
+        self._failing = False
+
+    def take(self, key, capacity, rate):
+        try:
+            allowed, wait = self.script(keys=[key], args=[capacity, rate])
+        except self.errors:
+            self.failed()
+            return self.fallback.take(key, capacity, rate)
+        self._failing = False
+        return bool(allowed), float(wait)
+
+    async def atake(self, key, capacity, rate):
+        if self.async_client_factory is None:
+            return self.fallback.take(key, capacity, rate)
+        loop = asyncio.get_running_loop()
+        script = self._async_scripts.get(loop)
+        if script is None:
+            client = self.async_client_factory()
+            script = self._async_scripts[loop] = client.register_script(TOKEN_BUCKET_SCRIPT)
+        try:
+            allowed, wait = await script(keys=[key], args=[capacity, rate])
+        except self.errors:
+            self.failed()
+            return self.fallback.take(key, capacity, rate)
+        self._failing = False
+        return bool(allowed), float(wait)
+
+    def failed(self):
+        registry.increment('core_throttle_fallback_total')
+        if not self._failing:  # Once per outage, not once per request
+            self._failing = True
+            logger.warning('Redis throttle unavailable, using per-process limits', exc_info=True)
+
+
+local_buckets = LocalTokenBuckets()
+_buckets = None
+
+
+def get_token_buckets():
+    """Redis buckets when THROTTLE_REDIS_URL is set, else the local ones"""
+    global _buckets
+    if _buckets is None:
+        url = settings.THROTTLE_REDIS_URL
+        if url:
+            import redis
+            import redis.asyncio
+
+            _buckets = RedisTokenBuckets(
+                redis.Redis.from_url(url), local_buckets,
+                async_client_factory=lambda: redis.asyncio.Redis.from_url(url),
+            )
+        else:
+            _buckets = local_buckets
+    return _buckets
+
+
+@receiver(setting_changed)
+def reset_token_buckets(setting, **kwargs):
+    global _buckets
+    if setting == 'THROTTLE_REDIS_URL':
+        _buckets = None
+
+
+class TokenBucketThrottleMixin:
+    """
+    SimpleRateThrottle on a token bucket instead of a cached list of
+    request times: one O(1), atomic update per check. A rate of N/period
+    holds N tokens, refilled at N per period, so clients may burst up to
+    N requests and then get one every period/N.
+    """
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(request, view)
+        if bucket is None:
+            return True
+        allowed, self.wait_time = get_token_buckets().take(*bucket)
+        return allowed
+
+    async def aallow_request(self, request, view):
+        bucket = self.get_bucket(request, view)
+        if bucket is None:
+            return True
+        allowed, self.wait_time = await get_token_buckets().atake(*bucket)
+        return allowed
+
+    def get_bucket(self, request, view):
+        """``(key, capacity, refill rate per second)``, or None to skip"""
+        if self.rate is None:
+            return None
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return None
+        # The rate is part of the key, so changing it starts fresh buckets
+        key = f'{KEY_PREFIX}:{self.key}:{self.num_requests}/{self.duration}'
+        return key, self.num_requests, self.num_requests / self.duration
+
+    def wait(self):
+        return getattr(self, 'wait_time', None)
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class UserTokenBucketThrottle(TokenBucketThrottleMixin, UserRateThrottle):
+    pass
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottleMixin, ScopedRateThrottle):
+    """Limits the views that set ``throttle_scope``, per user or IP"""
+
+    def get_bucket(self, request, view):
+        # What ScopedRateThrottle.allow_request() does before checking
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return None
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().get_bucket(request, view)
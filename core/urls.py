@@ -1,32 +1,63 @@
 # urls.py
+from types import ModuleType
+
+from django.conf import settings
 from django.urls import path, include
-from . import views
+from . import async_views, views
+
+
+def build_api_urlpatterns(async_routes=()):
+    """
+    The API routes, serving the ones named in ``async_routes`` from their
+    native async views (core/async_views.py) instead of the DRF views;
+    ``'all'`` switches every route that has one
+    """
+    def view(name, sync_view):
+        if name in async_routes or 'all' in async_routes:
+            return async_views.VIEWS[name].as_view()
+        return sync_view
+
+    return [
+        # API Overview
+        path('', view('api_overview', views.api_overview), name='api_overview'),
+
+        # Services
+        path('services/', view('service_list', views.ServiceListView.as_view()), name='service_list'),
+        path('services/<int:pk>/', view('service_detail', views.ServiceDetailView.as_view()), name='service_detail'),
+
+        # Testimonials
+        path('testimonials/', view('testimonial_list', views.TestimonialListView.as_view()), name='testimonial_list'),
+        path('testimonials/featured/', view('featured_testimonials', views.FeaturedTestimonialListView.as_view()), name='featured_testimonials'),
+
+        # Contact
+        path('contact/', views.ContactSubmissionCreateView.as_view(), name='contact_create'),
+
+        # Admin endpoints (require authentication)
+        path('admin/contacts/', views.ContactSubmissionListView.as_view(), name='admin_contact_list'),
+        path('admin/contacts/stats/', views.contact_stats, name='admin_contact_stats'),
+        path('admin/contacts/archived/', views.ContactSubmissionArchiveView.as_view(), name='admin_contact_archived'),
+        path('admin/contacts/<int:pk>/', views.ContactSubmissionDetailView.as_view(), name='admin_contact_detail'),
+        path('admin/contacts/export/<str:export_format>/', views.ContactSubmissionExportView.as_view(), name='admin_contact_export'),
+        path('admin/metrics/', views.metrics, name='metrics'),
+
+        # Diagnostics, only routed with DEBUG_VIEWS on
+        *([
+            path('debug/services/', views.debug_services, name='debug_services'),
+            path('debug/services-drf/', views.debug_services_drf, name='debug_services_drf'),
+        ] if settings.DEBUG_VIEWS else []),
+    ]
+
+
+def build_urlconf(async_routes):
+    """A URLconf module with ``async_routes`` switched, for tests and benchmarks"""
+    urlconf = ModuleType(f'{__name__}.async')
+    urlconf.urlpatterns = [path('api/', include(build_api_urlpatterns(async_routes)))]
+    return urlconf
+
 
 # API URLs
-api_urlpatterns = [
-    # API Overview
-    path('', views.api_overview, name='api_overview'),
-    
-    # Services
-    path('services/', views.ServiceListView.as_view(), name='service_list'),
-    path('services/<int:pk>/', views.ServiceDetailView.as_view(), name='service_detail'),
-    
-    # Testimonials
-    path('testimonials/', views.TestimonialListView.as_view(), name='testimonial_list'),
-    path('testimonials/featured/', views.FeaturedTestimonialListView.as_view(), name='featured_testimonials'),
-    
-    # Contact
-    path('contact/', views.ContactSubmissionCreateView.as_view(), name='contact_create'),
-    
-    # Admin endpoints (require authentication)
-    path('admin/contacts/', views.ContactSubmissionListView.as_view(), name='admin_contact_list'),
-    path('admin/contacts/<int:pk>/', views.ContactSubmissionDetailView.as_view(), name='admin_contact_detail'),
-
-    path('debug/services/', views.debug_services, name='debug_services'),
-    path('debug/services-drf/', views.debug_services_drf, name='debug_services_drf'),
-]
+api_urlpatterns = build_api_urlpatterns(settings.ASYNC_VIEWS)
 
 urlpatterns = [
     path('api/', include(api_urlpatterns)),
 ]
-
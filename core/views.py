@@ -1,138 +1,183 @@
 # views.py
+import datetime
+import json
+import logging
+import uuid
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.core.mail import send_mail
+from rest_framework.settings import api_settings
 from django.conf import settings
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.db.models import Q
+from django.db import router, transaction
+from django.utils import dateparse, timezone
+from .archive import archived_submissions
+from .budgets import query_budget
+from .cache import VersionedCacheMixin, get_cache, versioned_key
+from .conditional import ConditionalGetMixin, compute_validators
+from .exports import EXPORTERS, EXPORT_CONTENT_TYPES, export_contact_submissions
+from .ingestion import enqueue_submission
+from .metrics import registry
 from .models import Service, Testimonial, ContactSubmission
+from .snapshots import SnapshotListMixin
+from .pagination import KeysetPagination
+from .routers import use_primary
+from .search import filter_contact_submissions
+from .signals import send_submissions_created, submissions_status_changed
+from .spam import submission_filter
+from .stats import submission_stats
+from .throttling import ScopedTokenBucketThrottle
 from .serializers import (
     ServiceSerializer, TestimonialSerializer, 
     ContactSubmissionSerializer, ContactSubmissionCreateSerializer
 )
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
+logger = logging.getLogger(__name__)
 
 
-class ServiceListView(generics.ListAPIView):
+@query_budget(queries=2, sql_ms=50)  # Snapshot rebuild: validators + list
+class ServiceListView(SnapshotListMixin, generics.ListAPIView):
     """
     Get all active services ordered by display order
     """
     serializer_class = ServiceSerializer
     permission_classes = [AllowAny]
-    pagination_class = None  # Disable pagination temporarily
+    pagination_class = None  # Landing page gets the full list
+    snapshot_name = 'services'
     
     def get_queryset(self):
-        queryset = Service.objects.filter(is_active=True).order_by('order')
-        print(f"ServiceListView queryset count: {queryset.count()}")  # Debug print
-        return queryset
-        
-    def list(self, request, *args, **kwargs):
-        """Override list method for debugging"""
-        print("ServiceListView.list() called")
-        queryset = self.get_queryset()
-        print(f"Queryset in list(): {queryset.count()} items")
-        
-        serializer = self.get_serializer(queryset, many=True)
-        print(f"Serializer data: {serializer.data}")
-        
-        return Response(serializer.data)
+        return Service.objects.filter(is_active=True).order_by('order')
 
-class ServiceDetailView(generics.RetrieveAPIView):
+@query_budget(queries=2, sql_ms=50)
+class ServiceDetailView(ConditionalGetMixin, VersionedCacheMixin, generics.RetrieveAPIView):
     """
     Get specific service by ID
     """
     serializer_class = ServiceSerializer
+    cache_models = (Service,)
     permission_classes = [AllowAny]
     
     def get_queryset(self):
         return Service.objects.filter(is_active=True)
 
-@method_decorator(cache_page(60 * 10), name='get')  # Cache for 10 minutes
-class TestimonialListView(generics.ListAPIView):
+    def get_validators(self):
+        key = versioned_key('validators', self.cache_models, self.kwargs['pk'])
+        validators = get_cache().get(key)
+        if validators is None:
+            queryset = self.get_queryset().filter(pk=self.kwargs['pk'])
+            with use_primary():
+                validators = compute_validators(queryset, salt='service_detail')
+            if validators[1] is None:
+                return None, None  # Let the view raise its 404; not cached, any pk can miss
+            get_cache().set(key, validators, settings.CORE_CACHE_TIMEOUT)
+        return validators
+
+@query_budget(queries=2, sql_ms=100)  # Snapshot rebuild: validators + list
+class TestimonialListView(SnapshotListMixin, generics.ListAPIView):
     """
     Get all active testimonials, featured ones first
     """
     serializer_class = TestimonialSerializer
     permission_classes = [AllowAny]
+    pagination_class = None  # Landing page gets the full list
+    snapshot_name = 'testimonials'
     
     def get_queryset(self):
         return Testimonial.objects.filter(is_active=True)
 
-@method_decorator(cache_page(60 * 10), name='get')  # Cache for 10 minutes
-class FeaturedTestimonialListView(generics.ListAPIView):
+@query_budget(queries=2, sql_ms=50)  # Snapshot rebuild: validators + list
+class FeaturedTestimonialListView(SnapshotListMixin, generics.ListAPIView):
     """
     Get only featured testimonials
     """
     serializer_class = TestimonialSerializer
     permission_classes = [AllowAny]
+    pagination_class = None  # Landing page gets the full list
+    snapshot_name = 'featured_testimonials'
     
     def get_queryset(self):
         return Testimonial.objects.filter(is_active=True, is_featured=True)
 
+@query_budget(queries=9, sql_ms=50)  # Transaction, IP + agent lookups until cached, insert, day counter x2, commit
 class ContactSubmissionCreateView(generics.CreateAPIView):
     """
     Create a new contact form submission
     """
     serializer_class = ContactSubmissionCreateSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [*api_settings.DEFAULT_THROTTLE_CLASSES, ScopedTokenBucketThrottle]
+    throttle_scope = 'contact'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+
+        # Filter junk before it costs a write (core/spam.py)
+        verdict = submission_filter.check(
+            serializer.validated_data, serializer.get_request_metadata().get('ip_address')
+        )
+        if verdict.action == 'reject':
+            return Response(
+                {'detail': 'Your message could not be accepted.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if verdict.action == 'quarantine':
+            # Nothing is stored, but the answer is the one a stored
+            # submission gets, so the sender can't tell
+            return self.accepted_response(uuid.uuid4(), self.unused_id())
         
-        # Save the contact submission
-        contact_submission = serializer.save()
+        if settings.CONTACT_INGESTION_MODE == 'spool':
+            # Queue it; the ingestion worker inserts in batches
+            token = enqueue_submission({
+                **serializer.validated_data,
+                **serializer.get_request_metadata(),
+            })
+            return self.accepted_response(token)
         
-        # Send email notification (optional)
-        # self.send_notification_email(contact_submission)
+        # Save the contact submission, counted in the same transaction
+        with transaction.atomic(using=router.db_for_write(ContactSubmission)):
+            contact_submission = serializer.save(submission_token=uuid.uuid4())
+
+            # Admins are emailed from a background worker (core/notifications.py)
+            send_submissions_created([contact_submission])
         
+        return self.accepted_response(contact_submission.submission_token, contact_submission.id)
+
+    def accepted_response(self, token, pk=None):
+        """
+        The answer to an accepted submission: 201 with its ``id`` when it is
+        stored inline, 202 without one when spooled.
+        """
+        if settings.CONTACT_INGESTION_MODE == 'spool':
+            return Response(
+                {
+                    'message': 'Thank you for your message. We will get back to you soon!',
+                    'token': str(token)
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
         return Response(
             {
                 'message': 'Thank you for your message. We will get back to you soon!',
-                'id': contact_submission.id
+                'id': pk,
+                'token': str(token)
             },
             status=status.HTTP_201_CREATED
         )
-    
-    # def send_notification_email(self, contact_submission):
-    #     """Send email notification to admin"""
-    #     try:
-    #         subject = f"New Contact Form Submission from {contact_submission.name}"
-    #         message = f"""
-    #         New contact form submission received:
-            
-    #         Name: {contact_submission.name}
-    #         Email: {contact_submission.email}
-    #         Phone: {contact_submission.phone}
-    #         Message: {contact_submission.message}
-            
-    #         Submitted at: {contact_submission.created_at}
-    #         IP Address: {contact_submission.ip_address}
-    #         """
-            
-    #         send_mail(
-    #             subject,
-    #             message,
-    #             settings.DEFAULT_FROM_EMAIL,
-    #             [settings.ADMIN_EMAIL],
-    #             fail_silently=True,
-    #         )
-    #     except Exception as e:
-    #         # Log error but don't fail the request
-    #         print(f"Failed to send notification email: {e}")
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def api_overview(request):
-    """
-    API overview endpoint showing available endpoints
-    """
-    api_urls = {
+    def unused_id(self):
+        """The id the next stored submission would get, for answers that store nothing"""
+        if settings.CONTACT_INGESTION_MODE == 'spool':
+            return None
+        last = ContactSubmission.objects.order_by('-pk').values_list('pk', flat=True).first()
+        return (last or 0) + 1
+
+API_OVERVIEW = {
+    'message': 'Welcome to the Services API',
+    'endpoints': {
         'Services': {
             'List all services': '/api/services/',
             'Get service by ID': '/api/services/{id}/',
@@ -144,43 +189,103 @@ def api_overview(request):
         'Contact': {
             'Submit contact form': '/api/contact/ (POST)',
         }
-    }
-    
-    return Response({
-        'message': 'Welcome to the Services API',
-        'endpoints': api_urls,
-        'documentation': '/api/docs/',
-    })
+    },
+    'documentation': '/api/docs/',
+}
+
+@query_budget(queries=0)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_overview(request):
+    """
+    API overview endpoint showing available endpoints
+    """
+    return Response(API_OVERVIEW)
 
 # Admin views (require authentication)
 from rest_framework.permissions import IsAuthenticated
 
+@query_budget(queries=2, sql_ms=200)
 class ContactSubmissionListView(generics.ListAPIView):
     """
     List all contact submissions (admin only)
     """
     serializer_class = ContactSubmissionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    def get_keyset_ordering(self):
+        ordering = [('created_at', True), ('id', True)]
+        if self.request.query_params.get('search'):
+            ordering.insert(0, ('search_rank', True))
+        return ordering
     
     def get_queryset(self):
-        queryset = ContactSubmission.objects.all()
-        
-        # Filter by status
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(email__icontains=search) | 
-                Q(message__icontains=search)
-            )
+        return filter_contact_submissions(
+            ContactSubmission.objects.all(), self.request.query_params
+        )
+
+@query_budget(queries=1, sql_ms=5000)
+class ContactSubmissionExportView(generics.GenericAPIView):
+    """
+    Stream contact submissions as CSV or NDJSON (admin only)
+    Accepts the same status/search filters as the list. The streamed
+    queries run after the response leaves the middleware, so the request
+    metrics do not count them.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, export_format):
+        if export_format not in EXPORTERS:
+            raise Http404(f"Unknown export format: {export_format}")
         
-        return queryset
+        # The body streams after the routing middleware has returned, so
+        # pick the database (a replica, if the request may use one) now
+        queryset = filter_contact_submissions(
+            ContactSubmission.objects.using(router.db_for_read(ContactSubmission)), request.query_params
+        )
+        response = StreamingHttpResponse(
+            export_contact_submissions(queryset, export_format),
+            content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="contact-submissions.{export_format}"'
+        return response
+
+@query_budget(queries=1, sql_ms=500)
+class ContactSubmissionArchiveView(generics.GenericAPIView):
+    """
+    Stream archived contact submissions as NDJSON (admin only), filtered
+    by ``since`` and ``until`` (YYYY-MM-DD, until exclusive), ``email``
+    and ``id``. Only the archive batches in range are decompressed.
+    """
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request):
+        params = request.query_params
+        bounds = {}
+        for name in ('since', 'until'):
+            if params.get(name):
+                day = dateparse.parse_date(params[name])
+                if day is None:
+                    return Response({'detail': f'{name} must be a date (YYYY-MM-DD).'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                bounds[name] = timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+        ids = None
+        if params.get('id'):
+            try:
+                ids = [int(params['id'])]
+            except ValueError:
+                return Response({'detail': 'id must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        records = archived_submissions(email=params.get('email'), ids=ids, **bounds)
+        response = StreamingHttpResponse(
+            (json.dumps(record, ensure_ascii=False) + '\n' for record in records),
+            content_type=EXPORT_CONTENT_TYPES['ndjson']
+        )
+        response['Content-Disposition'] = 'attachment; filename="archived-contact-submissions.ndjson"'
+        return response
+
+@query_budget(queries=7, sql_ms=50)  # Status PATCH: row, transaction, update, audit read + insert, counters
 class ContactSubmissionDetailView(generics.RetrieveUpdateAPIView):
     """
     Get or update specific contact submission (admin only)
@@ -189,18 +294,59 @@ class ContactSubmissionDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
     queryset = ContactSubmission.objects.all()
 
+    def perform_update(self, serializer):
+        old_status = serializer.instance.status
+        with transaction.atomic():
+            instance = serializer.save()
+            if instance.status != old_status:
+                # The hooks of bulk changes (core/bulk.py), audit included
+                submissions_status_changed.send(
+                    sender=ContactSubmission, ids=[instance.pk], status=instance.status, user=self.request.user,
+                    previous=[(instance.created_at, old_status)],
+                )
+
+
+@query_budget(queries=2, sql_ms=50)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def contact_stats(request):
+    """
+    Contact submissions per status, and per day for the last ``days`` days
+    (default 30), read from the counter rows kept by core/stats.py
+    """
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= 366:
+        return Response({'detail': 'days must be a number from 1 to 366.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(submission_stats(days))
+
+
+@query_budget(queries=0)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def metrics(request):
+    """
+    Per-endpoint latency, SQL and serializer metrics in Prometheus text format
+    """
+    return HttpResponse(
+        registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
 
+@query_budget(queries=1, sql_ms=50)
 @csrf_exempt
 def debug_services(request):
     """Debug view to check services data"""
     from .models import Service
     
-    services = Service.objects.all()
-    active_services = Service.objects.filter(is_active=True)
+    services = list(Service.objects.all())
     
     data = {
-        'total_services': services.count(),
-        'active_services': active_services.count(),
+        'total_services': len(services),
+        'active_services': sum(s.is_active for s in services),
         'all_services': [
             {
                 'id': s.id,
@@ -213,6 +359,7 @@ def debug_services(request):
     
     return JsonResponse(data)
 
+@query_budget(queries=1, sql_ms=50)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def debug_services_drf(request):
@@ -220,27 +367,27 @@ def debug_services_drf(request):
     from .models import Service
     from .serializers import ServiceSerializer
     
-    services = Service.objects.filter(is_active=True)
-    print(f"Found {services.count()} active services")
+    services = list(Service.objects.filter(is_active=True))
+    logger.debug('Found %d active services', len(services))
     
     try:
         serializer = ServiceSerializer(services, many=True, context={'request': request})
         serialized_data = serializer.data
-        print(f"Serialized data: {serialized_data}")
         
         return Response({
-            'count': services.count(),
+            'count': len(services),
             'services': serialized_data,
             'raw_data': [{'id': s.id, 'title': s.title} for s in services]
         })
     except Exception as e:
-        print(f"Serialization error: {e}")
+        logger.exception('Serialization of %d services failed', len(services))
         return Response({
             'error': str(e),
-            'count': services.count(),
+            'count': len(services),
             'raw_data': [{'id': s.id, 'title': s.title} for s in services]
         })
 
+@query_budget(queries=1, sql_ms=50)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def debug_service_detail(request, pk):
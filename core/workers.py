@@ -0,0 +1,79 @@
+# workers.py
+import atexit
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker(ABC):
+    """
+    A daemon thread that calls ``run_once()`` until it reports no more work,
+    then sleeps for ``interval`` seconds or until ``wake()`` is called.
+
+    ``stop()`` runs at interpreter exit and drains the remaining work in
+    the calling thread, so nothing accepted by the process is lost on a
+    clean shutdown.
+    """
+    name = 'background-worker'
+    interval = 1.0
+
+    def __init__(self):
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @abstractmethod
+    def run_once(self):
+        """Do one unit of work; return a truthy value if there may be more"""
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        atexit.unregister(self.stop)
+        self._stopping.set()
+        self._wake.set()
+        thread.join(timeout)
+        self.drain()
+
+    def drain(self):
+        """Run until there is no work left, in the calling thread"""
+        while self.run_once():
+            pass
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                close_old_connections()
+                try:
+                    busy = self.run_once()
+                except Exception:
+                    logger.exception('%s failed', self.name)
+                    busy = False
+                if not busy:
+                    self._wake.wait(self.interval)
+                    self._wake.clear()
+        finally:
+            connections.close_all()
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',  # First, to time the whole stack
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,13 +85,76 @@ WSGI_APPLICATION = 'digitalagency.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# DB_ENGINE=postgres for production. Connections either persist for
+# DB_CONN_MAX_AGE seconds, health-checked before reuse, or with DB_POOL=true
+# come from Django's connection pool (needs psycopg[pool]; it replaces
+# persistent connections, so CONN_MAX_AGE is 0).
+#
+# The SQLite default suits one node and development. WAL lets reads carry on
+# during a write, IMMEDIATE transactions take the write lock when they begin
+# rather than failing to upgrade a read lock, and writers wait up to
+# DB_BUSY_TIMEOUT for the lock instead of failing with "database is locked".
+#
+# DB_REPLICAS lists read replicas, added as replica_1, replica_2, ...: hosts
+# with the primary's other settings or, for SQLite, files standing in for
+# them. Tests read replicas through the primary's test database.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 20))  # seconds
+
+if DB_ENGINE == 'postgres':
+    DB_POOL = os.environ.get('DB_POOL', 'false').lower() == 'true'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'digitalagency'),
+            'USER': os.environ.get('POSTGRES_USER', 'digitalagency'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': DB_BUSY_TIMEOUT,
+                },
+            } if DB_POOL else {},
+        }
     }
-}
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': DB_BUSY_TIMEOUT,  # Sets SQLite's busy_timeout
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'postgres' or 'sqlite', not {DB_ENGINE!r}")
+
+DATABASE_REPLICAS = []
+for number, location in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST' if DB_ENGINE == 'postgres' else 'NAME': location.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+# Reads of these apps' models in safe requests go to a random replica,
+# until the request writes (see core/routers.py). Sessions and users stay
+# on the primary so a login is seen by the very next request.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['core']
+DATABASE_REPLICA_EXEMPT_PATHS = ['/admin/']
 
 
 # Password validation
@@ -125,6 +193,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploads. Image derivatives under testimonials/derived/ have content-hashed
+# names and never change: serve them with a long, immutable Cache-Control.
+MEDIA_URL = os.environ.get('MEDIA_URL', '/media/')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -134,9 +207,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_CREDENTIALS = True
 
 
+# JSON encoding (see core/renderers.py): orjson when installed, else the
+# stdlib. Set to rest_framework.renderers.JSONRenderer for DRF's own.
+JSON_RENDERER = os.environ.get('JSON_RENDERER', 'core.renderers.FastJSONRenderer')
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        JSON_RENDERER,
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -153,12 +230,13 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'core.throttling.AnonTokenBucketThrottle',
+        'core.throttling.UserTokenBucketThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'contact': os.environ.get('CONTACT_THROTTLE_RATE', '10/hour'),
     }
 }
 
@@ -172,14 +250,161 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@yoursite.com')
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@yoursite.com')
 
+# Admin notifications for new contact submissions (see core/notifications.py)
+CONTACT_NOTIFICATIONS_ENABLED = os.environ.get('CONTACT_NOTIFICATIONS_ENABLED', 'false').lower() == 'true'
+NOTIFICATION_EMAIL_BACKEND = os.environ.get('NOTIFICATION_EMAIL_BACKEND', EMAIL_BACKEND)
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', 2))
+NOTIFICATION_DIGEST_THRESHOLD = int(os.environ.get('NOTIFICATION_DIGEST_THRESHOLD', 10))
+NOTIFICATION_MAX_RETRIES = 5
+NOTIFICATION_RETRY_BACKOFF = 2.0  # seconds, doubled on every retry
+
+
+
+# Cache
+# Public read endpoints cache indefinitely and are invalidated by per-model
+# versions (see core/cache.py), so a shared cache is needed with several
+# workers. Set REDIS_URL to use Redis, otherwise a per-process locmem cache.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Throttle buckets (see core/throttling.py) live in Redis so the limits hold
+# across workers; without it, or while it is down, they are per process.
+THROTTLE_REDIS_URL = os.environ.get('THROTTLE_REDIS_URL', REDIS_URL)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Cached API responses (see core/cache.py) are dropped by a model version
+# bump; this only bounds how long entries of old versions linger.
+CORE_CACHE_TIMEOUT = int(os.environ.get('CORE_CACHE_TIMEOUT', 3600))
+# Without Redis every worker has its own cache, and an edit only bumps
+# the model versions of the worker that saved it. The others' versions,
+# and so their cached responses and snapshots, expire after this long.
+CORE_CACHE_LOCAL_VERSION_TIMEOUT = int(os.environ.get('CORE_CACHE_LOCAL_VERSION_TIMEOUT', 600))
+
+
+# Pre-rendered JSON for the landing-page lists (see core/snapshots.py).
+# Set a directory shared by all workers so a snapshot is rendered once.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR')
+
+
+# Contact form ingestion (see core/ingestion.py). 'sync' inserts each POST
+# immediately; 'spool' writes it to a durable local queue and answers 202
+# while a background worker inserts the queue in batches.
+CONTACT_INGESTION_MODE = os.environ.get('CONTACT_INGESTION_MODE', 'sync')
+CONTACT_SPOOL_DIR = os.environ.get('CONTACT_SPOOL_DIR', BASE_DIR / 'var' / 'contact-spool')
+CONTACT_SPOOL_BATCH_SIZE = int(os.environ.get('CONTACT_SPOOL_BATCH_SIZE', 500))
+CONTACT_SPOOL_FLUSH_INTERVAL = float(os.environ.get('CONTACT_SPOOL_FLUSH_INTERVAL', 1.0))
+# An entry that fails to insert is retried after 1, 2, 4... times this many
+# seconds, and moved to the spool's dead/ directory after the last attempt
+CONTACT_SPOOL_RETRY_DELAY = float(os.environ.get('CONTACT_SPOOL_RETRY_DELAY', 1.0))
+CONTACT_SPOOL_MAX_ATTEMPTS = int(os.environ.get('CONTACT_SPOOL_MAX_ATTEMPTS', 10))
+CONTACT_SPOOL_AUTOFLUSH = True
+
+# Spam and duplicate filtering before a submission is stored (see
+# core/spam.py). Quarantined submissions get the usual answer but are only
+# counted; rejected ones get a 400. Scorers are dotted paths to callables.
+CONTACT_FILTER_ENABLED = os.environ.get('CONTACT_FILTER_ENABLED', 'true').lower() == 'true'
+CONTACT_FILTER_MAX_ENTRIES = 10000
+CONTACT_DUPLICATE_WINDOW = 24 * 3600  # seconds
+CONTACT_IP_WINDOW = 3600
+CONTACT_IP_MAX_SUBMISSIONS = int(os.environ.get('CONTACT_IP_MAX_SUBMISSIONS', 5))
+CONTACT_SPAM_SCORERS = ['core.spam.score_links', 'core.spam.score_link_in_name']
+CONTACT_SPAM_QUARANTINE_SCORE = 2
+CONTACT_SPAM_REJECT_SCORE = 5
+
+# Client IPs and user agents are stored once each (see core/lookups.py);
+# this many of each are remembered per process to skip the lookup.
+CONTACT_LOOKUP_CACHE_SIZE = 4096
+
+
+# Admin bulk status changes (see core/bulk.py) run in the background, one
+# transaction per chunk of this many submissions
+BULK_OPERATION_CHUNK_SIZE = int(os.environ.get('BULK_OPERATION_CHUNK_SIZE', 1000))
+BULK_OPERATIONS_AUTOSTART = True
+
+# Retention (see core/archive.py): the archive_submissions command moves
+# closed submissions older than this into compressed batches, zstd when
+# zstandard is installed, else zlib; they can still be read back from
+# /api/admin/contacts/archived/.
+CONTACT_ARCHIVE_AFTER_DAYS = int(os.environ.get('CONTACT_ARCHIVE_AFTER_DAYS', 365))
+CONTACT_ARCHIVE_BATCH_SIZE = int(os.environ.get('CONTACT_ARCHIVE_BATCH_SIZE', 1000))
+CONTACT_ARCHIVE_ZSTD_LEVEL = 10
+
+
+# Response compression (see core/compression.py): brotli when installed,
+# else gzip, for anonymous JSON responses of at least
+# RESPONSE_COMPRESSION_MIN_BYTES. Admin and authenticated responses are
+# sent uncompressed, against BREACH.
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+RESPONSE_COMPRESSION_GZIP_LEVEL = 6
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 5
+
+
+# Resized WebP/JPEG copies of testimonial images (see core/images.py),
+# built by a background worker after each upload
+IMAGE_DERIVATIVE_WIDTHS = [96, 192, 384]
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', 80))
+IMAGE_DERIVATIVES_AUTOSTART = True
+
+
+# Public read routes served by native async views (core/async_views.py)
+# when running under ASGI, e.g. "service_list,service_detail" or "all".
+# Under WSGI leave this empty: async views would run through async_to_sync.
+ASYNC_VIEWS = [name for name in os.environ.get('ASYNC_VIEWS', '').split(',') if name]
+
+
+# Request instrumentation (see core/middleware.py), served in Prometheus
+# format at /api/admin/metrics/. A sample of requests is run under cProfile
+# and profiles of the slow ones are kept for inspection.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', 0))
+REQUEST_PROFILING_SLOW_MS = int(os.environ.get('REQUEST_PROFILING_SLOW_MS', 500))
+REQUEST_PROFILING_DIR = os.environ.get('REQUEST_PROFILING_DIR', BASE_DIR / 'var' / 'profiles')
+
+# Logging (see core/log.py): one JSON object per line on stderr, written by a
+# background thread so requests never wait on the stream. Per-row traces
+# are DEBUG and only a LOG_TRACE_SAMPLE_RATE fraction of them is logged.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_TRACE_SAMPLE_RATE = float(os.environ.get('LOG_TRACE_SAMPLE_RATE', 0.01))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.log.JSONFormatter'},
+    },
+    'handlers': {
+        'background': {'()': 'core.log.BackgroundHandler', 'formatter': 'json', 'maxsize': 10000},
+    },
+    'root': {'handlers': ['background'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['background'], 'level': 'WARNING', 'propagate': False},
+        'django.request': {'level': 'ERROR'},  # Not every 4xx
+        'core': {'level': LOG_LEVEL},
+    },
+}
 
+# The /api/debug/ diagnostic views, which list every service unauthenticated.
+# Opt-in, for development only.
+DEBUG_VIEWS = os.environ.get('DEBUG_VIEWS', 'false').lower() == 'true'
 
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-#         'LOCATION': 'redis://127.0.0.1:6379/1',
-#     }
-# }
+# Log requests that go over their view's @query_budget (core/budgets.py).
+# Meant for staging; the test suite enforces the budgets regardless.
+QUERY_BUDGET_WARNINGS = os.environ.get('QUERY_BUDGET_WARNINGS', 'false').lower() == 'true'
 
 
 